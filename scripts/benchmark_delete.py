@@ -0,0 +1,61 @@
+"""Compares deleting stale remote files during a sync one by one, concurrently and
+in bulk.
+
+Run from the repository root: `pdm run python -m scripts.benchmark_delete`
+"""
+
+import logging
+import tempfile
+import time
+from typing import Optional
+
+from askui_runner.modules.core.infrastructure.files.askui import AskUiFilesService
+from askui_runner.modules.core.infrastructure.files.bulk_delete import BulkDelete
+
+from .files_api_stub import FilesApiStub
+
+NUM_FILES = 2000
+LATENCY_S = 0.005
+CONCURRENCY = 8
+
+
+def run(
+    stub: FilesApiStub,
+    label: str,
+    max_concurrent_deletes: int,
+    bulk_delete: Optional[BulkDelete] = None,
+) -> None:
+    for i in range(NUM_FILES):
+        stub.put_file(f"agents/renamed/{i:05}.json", b"{}")
+    stub.reset_stats()
+    files_service = AskUiFilesService(
+        base_url=stub.base_url,
+        headers={},
+        max_concurrent_deletes=max_concurrent_deletes,
+        list_page_size=1000,
+        bulk_delete=bulk_delete,
+    )
+    with tempfile.TemporaryDirectory() as dir_path:
+        start = time.perf_counter()
+        files_service.sync(dir_path, "agents", source_of_truth="local")
+        duration = time.perf_counter() - start
+    assert len(stub.files) == 0, "not all files were deleted"
+    print(f"{label:<12} requests: {stub.stats['requests']:>5}  time: {duration:.2f}s")
+
+
+def main() -> None:
+    logging.disable(logging.WARNING)
+    with FilesApiStub() as stub:
+        stub.latency_s = LATENCY_S
+        run(stub, "sequential", max_concurrent_deletes=1)
+        run(stub, "concurrent", max_concurrent_deletes=CONCURRENCY)
+        run(
+            stub,
+            "bulk",
+            max_concurrent_deletes=CONCURRENCY,
+            bulk_delete=BulkDelete(batch_size=100),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Measures the download throughput of the files service for many small files and
+for a single large file.
+
+Run from the repository root: `pdm run python -m scripts.benchmark_download`
+"""
+
+import os
+import tempfile
+import time
+
+from askui_runner.modules.core.infrastructure.files.askui import AskUiFilesService
+
+from .files_api_stub import FilesApiStub
+
+SMALL_FILES_COUNT = 500
+SMALL_FILE_SIZE_IN_BYTES = 16 * 1024
+LARGE_FILE_SIZE_IN_BYTES = 300 * 1024 * 1024
+CONCURRENCY = 8
+
+
+def run(stub: FilesApiStub, remote_path: str, label: str) -> None:
+    files_service = AskUiFilesService(
+        base_url=stub.base_url,
+        headers={},
+        max_concurrent_downloads=CONCURRENCY,
+    )
+    total_size = sum(
+        len(content)
+        for path, (content, _) in stub.files.items()
+        if path.startswith(remote_path)
+    )
+    with tempfile.TemporaryDirectory() as dir_path:
+        start = time.perf_counter()
+        files_service.download(local_dir_path=dir_path, remote_path=remote_path)
+        duration = time.perf_counter() - start
+    print(
+        f"{label:<32} {total_size / 1024 / 1024:>8.1f} MiB  {duration:>6.2f}s  "
+        f"{total_size / 1024 / 1024 / duration:>8.1f} MiB/s"
+    )
+
+
+def main() -> None:
+    with FilesApiStub() as stub:
+        for i in range(SMALL_FILES_COUNT):
+            stub.put_file(f"small/{i:05}.json", os.urandom(SMALL_FILE_SIZE_IN_BYTES))
+        stub.put_file("large/recording.mp4", os.urandom(LARGE_FILE_SIZE_IN_BYTES))
+        run(stub, "small", f"{SMALL_FILES_COUNT} x 16 KiB files")
+        run(stub, "large", "1 x 300 MiB file")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Compares the number of connections opened by the files service with and without
+a pooled HTTP session.
+
+Run from the repository root: `pdm run python -m scripts.benchmark_http_session`
+"""
+
+import tempfile
+import time
+
+from askui_runner.modules.core.infrastructure.files.askui import AskUiFilesService
+from askui_runner.modules.core.infrastructure.http import PooledHttpSession
+from askui_runner.modules.core.models import HttpConfig
+
+from .files_api_stub import FilesApiStub
+
+NUM_FILES = 500
+CONCURRENCY = 8
+
+
+def run(stub: FilesApiStub, http_config: HttpConfig, label: str) -> None:
+    stub.reset_stats()
+    files_service = AskUiFilesService(
+        base_url=stub.base_url,
+        headers={},
+        session=PooledHttpSession(config=http_config),
+        max_concurrent_downloads=CONCURRENCY,
+    )
+    with tempfile.TemporaryDirectory() as dir_path:
+        start = time.perf_counter()
+        files_service.download(local_dir_path=dir_path, remote_path="workflows")
+        duration = time.perf_counter() - start
+    requests_count = stub.stats["requests"]
+    connections_count = stub.stats["connections"]
+    print(
+        f"{label:<12} requests: {requests_count:>5}  connections: {connections_count:>5}  "
+        f"reused: {1 - connections_count / requests_count:>6.1%}  time: {duration:.2f}s"
+    )
+
+
+def main() -> None:
+    with FilesApiStub() as stub:
+        for i in range(NUM_FILES):
+            stub.put_file(f"workflows/{i:05}.ts", b"x" * 1024)
+        run(stub, HttpConfig(keep_alive=False), "no pooling")
+        run(stub, HttpConfig(), "pooled")
+
+
+if __name__ == "__main__":
+    main()
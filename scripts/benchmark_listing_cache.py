@@ -0,0 +1,61 @@
+"""Compares listing an unchanged prefix repeatedly (as every job or `agent sync`
+does) without and with the listing cache, which requests pages conditionally
+and reuses the cached ones the files API reports as not modified.
+
+Run from the repository root: `pdm run python -m scripts.benchmark_listing_cache`
+"""
+
+import logging
+import tempfile
+import time
+from typing import Optional
+
+from askui_runner.modules.core.infrastructure.files.askui import AskUiFilesService
+from askui_runner.modules.core.infrastructure.files.listing import ListingCache
+
+from .files_api_stub import FilesApiStub
+
+NUM_FILES = 20_000
+NUM_LISTINGS = 3
+LATENCY_S = 0.005
+
+
+def run(
+    stub: FilesApiStub, label: str, cache_dir_path: Optional[str] = None
+) -> list[str]:
+    files_service = AskUiFilesService(
+        base_url=stub.base_url,
+        headers={},
+        listing_cache=None if cache_dir_path is None else ListingCache(cache_dir_path),
+    )
+    stub.reset_stats()
+    start = time.perf_counter()
+    for _ in range(NUM_LISTINGS):
+        paths = [file.path for file in files_service._list_remote_objects("agents/")]
+    duration = time.perf_counter() - start
+    print(
+        f"{label:<24} requests: {stub.stats['requests']:>4}  "
+        f"not modified: {stub.stats.get('not_modified', 0):>4}  "
+        f"bytes sent: {stub.stats.get('bytes_sent', 0):>9}  time: {duration:.2f}s"
+    )
+    return paths
+
+
+def main() -> None:
+    logging.disable(logging.WARNING)
+    with FilesApiStub() as stub, tempfile.TemporaryDirectory() as cache_dir_path:
+        stub.latency_s = LATENCY_S
+        for i in range(NUM_FILES):
+            stub.put_file(f"agents/{i // 100:03}/{i:05}.json", b"{}")
+        expected = run(stub, "no cache")
+        assert run(stub, "cache", cache_dir_path) == expected
+        stub.put_file("agents/999/new.json", b"{}")  # only changes the last page
+        expected.append("agents/999/new.json")
+        assert run(stub, "cache, 1 file added", cache_dir_path) == expected
+        stub.listing_etags = False
+        with tempfile.TemporaryDirectory() as empty_cache_dir_path:
+            assert run(stub, "cache, no ETags", empty_cache_dir_path) == expected
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compares decoding a 100k-entry listing of the files API with pydantic models
+(as previously done) and with the lightweight records.
+
+Run from the repository root: `pdm run python -m scripts.benchmark_listing_decode`
+"""
+
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+from pydantic import AwareDatetime, BaseModel, ConfigDict, Field
+
+from askui_runner.modules.core.infrastructure.files.askui import AskUiFilesService
+from askui_runner.modules.core.infrastructure.files.records import FilesListPage
+
+NUM_FILES = 100_000
+
+
+class FileDto(BaseModel):
+    name: str
+    path: str
+    last_modified: AwareDatetime = Field(..., alias="lastModified")
+    url: str
+    size: int
+
+    model_config = ConfigDict(frozen=True, populate_by_name=True)
+
+
+class FilesListResponseDto(BaseModel):
+    data: list[FileDto]
+    next_continuation_token: Optional[str] = None
+
+    model_config = ConfigDict(frozen=True)
+
+
+def build_listing() -> dict[str, Any]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    files = []
+    for i in range(NUM_FILES):
+        path = f"workspaces/ws/test-cases/{i % 100:03}/{i:06}.ts"
+        if i % 50 == 0:
+            path = f"workspaces/ws/test-cases/.askui/{i:06}.json"
+        files.append(
+            {
+                "name": path.rsplit("/", 1)[-1],
+                "path": path,
+                "lastModified": (start + timedelta(seconds=i)).isoformat(),
+                "url": f"https://files.example.com/{path}?signature=abc",
+                "size": i,
+            }
+        )
+    return {"data": files, "next_continuation_token": None}
+
+
+def decode_with_pydantic(listing: dict[str, Any]) -> int:
+    count = 0
+    for file in FilesListResponseDto(**listing).data:
+        if any(
+            re.match(pattern, file.path)
+            for pattern in AskUiFilesService.HIDDEN_FILES_PATTERNS
+        ):
+            continue
+        count += 1
+    return count
+
+
+def decode_with_records(listing: dict[str, Any]) -> int:
+    count = 0
+    matcher = AskUiFilesService._HIDDEN_FILES_MATCHER
+    for file in FilesListPage.from_json(listing).data:
+        if matcher.match(file.path):
+            continue
+        count += 1
+    return count
+
+
+def measure(label: str, decode: Callable[[dict[str, Any]], int]) -> float:
+    listing = build_listing()
+    start = time.perf_counter()
+    count = decode(listing)
+    duration = time.perf_counter() - start
+    print(f"{label:<10} {count} visible files in {duration * 1000:>8.1f} ms")
+    return duration
+
+
+def main() -> None:
+    pydantic_duration = measure("pydantic", decode_with_pydantic)
+    records_duration = measure("records", decode_with_records)
+    print(f"speedup    {pydantic_duration / records_duration:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
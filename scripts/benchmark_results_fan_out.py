@@ -0,0 +1,68 @@
+"""Compares uploading the results to two destinations one after the other (as
+previously done) and concurrently with `FanOutResultsUploadService`, which also
+scans the shared results directory only once.
+
+Run from the repository root: `pdm run python -m scripts.benchmark_results_fan_out`
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+from askui_runner.modules.core.infrastructure.files.askui import AskUiFilesService
+from askui_runner.modules.core.infrastructure.results_upload.askui import (
+    AskUiResultsUploadService,
+    FanOutResultsUploadService,
+)
+
+from .files_api_stub import FilesApiStub
+
+NUM_FILES = 200
+LATENCY_S = (0.1, 0.05)  # of the destinations, e.g., a remote and a nearby one
+CONCURRENCY = 8
+
+
+def run(label: str, stubs: list[FilesApiStub], results_dir: str, fan_out: bool) -> None:
+    for stub in stubs:
+        stub.files.clear()
+    services = [
+        AskUiResultsUploadService(
+            files_upload_service=AskUiFilesService(
+                base_url=stub.base_url,
+                headers={},
+                max_concurrent_uploads=CONCURRENCY,
+            ),
+            results_dir=results_dir,
+        )
+        for stub in stubs
+    ]
+    start = time.perf_counter()
+    if fan_out:
+        FanOutResultsUploadService(services=list(services)).upload()
+    else:
+        for service in services:
+            service.upload()
+    duration = time.perf_counter() - start
+    for stub in stubs:
+        assert len(stub.files) == NUM_FILES, "not all results were uploaded"
+    print(f"{label:<12} time: {duration:.2f}s")
+
+
+def main() -> None:
+    logging.disable(logging.WARNING)
+    with (
+        tempfile.TemporaryDirectory() as results_dir,
+        FilesApiStub() as remote,
+        FilesApiStub() as nearby,
+    ):
+        for i in range(NUM_FILES):
+            with open(os.path.join(results_dir, f"{i:04}.json"), "wb") as f:
+                f.write(os.urandom(4 * 1024))
+        remote.latency_s, nearby.latency_s = LATENCY_S
+        run("sequential", [remote, nearby], results_dir, fan_out=False)
+        run("fan-out", [remote, nearby], results_dir, fan_out=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compares listing a local directory tree with `os.walk`, `os.path.relpath` and
+`os.stat` per file (as previously done) and with `scan_files`.
+
+Run from the repository root: `pdm run python -m scripts.benchmark_scan [dir]`.
+Without a directory, a tree of 20k files is generated in a temporary directory;
+pass a directory on a network file system to see the effect of scanning
+subdirectories concurrently.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from askui_runner.modules.core.infrastructure.files.scan import scan_files
+
+NUM_DIRS = 200
+NUM_FILES_PER_DIR = 100
+
+
+def walk(dir_path: str) -> dict[str, os.stat_result]:
+    files = {}
+    for root, _, names in os.walk(dir_path):
+        for name in names:
+            file_path = os.path.join(root, name)
+            relative_path = os.path.relpath(file_path, start=dir_path)
+            files[relative_path.replace(os.sep, "/")] = os.stat(file_path)
+    return files
+
+
+def scan(dir_path: str) -> dict[str, os.stat_result]:
+    return {file.relative_path: file.stat() for file in scan_files(dir_path)}
+
+
+def run(label: str, list_files: Callable[[str], dict], dir_path: str) -> set[str]:
+    start = time.perf_counter()
+    files = list_files(dir_path)
+    print(
+        f"{label:<8} files: {len(files):>7}  time: {time.perf_counter() - start:.2f}s"
+    )
+    return set(files)
+
+
+def generate_tree(dir_path: str) -> None:
+    for i in range(NUM_DIRS):
+        sub_dir_path = os.path.join(dir_path, f"{i % 10}", f"{i:03}")
+        os.makedirs(sub_dir_path)
+        for j in range(NUM_FILES_PER_DIR):
+            with open(os.path.join(sub_dir_path, f"{j:03}.png"), "wb") as f:
+                f.write(b"x")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir_path:
+        if len(sys.argv) > 1:
+            dir_path = sys.argv[1]
+        else:
+            dir_path = tmp_dir_path
+            generate_tree(dir_path)
+        walked = run("os.walk", walk, dir_path)
+        scanned = run("scan", scan, dir_path)
+        assert walked == scanned, "scan_files listed different files"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compares the peak memory and the time until the first transfer starts of a sync
+that lists all files first and of a streaming sync (with and without a manifest),
+downloading all files.
+
+Run from the repository root: `pdm run python -m scripts.benchmark_sync_streaming`
+"""
+
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Optional
+
+from askui_runner.modules.core.infrastructure.files.askui import AskUiFilesService
+
+from .files_api_stub import FilesApiStub
+
+NUM_FILES = 10_000
+
+
+class BenchmarkFilesService(AskUiFilesService):
+    first_transfer_at: Optional[float] = None
+
+    def _download_file(self, *args, **kwargs) -> None:  # type: ignore[no-untyped-def]
+        if self.first_transfer_at is None:
+            self.first_transfer_at = time.perf_counter()
+        super()._download_file(*args, **kwargs)
+
+
+def run(
+    stub: FilesApiStub,
+    label: str,
+    streaming_sync: bool,
+    sync_manifest_dir: Optional[str] = None,
+) -> None:
+    files_service = BenchmarkFilesService(
+        base_url=stub.base_url,
+        headers={},
+        max_concurrent_downloads=8,
+        list_page_size=1000,
+        streaming_sync=streaming_sync,
+        sync_manifest_dir=sync_manifest_dir,
+    )
+    with tempfile.TemporaryDirectory() as dir_path:
+        tracemalloc.start()
+        start = time.perf_counter()
+        files_service.sync(dir_path, "agents", source_of_truth="remote")
+        duration = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert sum(len(files) for _, _, files in os.walk(dir_path)) == NUM_FILES
+    assert files_service.first_transfer_at is not None
+    print(
+        f"{label:<20} peak memory: {peak / 1024 / 1024:>6.1f} MiB  "
+        f"first transfer after: {files_service.first_transfer_at - start:.2f}s  "
+        f"time: {duration:.2f}s"
+    )
+
+
+def main() -> None:
+    logging.disable(logging.ERROR)
+    with FilesApiStub() as stub:
+        for i in range(NUM_FILES):
+            stub.put_file(f"agents/{i % 100:02}/{i:06}.json", b"{}")
+        run(stub, "listing", streaming_sync=False)
+        run(stub, "streaming", streaming_sync=True)
+        with tempfile.TemporaryDirectory() as sync_manifest_dir:
+            run(stub, "streaming, manifest", True, sync_manifest_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Measures how much the peak memory (RSS) of a process grows while uploading a
+large file, with the files service and with `requests`' `files=`, which
+assembles the multipart body in memory. Fails if the files service needs more
+than `MAX_RSS_GROWTH_IN_MIB`.
+
+Run from the repository root (Linux/macOS):
+`pdm run python -m scripts.benchmark_upload_memory [file size in MiB]`
+"""
+
+import hashlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import requests
+
+from askui_runner.modules.core.infrastructure.files.askui import AskUiFilesService
+from askui_runner.modules.core.infrastructure.files.manifest import hash_file
+
+from .files_api_stub import FilesApiStub
+
+FILE_SIZE_IN_MIB = 300
+MAX_RSS_GROWTH_IN_MIB = 64
+
+
+def peak_rss_in_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def upload(mode: str, base_url: str, file_path: str) -> None:
+    """Uploads the file in this (child) process and prints the growth of the
+    peak memory."""
+    before = peak_rss_in_mib()
+    if mode == "requests":
+        with open(file_path, "rb") as f:
+            requests.put(
+                f"{base_url}uploads/requests.bin", files={"file": f}
+            ).raise_for_status()
+    else:
+        AskUiFilesService(base_url=base_url, headers={}).upload(file_path, "uploads")
+    print(peak_rss_in_mib() - before)
+
+
+def run(label: str, mode: str, base_url: str, file_path: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-m", "scripts.benchmark_upload_memory", mode, base_url]
+        + [file_path],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    growth = float(output.strip().splitlines()[-1])
+    print(f"{label:<16} peak memory growth: {growth:>6.1f} MiB")
+    return growth
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else FILE_SIZE_IN_MIB
+    with tempfile.TemporaryDirectory() as dir_path, FilesApiStub() as stub:
+        file_path = os.path.join(dir_path, "recording.bin")
+        with open(file_path, "wb") as f:
+            for _ in range(size):
+                f.write(os.urandom(1024 * 1024))
+        sha256 = hash_file(file_path)
+        print(f"Uploading {size} MiB ...")
+        run("requests files=", "requests", stub.base_url, file_path)
+        growth = run("files service", "service", stub.base_url, file_path)
+        content = stub.files["uploads/recording.bin"][0]
+        assert hashlib.sha256(content).hexdigest() == sha256, "upload is corrupted"
+        assert growth < MAX_RSS_GROWTH_IN_MIB, (
+            f"uploading {size} MiB grew the peak memory by {growth:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4:
+        upload(*sys.argv[1:])
+    else:
+        main()
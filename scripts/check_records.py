@@ -0,0 +1,76 @@
+"""Regression checks of decoding listings of the files API into records.
+
+Run from the repository root: `pdm run python -m scripts.check_records`
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from askui_runner.modules.core.infrastructure.files.records import (
+    FilesListPage,
+    parse_last_modified,
+)
+
+
+def check_last_modified_formats() -> None:
+    """ISO 8601 strings that `datetime.fromisoformat` rejects before Python 3.11
+    are parsed as pydantic parsed them."""
+    expected = {
+        "2024-01-02T03:04:05Z": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        "2024-01-02T03:04:05.12345Z": datetime(
+            2024, 1, 2, 3, 4, 5, 123450, tzinfo=timezone.utc
+        ),
+        "2024-01-02T03:04:05.1Z": datetime(
+            2024, 1, 2, 3, 4, 5, 100000, tzinfo=timezone.utc
+        ),
+        "2024-01-02T03:04:05.1234567Z": datetime(
+            2024, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc
+        ),
+        "2024-01-02T03:04:05+0200": datetime(
+            2024, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=2))
+        ),
+        "2024-01-02T03:04:05": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    }
+    for value, last_modified in expected.items():
+        parsed = parse_last_modified(value)
+        assert parsed == last_modified and parsed.tzinfo is not None, (
+            f"{value!r} parsed as {parsed!r}"
+        )
+    page = FilesListPage.from_json(
+        {
+            "data": [
+                {
+                    "name": "a.json",
+                    "path": "agents/a.json",
+                    "url": "",
+                    "size": 1,
+                    "lastModified": "2024-01-02T03:04:05.12345Z",
+                }
+            ]
+        }
+    )
+    assert page.data[0].last_modified == expected["2024-01-02T03:04:05.12345Z"]
+
+
+def check_invalid_last_modified() -> None:
+    try:
+        parse_last_modified("yesterday")
+    except ValueError:
+        return
+    raise AssertionError("invalid last modified date was accepted")
+
+
+CHECKS: list[Callable[[], None]] = [
+    check_last_modified_formats,
+    check_invalid_last_modified,
+]
+
+
+def main() -> None:
+    for check in CHECKS:
+        check()
+        print(f"{check.__name__}: ok")
+
+
+if __name__ == "__main__":
+    main()
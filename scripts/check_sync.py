@@ -0,0 +1,374 @@
+"""Regression checks of syncing files against the files API stub, run with and
+without streaming.
+
+Run from the repository root: `pdm run python -m scripts.check_sync`
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable
+
+from askui_runner.modules.core.infrastructure.files.askui import AskUiFilesService
+from askui_runner.modules.core.infrastructure.files.askui_async import (
+    AsyncAskUiFilesService,
+)
+from askui_runner.modules.core.infrastructure.files.cache import FilesCache
+from askui_runner.modules.core.infrastructure.files.listing import ListingCache
+from askui_runner.modules.core.infrastructure.files.utils import (
+    remove_stale_temporary_files,
+    temporary_file_path,
+)
+from askui_runner.modules.core.infrastructure.results_upload.askui import (
+    AskUiResultsUploadService,
+)
+from askui_runner.modules.core.infrastructure.results_upload.incremental import (
+    IncrementalResultsUploadService,
+)
+
+from .files_api_stub import FilesApiStub
+
+
+def create_files_service(
+    stub: FilesApiStub, manifest_dir_path: str, streaming: bool
+) -> AskUiFilesService:
+    return AskUiFilesService(
+        base_url=stub.base_url,
+        headers={},
+        streaming_sync=streaming,
+        sync_manifest_dir=manifest_dir_path,
+    )
+
+
+def check_remote_change_after_upload(stub: FilesApiStub, streaming: bool) -> None:
+    """A remote file changed after it was uploaded is downloaded by the next sync
+    although the manifest recorded the upload."""
+    with (
+        tempfile.TemporaryDirectory() as manifest_dir_path,
+        tempfile.TemporaryDirectory() as dir_path,
+    ):
+        file_path = os.path.join(dir_path, "agent.json")
+        with open(file_path, "wb") as f:
+            f.write(b"local")
+        files_service = create_files_service(stub, manifest_dir_path, streaming)
+        files_service.sync(dir_path, "agents", source_of_truth="local")
+        assert stub.files["agents/agent.json"][0] == b"local"
+        stub.put_file("agents/agent.json", b"changed remotely", time.time() + 60)
+        files_service.sync(dir_path, "agents", source_of_truth="remote")
+        with open(file_path, "rb") as f:
+            assert f.read() == b"changed remotely", "remote change was not synced"
+
+
+def check_unchanged_after_upload(stub: FilesApiStub, streaming: bool) -> None:
+    """A file uploaded during a sync is not transferred again by the next sync."""
+    with (
+        tempfile.TemporaryDirectory() as manifest_dir_path,
+        tempfile.TemporaryDirectory() as dir_path,
+    ):
+        with open(os.path.join(dir_path, "agent.json"), "wb") as f:
+            f.write(b"local")
+        files_service = create_files_service(stub, manifest_dir_path, streaming)
+        files_service.sync(dir_path, "agents", source_of_truth="local")
+        uploaded = stub.files["agents/agent.json"]
+        for _ in range(2):
+            files_service.sync(dir_path, "agents", source_of_truth="local")
+            assert stub.files["agents/agent.json"] == uploaded, "uploaded again"
+
+
+def check_unreadable_manifest(stub: FilesApiStub, streaming: bool) -> None:
+    """An unreadable manifest is ignored and replaced by the next sync."""
+    with (
+        tempfile.TemporaryDirectory() as manifest_dir_path,
+        tempfile.TemporaryDirectory() as dir_path,
+    ):
+        with open(os.path.join(dir_path, "agent.json"), "wb") as f:
+            f.write(b"local")
+        files_service = create_files_service(stub, manifest_dir_path, streaming)
+        files_service.sync(dir_path, "agents", source_of_truth="local")
+        for name in os.listdir(manifest_dir_path):
+            with open(os.path.join(manifest_dir_path, name), "wb") as f:
+                f.write(b"garbage")
+        files_service.sync(dir_path, "agents", source_of_truth="local")
+        uploaded = stub.files["agents/agent.json"]
+        files_service.sync(dir_path, "agents", source_of_truth="local")
+        assert stub.files["agents/agent.json"] == uploaded, "uploaded again"
+
+
+def check_temporary_files_left_behind(stub: FilesApiStub, streaming: bool) -> None:
+    """Temporary files left behind, e.g., by a crashed download, are neither synced
+    nor uploaded, and removed once they are stale."""
+    with (
+        tempfile.TemporaryDirectory() as manifest_dir_path,
+        tempfile.TemporaryDirectory() as dir_path,
+    ):
+        file_path = os.path.join(dir_path, "agent.json")
+        with open(file_path, "wb") as f:
+            f.write(b"local")
+        stale_tmp_file_path = temporary_file_path(file_path)
+        tmp_file_path = temporary_file_path(file_path)
+        for path in (stale_tmp_file_path, tmp_file_path):
+            with open(path, "wb") as f:
+                f.write(b"partial")
+        os.utime(stale_tmp_file_path, times=(0, 0))
+        files_service = create_files_service(stub, manifest_dir_path, streaming)
+        files_service.sync(dir_path, "agents", source_of_truth="local")
+        files_service.upload(dir_path, "results")
+        assert sorted(stub.files) == ["agents/agent.json", "results/agent.json"], (
+            f"temporary files were uploaded: {sorted(stub.files)}"
+        )
+        remove_stale_temporary_files(dir_path)
+        assert not os.path.exists(stale_tmp_file_path), "stale file was not removed"
+        assert os.path.exists(tmp_file_path), "file being written was removed"
+
+
+def check_listing_cache_download_urls(stub: FilesApiStub, streaming: bool) -> None:
+    """Download URLs, which expire, are not cached; files of pages taken from the
+    listing cache and files whose download URL expired are listed again."""
+    stub.download_url_ttl_s = 1
+    for i in range(250):
+        stub.put_file(f"agents/{i:03}.json", str(i).encode())
+    with (
+        tempfile.TemporaryDirectory() as cache_dir_path,
+        tempfile.TemporaryDirectory() as dir_path,
+    ):
+        files_service = AskUiFilesService(
+            base_url=stub.base_url,
+            headers={},
+            max_concurrent_downloads=8,
+            streaming_sync=streaming,
+            listing_cache=ListingCache(cache_dir_path),
+        )
+        files_service.sync(dir_path, "agents", source_of_truth="remote")
+        for name in os.listdir(cache_dir_path):
+            with open(os.path.join(cache_dir_path, name), "rb") as f:
+                assert b"expires=" not in f.read(), "download URL was cached"
+        time.sleep(1.1)  # let the listed download URLs expire
+        for name in os.listdir(dir_path):
+            os.remove(os.path.join(dir_path, name))
+        stub.reset_stats()
+        files_service.sync(dir_path, "agents", source_of_truth="remote")
+        assert stub.stats["not_modified"] > 0, "listing cache was not used"
+        assert len(os.listdir(dir_path)) == 250, "files were not downloaded"
+
+        for name in os.listdir(dir_path):
+            os.remove(os.path.join(dir_path, name))
+        async_files_service = AsyncAskUiFilesService(
+            base_url=stub.base_url,
+            headers={},
+            max_concurrent_downloads=8,
+            listing_cache=ListingCache(cache_dir_path),
+        )
+        asyncio.run(async_files_service.download(dir_path, "agents/"))
+        assert len(os.listdir(dir_path)) == 250, "files were not downloaded (async)"
+
+        file = next(iter(files_service._list_remote_objects("agents/000.json")))
+        time.sleep(1.1)
+        files_service._download_listed_file(file, os.path.join(dir_path, "expired"))
+        with open(os.path.join(dir_path, "expired"), "rb") as f:
+            assert f.read() == b"0", (
+                "file with expired download URL was not listed again"
+            )
+
+
+def check_listing_cache_requests(stub: FilesApiStub, streaming: bool) -> None:
+    """The listing cache never costs more listing requests than listing without
+    it: pages are only requested conditionally if their files can be skipped, and
+    a cached page is listed again at most once for the download URLs of its
+    files."""
+    for i in range(250):  # 3 pages
+        stub.put_file(f"agents/{i:03}.json", str(i).encode())
+    with (
+        tempfile.TemporaryDirectory() as listing_cache_dir_path,
+        tempfile.TemporaryDirectory() as files_cache_dir_path,
+        tempfile.TemporaryDirectory() as dir_path,
+    ):
+
+        def create_files_service(files_cache: bool) -> AskUiFilesService:
+            return AskUiFilesService(
+                base_url=stub.base_url,
+                headers={},
+                max_concurrent_downloads=8,
+                streaming_sync=streaming,
+                listing_cache=ListingCache(listing_cache_dir_path),
+                cache=(
+                    FilesCache(files_cache_dir_path, max_size_in_bytes=1024 * 1024)
+                    if files_cache
+                    else None
+                ),
+            )
+
+        def count_requests(run: Callable[[], None]) -> tuple[int, int]:
+            stub.reset_stats()
+            run()
+            return stub.stats.get("list_requests", 0), stub.stats.get("downloads", 0)
+
+        for files_cache in (True, False):
+            files_service = create_files_service(files_cache)
+            for _ in range(2):
+                assert count_requests(
+                    lambda: files_service.download(dir_path, "agents/")
+                ) == (3, 0 if files_cache and _ else 250), (
+                    f"unexpected requests (files cache: {files_cache})"
+                )
+        async_files_service = AsyncAskUiFilesService(
+            base_url=stub.base_url,
+            headers={},
+            max_concurrent_downloads=8,
+            listing_cache=ListingCache(listing_cache_dir_path),
+        )
+        assert count_requests(
+            lambda: asyncio.run(async_files_service.download(dir_path, "agents/"))
+        ) == (3, 250), "unexpected requests (async)"
+
+        # files evicted from the files cache need the download URLs of their page
+        with tempfile.TemporaryDirectory() as empty_files_cache_dir_path:
+            files_service = create_files_service(True)
+            files_service._cache = FilesCache(
+                empty_files_cache_dir_path, max_size_in_bytes=1024 * 1024
+            )
+            assert count_requests(
+                lambda: files_service.download(dir_path, "agents/")
+            ) == (6, 250), "cached pages were listed again more than once"
+
+        files_service = create_files_service(False)
+        files_service.sync(dir_path, "agents", source_of_truth="remote")
+        assert count_requests(
+            lambda: files_service.sync(dir_path, "agents", source_of_truth="remote")
+        ) == (3, 0), "unexpected requests (sync)"
+
+
+def check_redirected_downloads(stub: FilesApiStub, streaming: bool) -> None:
+    """Download URLs that redirect, e.g., to a CDN, are followed by both
+    transports."""
+    stub.redirect_downloads = True
+    stub.put_file("agents/agent.json", b"redirected")
+    with (
+        tempfile.TemporaryDirectory() as manifest_dir_path,
+        tempfile.TemporaryDirectory() as dir_path,
+    ):
+        files_service = create_files_service(stub, manifest_dir_path, streaming)
+        files_service.sync(dir_path, "agents", source_of_truth="remote")
+        with open(os.path.join(dir_path, "agent.json"), "rb") as f:
+            assert f.read() == b"redirected", "redirect was not followed"
+    with tempfile.TemporaryDirectory() as dir_path:
+        async_files_service = AsyncAskUiFilesService(base_url=stub.base_url, headers={})
+        asyncio.run(async_files_service.download(dir_path, "agents/"))
+        with open(os.path.join(dir_path, "agent.json"), "rb") as f:
+            assert f.read() == b"redirected", "redirect was not followed (async)"
+
+
+def check_watch_survives_listing_errors(stub: FilesApiStub, streaming: bool) -> None:
+    """Watching goes on if listing the remote files fails and syncs the changes
+    made meanwhile once listing succeeds again."""
+    with (
+        tempfile.TemporaryDirectory() as manifest_dir_path,
+        tempfile.TemporaryDirectory() as dir_path,
+    ):
+        files_service = create_files_service(stub, manifest_dir_path, streaming)
+        list_sync_files = files_service._list_sync_files
+        failing_listings = [3]
+
+        def fail_listing(*args, **kwargs):  # type: ignore[no-untyped-def]
+            if not kwargs.get("local", True) and failing_listings[0] > 0:
+                failing_listings[0] -= 1
+                raise ConnectionError("files API unavailable")
+            return list_sync_files(*args, **kwargs)
+
+        files_service._list_sync_files = fail_listing  # type: ignore[method-assign]
+        stopped = threading.Event()
+        watching = threading.Thread(
+            target=files_service.watch,
+            args=(dir_path, "agents", "remote"),
+            kwargs={
+                "poll_interval_s": 0.1,
+                "debounce_s": 0.1,
+                "watch_mode": "polling",
+                "stopped": stopped,
+            },
+        )
+        watching.start()
+        try:
+            deadline = time.monotonic() + 10
+            while failing_listings[0] == 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            stub.put_file("agents/agent.json", b"remote")
+            file_path = os.path.join(dir_path, "agent.json")
+            while not os.path.exists(file_path) and time.monotonic() < deadline:
+                assert watching.is_alive(), "watching stopped"
+                time.sleep(0.05)
+            assert failing_listings[0] == 0, "listing did not fail"
+            assert os.path.exists(file_path), "remote change was not synced"
+        finally:
+            stopped.set()
+            watching.join()
+
+
+def check_incremental_results_upload(stub: FilesApiStub, streaming: bool) -> None:
+    """The final upload of results uploaded in the background uploads the new and
+    rewritten files in one bundle and deletes the files deleted since."""
+    with tempfile.TemporaryDirectory() as results_dir:
+        os.mkdir(os.path.join(results_dir, "sub"))
+        for name in ("a.txt", os.path.join("sub", "b.txt")):
+            with open(os.path.join(results_dir, name), "wb") as f:
+                f.write(b"first")
+        files_service = AskUiFilesService(
+            base_url=stub.base_url, headers={}, bundle_max_file_size_in_bytes=1024
+        )
+        results_upload = IncrementalResultsUploadService(
+            files_service,
+            AskUiResultsUploadService(files_service, results_dir),
+            results_dir,
+            poll_interval_s=0.05,
+            stable_after_s=0,
+            watch_mode="polling",
+        )
+        results_upload.start()
+        deadline = time.monotonic() + 10
+        while len(stub.files) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(stub.files) == 2, "results were not uploaded in the background"
+        results_upload._stable_after_s = 3600  # leave the rest to the final upload
+        with open(os.path.join(results_dir, "a.txt"), "wb") as f:
+            f.write(b"rewritten")
+        os.remove(os.path.join(results_dir, "sub", "b.txt"))
+        for name in ("c.txt", "d.txt"):
+            with open(os.path.join(results_dir, name), "wb") as f:
+                f.write(b"new")
+        stub.reset_stats()
+        results_upload.upload()
+        assert {path: content for path, (content, _) in stub.files.items()} == {
+            "a.txt": b"rewritten",
+            "c.txt": b"new",
+            "d.txt": b"new",
+        }, f"unexpected remote results: {sorted(stub.files)}"
+        # one bundle with the 3 remaining files and one deletion
+        assert stub.stats["requests"] == 2, f"unexpected requests: {stub.stats}"
+
+
+CHECKS: list[Callable[[FilesApiStub, bool], None]] = [
+    check_remote_change_after_upload,
+    check_unchanged_after_upload,
+    check_unreadable_manifest,
+    check_temporary_files_left_behind,
+    check_listing_cache_download_urls,
+    check_listing_cache_requests,
+    check_redirected_downloads,
+    check_watch_survives_listing_errors,
+    check_incremental_results_upload,
+]
+
+
+def main() -> None:
+    logging.disable(logging.WARNING)
+    for check in CHECKS:
+        for streaming in (False, True):
+            with FilesApiStub() as stub:
+                check(stub, streaming)
+            print(f"{check.__name__} (streaming: {streaming}): ok")
+
+
+if __name__ == "__main__":
+    main()
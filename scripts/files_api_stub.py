@@ -0,0 +1,329 @@
+"""Local stand-in for the AskUI files API used by the benchmark scripts.
+
+Files are kept in memory. The server implements listing (with pagination),
+downloading (through the `url` returned by the listing, optionally redirecting,
+supporting range requests), uploading (multipart
+`PUT`, optionally chunked and compressed with `Content-Encoding`, extracting
+tar archives uploaded with `extract=tar`), uploading in parts (see
+`MultipartUpload`), copying (`PUT` with `copy_from`) and deleting files (one by
+one or in bulk, see `BulkDelete`), and counts the connections, requests and
+uploaded body bytes it serves.
+"""
+
+import hashlib
+import io
+import json
+import re
+import tarfile
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlparse
+
+DOWNLOAD_PATH_PREFIX = "/_download/"
+REDIRECT_PATH_PREFIX = "/_redirect/"  # redirects to the download URL, like a CDN
+
+
+class FilesApiStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), FilesApiStubHandler)
+        self.files: dict[str, tuple[bytes, float]] = {}
+        self.stats: dict[str, int] = {"connections": 0, "requests": 0}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.failing_part_uploads = 0  # number of part uploads to fail with a 503
+        # number of requests for listing pages after the first to fail with a 503
+        self.failing_list_pages = 0
+        self.bulk_delete = True  # whether to support bulk deletes
+        self.listing_etags = True  # whether to send ETags with listing pages
+        # lifetime of download URLs (like presigned URLs); unlimited if None
+        self.download_url_ttl_s: float | None = None
+        self.latency_s = 0.0  # delay of every response, e.g., to simulate a WAN
+        self.redirect_downloads = False  # whether download URLs redirect (302)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/"
+
+    def count(self, key: str, value: int = 1) -> None:
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + value
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {"connections": 0, "requests": 0}
+
+    def take_failure(self, counter: str = "failing_part_uploads") -> bool:
+        with self._lock:
+            if getattr(self, counter) <= 0:
+                return False
+            setattr(self, counter, getattr(self, counter) - 1)
+            return True
+
+    def put_file(self, path: str, content: bytes, mtime: float | None = None) -> None:
+        self.files[path] = (content, time.time() if mtime is None else mtime)
+
+    def __enter__(self) -> "FilesApiStub":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class FilesApiStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: FilesApiStub
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.count("connections")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(
+        self,
+        status: int,
+        body: bytes = b"",
+        content_type: str = "application/json",
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        if self.server.latency_s > 0:
+            time.sleep(self.server.latency_s)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+            self.server.count("bytes_sent", len(body))
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while size := int(self.rfile.readline().split(b";")[0], 16):
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            self.rfile.readline()
+            body = b"".join(chunks)
+        else:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.count("bytes_received", len(body))
+        encoding = self.headers.get("Content-Encoding", "identity")
+        if encoding == "gzip":
+            return zlib.decompress(body, wbits=31)
+        if encoding == "zstd":
+            import zstandard
+
+            return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        return body
+
+    def _path(self) -> str:
+        return unquote(urlparse(self.path).path.lstrip("/"))
+
+    def do_GET(self) -> None:
+        self.server.count("requests")
+        url = urlparse(self.path)
+        if url.path.startswith(REDIRECT_PATH_PREFIX):
+            location = DOWNLOAD_PATH_PREFIX + url.path[len(REDIRECT_PATH_PREFIX) :]
+            if url.query:
+                location += f"?{url.query}"
+            self._send(302, headers={"Location": location})
+        elif url.path.startswith(DOWNLOAD_PATH_PREFIX):
+            expires = parse_qs(url.query).get("expires")
+            if expires is not None and float(expires[0]) < time.time():
+                self._send(403, b'{"detail": "Request has expired"}')
+                return
+            self._download(unquote(url.path[len(DOWNLOAD_PATH_PREFIX) :]))
+        else:
+            self._list(parse_qs(url.query))
+
+    def _download(self, path: str) -> None:
+        self.server.count("downloads")
+        if path not in self.server.files:
+            self._send(404, b'{"detail": "Not found"}')
+            return
+        content, mtime = self.server.files[path]
+        etag = f'"{hashlib.md5(content).hexdigest()}"'
+        headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+        match = re.match(r"^bytes=(\d+)-$", self.headers.get("Range", ""))
+        if match and self.headers.get("If-Range", etag) == etag:
+            start = int(match.group(1))
+            if start >= len(content):
+                self._send(416, headers={"Content-Range": f"bytes */{len(content)}"})
+                return
+            headers["Content-Range"] = (
+                f"bytes {start}-{len(content) - 1}/{len(content)}"
+            )
+            self._send(206, content[start:], "application/octet-stream", headers)
+            return
+        self._send(200, content, "application/octet-stream", headers)
+
+    def _list(self, query: dict[str, list[str]]) -> None:
+        self.server.count("list_requests")
+        prefix = query.get("prefix", [""])[0]
+        limit = int(query.get("limit", ["100"])[0])
+        start = int(query.get("continuation_token", ["0"])[0])
+        if start > 0 and self.server.take_failure("failing_list_pages"):
+            self._send(503, b"{}")
+            return
+        paths = sorted(path for path in self.server.files if path.startswith(prefix))
+        data = []
+        for path in paths[start : start + limit]:
+            content, mtime = self.server.files[path]
+            data.append(
+                {
+                    "name": path.split("/")[-1],
+                    "path": path,
+                    "lastModified": datetime.fromtimestamp(
+                        mtime, tz=timezone.utc
+                    ).isoformat(),
+                    "url": self.server.base_url.rstrip("/")
+                    + (
+                        REDIRECT_PATH_PREFIX
+                        if self.server.redirect_downloads
+                        else DOWNLOAD_PATH_PREFIX
+                    )
+                    + path,
+                    "size": len(content),
+                }
+            )
+        next_token = str(start + limit) if start + limit < len(paths) else None
+        page = {"data": data, "next_continuation_token": next_token}
+        # the ETag does not change with the expiry of the download URLs
+        etag = f'"{hashlib.md5(json.dumps(page).encode()).hexdigest()}"'
+        if self.server.download_url_ttl_s is not None:
+            expires = time.time() + self.server.download_url_ttl_s
+            for file in data:
+                file["url"] += f"?expires={expires}"
+        body = json.dumps(page).encode()
+        if not self.server.listing_etags:
+            self._send(200, body)
+            return
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count("not_modified")
+            self._send(304, headers={"ETag": etag})
+            return
+        self._send(200, body, headers={"ETag": etag})
+
+    def _query(self) -> dict[str, str]:
+        return {
+            key: values[0]
+            for key, values in parse_qs(urlparse(self.path).query).items()
+        }
+
+    def do_POST(self) -> None:
+        self.server.count("requests")
+        query = self._query()
+        body = self._read_body()
+        if query.get("action") == "create_multipart_upload":
+            upload_id = uuid.uuid4().hex
+            self.server.uploads[upload_id] = {}
+            self._send(200, json.dumps({"upload_id": upload_id}).encode())
+        elif query.get("action") == "delete_files":
+            if not self.server.bulk_delete:
+                self._send(404, b"{}")
+                return
+            for path in json.loads(body)["paths"]:
+                self.server.files.pop(path, None)
+            self._send(200, json.dumps({"errors": []}).encode())
+        elif query.get("action") == "complete_multipart_upload":
+            parts = self.server.uploads.pop(query["upload_id"], None)
+            if parts is None:
+                self._send(404, b"{}")
+                return
+            completed = json.loads(body)["parts"]
+            for part in completed:
+                content = parts.get(part["part_number"], b"")
+                if part["etag"] != f'"{hashlib.md5(content).hexdigest()}"':
+                    self._send(400, b"{}")
+                    return
+            self.server.put_file(
+                self._path(),
+                b"".join(parts[part["part_number"]] for part in completed),
+            )
+            self._send(200, b"{}")
+        else:
+            self._send(400, b"{}")
+
+    def do_PUT(self) -> None:
+        self.server.count("requests")
+        body = self._read_body()
+        query = self._query()
+        if "upload_id" in query:
+            self._put_part(query, body)
+            return
+        if "copy_from" in query:
+            self._copy(query["copy_from"])
+            return
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/"):
+            body = _form_data_file(content_type, body)
+        if query.get("extract") == "tar":
+            self._extract(body)
+        else:
+            self.server.put_file(self._path(), body)
+        self._send(200, b"{}")
+
+    def _copy(self, source_url: str) -> None:
+        source_path = unquote(urlparse(source_url).path.lstrip("/"))
+        source = self.server.files.get(source_path)
+        if source is None:
+            self._send(404, b"{}")
+            return
+        self.server.put_file(self._path(), source[0])
+        self._send(200, b"{}")
+
+    def _put_part(self, query: dict[str, str], body: bytes) -> None:
+        if self.server.take_failure():
+            self._send(503, b"{}")
+            return
+        parts = self.server.uploads.get(query["upload_id"])
+        if parts is None:
+            self._send(404, b"{}")
+            return
+        parts[int(query["part_number"])] = body
+        self.server.count("parts")
+        self._send(200, b"{}", headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+    def _extract(self, archive: bytes) -> None:
+        dir_path = self._path().rpartition("/")[0]
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            for member in tar:
+                f = tar.extractfile(member)
+                if f is not None:
+                    self.server.put_file(
+                        f"{dir_path}/{member.name}" if dir_path else member.name,
+                        f.read(),
+                    )
+
+    def do_DELETE(self) -> None:
+        self.server.count("requests")
+        upload_id = self._query().get("upload_id")
+        if upload_id is not None:
+            self.server.uploads.pop(upload_id, None)
+        else:
+            self.server.files.pop(self._path(), None)
+        self._send(204)
+
+
+def _form_data_file(content_type: str, body: bytes) -> bytes:
+    """Content of the (only) file of a multipart/form-data body, extracted without
+    copying the body more than once, so that large uploads can be received."""
+    boundary = content_type.partition("boundary=")[2].strip('"')
+    start = body.index(b"\r\n\r\n") + 4
+    end = body.rindex(f"\r\n--{boundary}--".encode())
+    return body[start:end]
@@ -42,20 +42,36 @@ def build_runner_core_config(config: Config):
         ),
         credentials=runner_job_data.credentials,
         enable=config.runner.enable,
+        http=config.runner.http,
         inference_api_url=runner_job_data.inference_api_url,
         project_dir=config.runner.project_dir,
         workflows=WorkflowsConfig(
             api_url=runner_job_data.workflows_api_url,
             dir=config.runner.workflows_dir,
             prefixes=runner_job_data.workflows,
+            max_concurrent_downloads=config.runner.max_concurrent_downloads,
+            cache=config.runner.workflows_cache,
+            listing_cache=config.runner.workflows_listing_cache,
         ),
         results=ResultsConfig(
             api_url=runner_job_data.results_api_url,
             dir=config.runner.results_dir,
+            max_concurrent_uploads=config.runner.max_concurrent_uploads,
+            compression=config.runner.results_compression,
+            multipart=config.runner.results_multipart,
+            dedup=config.runner.results_dedup,
+            incremental=config.runner.results_incremental,
+            bundle=config.runner.results_bundle,
         ),
         schedule_results=ScheduleResultsConfig(
             api_url=runner_job_data.schedule_results_api_url or "",
             dir=config.runner.schedule_results_dir,
+            max_concurrent_uploads=config.runner.max_concurrent_uploads,
+            compression=config.runner.results_compression,
+            multipart=config.runner.results_multipart,
+            dedup=config.runner.results_dedup,
+            incremental=config.runner.results_incremental,
+            bundle=config.runner.results_bundle,
         ),
         data=runner_job_data.data,
     )
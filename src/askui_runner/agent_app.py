@@ -41,16 +41,23 @@ def sync(
             help="Delete files that are not in source of truth",
         ),
     ] = False,
+    watch: Annotated[
+        bool,
+        typer.Option(
+            "--watch",
+            help="Keep syncing changed files after the initial sync until interrupted (Ctrl+C)",
+        ),
+    ] = False,
 ):
     config_dict = read_config_dict(config_json_or_config_file_path)
     config = AgentsConfig.model_validate(config_dict)
     container = AgentsContainer(config=config)
 
     if direction == "down":
-        container.file_service.sync("remote", dry, delete)
+        container.file_service.sync("remote", dry, delete, watch)
         return
     if direction == "up":
-        container.file_service.sync("local", dry, delete)
+        container.file_service.sync("local", dry, delete, watch)
         return
 
 
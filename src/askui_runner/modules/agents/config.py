@@ -1,8 +1,11 @@
 import os
 from pathlib import Path
+from typing import Literal
 from pydantic import BaseModel, Field, HttpUrl
 from pydantic_settings import SettingsConfigDict
 
+from ..core.models import HttpConfig
+
 
 class WorkspaceCredentials(BaseModel):
     workspace_id: str = Field(
@@ -17,6 +20,23 @@ class WorkspaceCredentials(BaseModel):
     )
 
 
+class AgentFileSyncWatchConfig(BaseModel):
+    poll_interval_s: float = Field(
+        30,
+        gt=0,
+        description="Interval in seconds for listing the remote files (and scanning the local files if file system events are not available) in watch mode.",
+    )
+    debounce_s: float = Field(
+        2,
+        ge=0,
+        description="Time in seconds a local file must not change before it is synced in watch mode.",
+    )
+    mode: Literal["auto", "native", "polling"] = Field(
+        "auto",
+        description='How to detect changes of local files in watch mode: "native" file system events (inotify on Linux; requires the "watchdog" package), "polling" or "auto", i.e., native events if available.',
+    )
+
+
 class AgentFileSyncConfig(BaseModel):
     base_url: HttpUrl = Field(
         HttpUrl("https://workspaces.askui.com/api/v1/files/"),
@@ -27,6 +47,42 @@ class AgentFileSyncConfig(BaseModel):
         description="Local directory for storing files.",
         examples=["/home/user/.askui", "C:\\Users\\user\\.askui"],
     )
+    max_concurrent_downloads: int = Field(
+        8, ge=1, description="Maximum number of files downloaded concurrently."
+    )
+    max_concurrent_uploads: int = Field(
+        8, ge=1, description="Maximum number of files uploaded concurrently."
+    )
+    max_concurrent_deletes: int = Field(
+        8,
+        ge=1,
+        description="Maximum number of remote files (or batches of remote files) deleted concurrently.",
+    )
+    bulk_delete_batch_size: int | None = Field(
+        None,
+        ge=1,
+        description="Maximum number of remote files deleted with a single request; requires support of bulk deletes by the files API (otherwise, files are deleted one by one); disabled if not set.",
+    )
+    streaming: bool = Field(
+        False,
+        description="Whether to sync by merging the local and remote files sorted by path instead of listing all of them first so that transfers start right away and memory does not grow with the number of files; for very large directories. Stale files are deleted after all transfers.",
+    )
+    use_manifest: bool = Field(
+        True,
+        description="Whether to persist the state of the last sync (in the local storage base directory) so that files unchanged since then are skipped cheaply.",
+    )
+    use_listing_cache: bool = Field(
+        False,
+        description="Whether to cache pages of listings of remote files (in the local storage base directory) and request them conditionally (If-None-Match/If-Modified-Since) so that pages not modified since are not sent again; pages are only cached if the files API sends validators (ETag/Last-Modified).",
+    )
+    hash_contents: bool = Field(
+        False,
+        description="Whether to compare the content hashes of local files whose metadata changed since the last sync so that files touched without changing their content are not transferred. Requires `use_manifest`.",
+    )
+    watch: AgentFileSyncWatchConfig = Field(
+        default_factory=AgentFileSyncWatchConfig,  # type: ignore
+        description="Configuration for keeping files in sync with `--watch`",
+    )
 
 
 class AgentsConfig(BaseModel):
@@ -35,4 +91,8 @@ class AgentsConfig(BaseModel):
         default_factory=AgentFileSyncConfig,  # type: ignore
         description="Configuration for syncing files",
     )
+    http: HttpConfig = Field(
+        default_factory=HttpConfig,  # type: ignore
+        description="Configuration of the HTTP connections to the files API",
+    )
     model_config = SettingsConfigDict(env_prefix="askui_runner_agents_", extra="allow")
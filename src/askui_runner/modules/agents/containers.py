@@ -1,9 +1,13 @@
+import os
 from functools import cached_property
 from typing import Dict
 
 from .file_service import FileService
 from ..core.infrastructure.askui import AskUiAccessToken
 from ..core.infrastructure.files.askui import AskUiFilesService
+from ..core.infrastructure.files.bulk_delete import BulkDelete
+from ..core.infrastructure.files.listing import ListingCache
+from ..core.infrastructure.http import PooledHttpSession, get_http_session
 
 
 from .config import AgentsConfig
@@ -21,14 +25,44 @@ class AgentsContainer:
     def _base_http_headers(self) -> Dict[str, str]:
         return {"Authorization": self._access_token.to_auth_header()}
 
+    @cached_property
+    def _http_session(self) -> PooledHttpSession:
+        return get_http_session(self._config.http)
+
     @cached_property
     def file_service(self) -> FileService:
         files_sync_service = AskUiFilesService(
             base_url=str(self._config.sync.base_url),
             headers=self._base_http_headers,
+            session=self._http_session,
+            max_concurrent_downloads=self._config.sync.max_concurrent_downloads,
+            max_concurrent_uploads=self._config.sync.max_concurrent_uploads,
+            max_concurrent_deletes=self._config.sync.max_concurrent_deletes,
+            streaming_sync=self._config.sync.streaming,
+            sync_manifest_dir=(
+                os.path.join(self._config.sync.local_storage_base_dir, "SyncManifests")
+                if self._config.sync.use_manifest
+                else None
+            ),
+            hash_contents=self._config.sync.hash_contents,
+            listing_cache=(
+                ListingCache(
+                    os.path.join(
+                        self._config.sync.local_storage_base_dir, "ListingCache"
+                    )
+                )
+                if self._config.sync.use_listing_cache
+                else None
+            ),
+            bulk_delete=(
+                BulkDelete(batch_size=self._config.sync.bulk_delete_batch_size)
+                if self._config.sync.bulk_delete_batch_size is not None
+                else None
+            ),
         )
         return FileService(
             files_sync_service=files_sync_service,
             local_storage_base_dir=self._config.sync.local_storage_base_dir,
             workspace_id=self._config.credentials.workspace_id,
+            watch_config=self._config.sync.watch,
         )
@@ -2,6 +2,8 @@ import os
 from pathlib import Path
 from typing import Literal
 from ..core.infrastructure.files.files import FilesSyncService
+from ..core.infrastructure.files.utils import remove_stale_temporary_files
+from .config import AgentFileSyncWatchConfig
 
 
 class FileService:
@@ -10,8 +12,10 @@ class FileService:
         files_sync_service: FilesSyncService,
         local_storage_base_dir: Path,
         workspace_id: str,
+        watch_config: AgentFileSyncWatchConfig,
     ) -> None:
         self._files_sync_service = files_sync_service
+        self._watch_config = watch_config
         self._local_storage_dir = os.path.join(
             local_storage_base_dir, "Workspaces", workspace_id, "Agents"
         )
@@ -28,12 +32,33 @@ class FileService:
         )
 
     def sync(
-        self, source_of_truth: Literal["local", "remote"], dry: bool, delete: bool
+        self,
+        source_of_truth: Literal["local", "remote"],
+        dry: bool,
+        delete: bool,
+        watch: bool = False,
     ) -> None:
+        """Sync the agent files once or, with `watch`, keep them in sync until the
+        process is interrupted."""
+        local_dir_path = self._build_local_dir_path_to_prevent_overriding(
+            self._remote_agents_path
+        )
+        if not dry:
+            remove_stale_temporary_files(local_dir_path)
+        if watch:
+            self._files_sync_service.watch(
+                local_dir_path=local_dir_path,
+                source_of_truth=source_of_truth,
+                remote_dir_path=self._remote_agents_path,
+                dry=dry,
+                delete=delete,
+                poll_interval_s=self._watch_config.poll_interval_s,
+                debounce_s=self._watch_config.debounce_s,
+                watch_mode=self._watch_config.mode,
+            )
+            return
         self._files_sync_service.sync(
-            local_dir_path=self._build_local_dir_path_to_prevent_overriding(
-                self._remote_agents_path
-            ),
+            local_dir_path=local_dir_path,
             source_of_truth=source_of_truth,
             remote_dir_path=self._remote_agents_path,
             dry=dry,
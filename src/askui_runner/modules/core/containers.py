@@ -1,19 +1,37 @@
 from functools import cached_property
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
 
 from .infrastructure.askui import AskUiAccessToken
 from .infrastructure.files.askui import AskUiFilesService
+from .infrastructure.files.bundle import DEFAULT_MAX_BUNDLE_SIZE_IN_BYTES
+from .infrastructure.files.cache import FilesCache
+from .infrastructure.files.compression import UploadCompression
+from .infrastructure.files.dedup import UploadDeduplicator
+from .infrastructure.files.files import BlockingFilesService
+from .infrastructure.files.listing import ListingCache
+from .infrastructure.files.multipart import MultipartUpload
+from .infrastructure.http import PooledHttpSession, get_http_session
 from .infrastructure.results_upload.askui import (
     AskUiResultsUploadService,
-    ChainedResultsUploadService,
+    FanOutResultsUploadService,
+)
+from .infrastructure.results_upload.incremental import (
+    IncrementalResultsUploadService,
 )
 from .infrastructure.runner.askui import (
     AskUIJestRunner,
     AskUIVisionAgentExperimentsRunner,
 )
 from .infrastructure.workflows_download.askui import AskUiWorkflowsDownloadService
-from .models import CoreConfig
+from .models import (
+    CoreConfig,
+    MultipartUploadConfig,
+    ResultsConfig,
+    UploadBundlingConfig,
+    UploadCompressionConfig,
+    UploadDeduplicationConfig,
+)
 from .runner import ResultsUpload
 
 
@@ -29,11 +47,129 @@ class CoreContainer:
     def _base_http_headers(self) -> Dict[str, str]:
         return {"Authorization": self._access_token.to_auth_header()}
 
+    @cached_property
+    def _http_session(self) -> PooledHttpSession:
+        return get_http_session(self._config.http)
+
+    @cached_property
+    def _workflows_files_cache(self) -> Optional[FilesCache]:
+        cache_config = self._config.workflows.cache
+        if cache_config is None:
+            return None
+        return FilesCache(
+            dir_path=cache_config.dir,
+            max_size_in_bytes=cache_config.max_size_in_bytes,
+            link=cache_config.link,
+        )
+
+    @cached_property
+    def _workflows_listing_cache(self) -> Optional[ListingCache]:
+        cache_config = self._config.workflows.listing_cache
+        if cache_config is None:
+            return None
+        return ListingCache(
+            dir_path=cache_config.dir,
+            max_entries=cache_config.max_entries,
+        )
+
+    @cached_property
+    def _upload_deduplicators(self) -> Dict[Optional[str], UploadDeduplicator]:
+        """Deduplicators by cache file so that results and schedule results that
+        share a cache file also share the deduplicator."""
+        return {}
+
+    def _get_upload_deduplicator(
+        self, config: Optional[UploadDeduplicationConfig]
+    ) -> Optional[UploadDeduplicator]:
+        if config is None:
+            return None
+        if config.cache_file not in self._upload_deduplicators:
+            self._upload_deduplicators[config.cache_file] = UploadDeduplicator(
+                cache_file_path=config.cache_file,
+                max_cache_entries=config.max_cache_entries,
+            )
+        return self._upload_deduplicators[config.cache_file]
+
+    def _create_files_service(
+        self,
+        base_url: str,
+        max_concurrent_downloads: int = 1,
+        max_concurrent_uploads: int = 1,
+        cache: Optional[FilesCache] = None,
+        listing_cache: Optional[ListingCache] = None,
+        compression: Optional[UploadCompressionConfig] = None,
+        multipart: Optional[MultipartUploadConfig] = None,
+        dedup: Optional[UploadDeduplicationConfig] = None,
+        bundling: Optional[UploadBundlingConfig] = None,
+    ) -> Union[AskUiFilesService, BlockingFilesService]:
+        bundle_max_file_size_in_bytes: Optional[int] = None
+        max_bundle_size_in_bytes = DEFAULT_MAX_BUNDLE_SIZE_IN_BYTES
+        if bundling is not None:
+            bundle_max_file_size_in_bytes = bundling.max_file_size_in_bytes
+            max_bundle_size_in_bytes = bundling.max_bundle_size_in_bytes
+        upload_compression = (
+            None
+            if compression is None
+            else UploadCompression(
+                algorithm=compression.algorithm,
+                extensions=compression.extensions,
+                mime_types=compression.mime_types,
+                min_size_in_bytes=compression.min_size_in_bytes,
+                level=compression.level,
+            )
+        )
+        multipart_upload = (
+            None
+            if multipart is None
+            else MultipartUpload(
+                threshold_in_bytes=multipart.threshold_in_bytes,
+                part_size_in_bytes=multipart.part_size_in_bytes,
+                max_concurrent_parts=multipart.max_concurrent_parts,
+            )
+        )
+        if self._config.http.async_client:
+            # httpx is an optional dependency
+            from .infrastructure.files.askui_async import AsyncAskUiFilesService
+
+            return BlockingFilesService(
+                AsyncAskUiFilesService(
+                    base_url=base_url,
+                    headers=self._base_http_headers,
+                    http_config=self._config.http,
+                    max_concurrent_downloads=max_concurrent_downloads,
+                    max_concurrent_uploads=max_concurrent_uploads,
+                    cache=cache,
+                    listing_cache=listing_cache,
+                    compression=upload_compression,
+                    multipart=multipart_upload,
+                    dedup=self._get_upload_deduplicator(dedup),
+                    request_guard=self._http_session.guard,
+                    bundle_max_file_size_in_bytes=bundle_max_file_size_in_bytes,
+                    max_bundle_size_in_bytes=max_bundle_size_in_bytes,
+                )
+            )
+        return AskUiFilesService(
+            base_url=base_url,
+            headers=self._base_http_headers,
+            session=self._http_session,
+            max_concurrent_downloads=max_concurrent_downloads,
+            max_concurrent_uploads=max_concurrent_uploads,
+            cache=cache,
+            listing_cache=listing_cache,
+            compression=upload_compression,
+            multipart=multipart_upload,
+            dedup=self._get_upload_deduplicator(dedup),
+            bundle_max_file_size_in_bytes=bundle_max_file_size_in_bytes,
+            max_bundle_size_in_bytes=max_bundle_size_in_bytes,
+        )
+
     @cached_property
     def _workflows_download_service(self) -> AskUiWorkflowsDownloadService:
-        files_download_service = AskUiFilesService(
+        files_download_service = self._create_files_service(
             base_url=self._config.workflows.api_url,
-            headers=self._base_http_headers,
+            max_concurrent_downloads=self._config.workflows.max_concurrent_downloads,
+            cache=self._workflows_files_cache,
+            listing_cache=self._workflows_listing_cache,
         )
         return AskUiWorkflowsDownloadService(
             files_download_service=files_download_service,
@@ -41,37 +177,47 @@ class CoreContainer:
             remote_workflows_paths=self._config.workflows.prefixes,
         )
 
-    @cached_property
-    def _results_upload_service(self) -> AskUiResultsUploadService:
-        files_upload_service = AskUiFilesService(
-            base_url=self._config.results.api_url,
-            headers=self._base_http_headers,
+    def _create_results_upload_service(self, config: ResultsConfig) -> ResultsUpload:
+        files_upload_service = self._create_files_service(
+            base_url=config.api_url,
+            max_concurrent_uploads=config.max_concurrent_uploads,
+            compression=config.compression,
+            multipart=config.multipart,
+            dedup=config.dedup,
+            bundling=config.bundle,
         )
-        return AskUiResultsUploadService(
+        results_upload_service = AskUiResultsUploadService(
             files_upload_service=files_upload_service,
-            results_dir=self._config.results.dir,
+            results_dir=config.dir,
+        )
+        if config.incremental is None:
+            return results_upload_service
+        return IncrementalResultsUploadService(
+            files_upload_service=files_upload_service,
+            results_upload_service=results_upload_service,
+            results_dir=config.dir,
+            max_concurrent_uploads=config.max_concurrent_uploads,
+            poll_interval_s=config.incremental.poll_interval_s,
+            stable_after_s=config.incremental.stable_after_s,
+            watch_mode=config.incremental.watch,
         )
 
     @cached_property
-    def _schedule_results_upload_service(self) -> Optional[AskUiResultsUploadService]:
+    def _results_upload_service(self) -> ResultsUpload:
+        return self._create_results_upload_service(self._config.results)
+
+    @cached_property
+    def _schedule_results_upload_service(self) -> Optional[ResultsUpload]:
         if self._config.schedule_results is None:
             return None
-
-        files_upload_service = AskUiFilesService(
-            base_url=self._config.schedule_results.api_url,
-            headers=self._base_http_headers,
-        )
-        return AskUiResultsUploadService(
-            files_upload_service=files_upload_service,
-            results_dir=self._config.schedule_results.dir,
-        )
+        return self._create_results_upload_service(self._config.schedule_results)
 
     @cached_property
-    def _chained_results_upload_service(self) -> ChainedResultsUploadService:
+    def _fan_out_results_upload_service(self) -> FanOutResultsUploadService:
         services: List[ResultsUpload] = [self._results_upload_service]
         if self._schedule_results_upload_service is not None:
             services.append(self._schedule_results_upload_service)
-        return ChainedResultsUploadService(
+        return FanOutResultsUploadService(
             services=services,
         )
 
@@ -81,7 +227,7 @@ class CoreContainer:
             return AskUIJestRunner(
                 config=self._config,
                 workflows_download_service=self._workflows_download_service,
-                results_upload_service=self._chained_results_upload_service,
+                results_upload_service=self._fan_out_results_upload_service,
             )
         elif self._config.runner_type == "askui_vision_agent_experiments_runner":
             return AskUIVisionAgentExperimentsRunner(
@@ -0,0 +1,180 @@
+import collections
+import logging
+import threading
+import time
+from typing import Literal, Optional
+
+import requests
+
+from ..models import CircuitBreakerConfig, RetryBudgetConfig
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the circuit of its host is open.
+
+    It is deliberately not retried.
+    """
+
+    def __init__(self, host: str, retry_in_s: float):
+        self.host = host
+        self.retry_in_s = retry_in_s
+        super().__init__(
+            f"Requests to {host} are failing, not sending any for {retry_in_s:.0f}s"
+        )
+
+
+class CircuitBreaker:
+    """Fails requests to a host fast once too many of them fail.
+
+    The circuit opens if at least `failure_rate_threshold` of at least
+    `min_requests` requests within the last `window_s` seconds failed, i.e., got a
+    408/429/5xx response or no response at all. While it is open, requests raise a
+    `CircuitOpenError` without being sent. Every `open_duration_s` seconds, a
+    single request is let through to probe whether the host recovered: if it
+    succeeds, the circuit closes; otherwise, it stays open. A probe aborted for
+    other reasons, e.g., as it was cancelled, counts as failed so that the next
+    one is let through after another `open_duration_s` seconds.
+    """
+
+    def __init__(self, host: str, config: CircuitBreakerConfig) -> None:
+        self._host = host
+        self._config = config
+        self._lock = threading.Lock()
+        self._state: CircuitState = "closed"
+        self._outcomes: collections.deque[tuple[float, bool]] = collections.deque()
+        self._failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    def before_request(self) -> None:
+        """Raises a `CircuitOpenError` if the request must not be sent."""
+        with self._lock:
+            if self._state == "closed":
+                return
+            retry_in_s = (
+                self._opened_at + self._config.open_duration_s - time.monotonic()
+            )
+            if self._state == "open" and retry_in_s <= 0:
+                logging.info(f"Probing whether {self._host} recovered ...")
+                self._state = "half_open"
+                return
+            raise CircuitOpenError(self._host, max(retry_in_s, 0))
+
+    def record_aborted(self) -> None:
+        """Records a request that ended without a response for reasons unrelated
+        to the host, e.g., as it was cancelled or the response was invalid."""
+        with self._lock:
+            if self._state == "half_open":
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._state == "half_open":
+                if success:
+                    logging.info(f"{self._host} recovered, closing circuit")
+                    self._state = "closed"
+                    self._outcomes.clear()
+                    self._failures = 0
+                else:
+                    self._state = "open"
+                    self._opened_at = now
+                return
+            if self._state == "open":
+                return  # response to a request sent before the circuit opened
+            self._outcomes.append((now, success))
+            self._failures += not success
+            while self._outcomes and self._outcomes[0][0] < now - self._config.window_s:
+                _, succeeded = self._outcomes.popleft()
+                self._failures -= not succeeded
+            if (
+                len(self._outcomes) >= self._config.min_requests
+                and self._failures / len(self._outcomes)
+                >= self._config.failure_rate_threshold
+            ):
+                logging.warning(
+                    f"{self._failures} of the last {len(self._outcomes)} requests to "
+                    f"{self._host} failed, opening circuit for "
+                    f"{self._config.open_duration_s:.0f}s"
+                )
+                self._state = "open"
+                self._opened_at = now
+
+
+class RetryBudget:
+    """Limits retries to a share of all requests across all clients.
+
+    Every request deposits `ratio` tokens and every retry withdraws one. On top,
+    `min_retries_per_s` tokens are deposited per second so that retries are
+    possible after few requests. At most `max_tokens` are kept.
+    """
+
+    def __init__(self, config: RetryBudgetConfig) -> None:
+        self._config = config
+        self._lock = threading.Lock()
+        self._tokens = float(config.max_tokens)
+        self._updated_at = time.monotonic()
+        self._exhausted = False
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens = min(
+                self._tokens + self._config.ratio, float(self._config.max_tokens)
+            )
+
+    def try_withdraw(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                if not self._exhausted:
+                    logging.warning(
+                        "Retry budget exhausted, not retrying failed requests"
+                    )
+                    self._exhausted = True
+                return False
+            self._tokens -= 1
+            self._exhausted = False
+            return True
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self._tokens + (now - self._updated_at) * self._config.min_retries_per_s,
+            float(self._config.max_tokens),
+        )
+        self._updated_at = now
+
+
+_lock = threading.Lock()
+_circuit_breakers: dict[str, CircuitBreaker] = {}
+_retry_budget: Optional[RetryBudget] = None
+
+
+def get_circuit_breaker(host: str, config: CircuitBreakerConfig) -> CircuitBreaker:
+    """The process-wide circuit breaker of `host`, created with `config` if there
+    is none yet."""
+    with _lock:
+        if host not in _circuit_breakers:
+            _circuit_breakers[host] = CircuitBreaker(host, config)
+        return _circuit_breakers[host]
+
+
+def use_retry_budget(config: RetryBudgetConfig) -> RetryBudget:
+    """Enables the process-wide retry budget, created with `config` if there is
+    none yet."""
+    global _retry_budget
+    with _lock:
+        if _retry_budget is None:
+            _retry_budget = RetryBudget(config)
+        return _retry_budget
+
+
+def get_retry_budget() -> Optional[RetryBudget]:
+    return _retry_budget
@@ -1,51 +1,161 @@
+import functools
+import hashlib
+import json
 import logging
 import os
-import re
-from typing import Dict, Generator, Literal, Optional, Union
-from urllib.parse import urlencode, urljoin, quote
-from datetime import datetime, timezone
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
 
-import requests
-from pydantic import AwareDatetime, BaseModel, Field, ConfigDict
-
-from .retry_utils import http_retry, handle_response_status
+from ...models import HttpConfig
+from ..http import PooledHttpSession
+from .bulk_delete import BulkDelete
+from .bundle import DEFAULT_MAX_BUNDLE_SIZE_IN_BYTES, TarBundle, group_into_bundles
+from .cache import FilesCache, build_cache_key
+from .compression import UploadCompression
+from .concurrency import TransferTask, prefetch, run_transfers
+from .dedup import UploadDeduplicator
+from .retry_utils import NonRetryableHTTPError, http_retry, handle_response_status
 from .files import FilesDownloadService, FilesUploadService, FilesSyncService
+from .listing import (
+    ListedDownloadUrls,
+    ListingCache,
+    ListingPageRequest,
+    ListingStats,
+)
+from .manifest import SqliteSyncManifest, SyncManifest
+from .merge import UnsortedError, chunked, merge_join
+from .multipart import MultipartUpload, UploadPart, read_part
+from .protocol import (
+    HIDDEN_FILES_MATCHER,
+    HIDDEN_FILES_PATTERNS,
+    UPLOAD_CHUNK_SIZE_IN_BYTES,
+    UPLOAD_REQUEST_TIMEOUT_IN_S,
+    DeduplicatedUpload,
+    build_bundle_upload,
+    build_copy_url,
+    build_file_url,
+    build_list_url,
+    build_local_file_path,
+    build_upload_url,
+    finish_upload,
+    is_bundled_file_uploaded_before,
+    is_hidden_file,
+    join_remote_path,
+    next_list_page_size,
+    plan_upload_dir,
+    record_bundle_uploaded,
+)
+from .records import FileRecord, FilesListPage, LocalFileRecord
+from .scan import ScannedFile, scan_files, scan_files_sorted
+from .utils import (
+    PartialDownload,
+    SizedStream,
+    atomic_write,
+    read_chunks,
+    stream_form_data,
+)
+from .watch import DirectoryWatcher, WatchMode
 
 
-class FileDto(BaseModel):
-    name: str = Field(..., description="Name of the file")
-    path: str = Field(..., description="Path of the file")
-    last_modified: AwareDatetime = Field(
-        ..., alias="lastModified", description="Last modified date of the file"
-    )
-    url: str = Field(..., description="URL of the file")
-    size: int = Field(..., description="Size of the file in bytes")
+SYNC_CHUNK_SIZE = 1000  # files planned at once by the streaming sync
+MAX_DELETIONS_IN_MEMORY = 10_000
+LIST_PAGES_PREFETCHED = 2
+MAX_WATCH_BACKOFF_IN_S = 300  # between listings retried after failures
 
-    model_config = ConfigDict(frozen=True, populate_by_name=True)
 
+class SyncDeletion(NamedTuple):
+    local: bool
+    relative_path: str
+    path: str
 
-class FilesListResponseDto(BaseModel):
-    data: list[FileDto] = Field(..., description="List of files")
-    next_continuation_token: Optional[str] = Field(
-        default=None, description="Token for pagination"
-    )
 
-    model_config = ConfigDict(frozen=True)
+def _watch_backoff_s(poll_interval_s: float, failures: int) -> float:
+    """Delay before listing again after `failures` consecutive failed listings,
+    doubling from the poll interval up to `MAX_WATCH_BACKOFF_IN_S`."""
+    return min(
+        poll_interval_s * 2 ** min(failures - 1, 16),
+        max(poll_interval_s, MAX_WATCH_BACKOFF_IN_S),
+    )
 
 
-REQUEST_TIMEOUT_IN_S = 60
-UPLOAD_REQUEST_TIMEOUT_IN_S = 3600  # allows for uploading large files
+def _changed_paths(
+    files: Mapping[str, FileRecord], listed_files: Mapping[str, FileRecord]
+) -> set[str]:
+    """Relative paths of the files added, removed or changed (by size or last
+    modification) according to a new listing."""
+    changed = files.keys() ^ listed_files.keys()
+    for relative_path, listed_file in listed_files.items():
+        file = files.get(relative_path)
+        if file is not None and (
+            file.size != listed_file.size
+            or file.last_modified != listed_file.last_modified
+        ):
+            changed.add(relative_path)
+    return changed
 
 
 class AskUiFilesService(FilesUploadService, FilesDownloadService, FilesSyncService):
-    HIDDEN_FILES_PATTERNS = [
-        r"^workspaces/[^/]+/test-cases/\.askui/.+$",
-    ]
+    HIDDEN_FILES_PATTERNS = HIDDEN_FILES_PATTERNS
+    _HIDDEN_FILES_MATCHER = HIDDEN_FILES_MATCHER
 
-    def __init__(self, base_url: str, headers: dict[str, str]):
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict[str, str],
+        session: Optional[PooledHttpSession] = None,
+        max_concurrent_downloads: int = 1,
+        max_concurrent_uploads: int = 1,
+        max_concurrent_deletes: int = 1,
+        streaming_sync: bool = False,
+        sync_manifest_dir: Optional[str] = None,
+        hash_contents: bool = False,
+        cache: Optional[FilesCache] = None,
+        list_page_size: int = 100,
+        listing_cache: Optional[ListingCache] = None,
+        compression: Optional[UploadCompression] = None,
+        multipart: Optional[MultipartUpload] = None,
+        dedup: Optional[UploadDeduplicator] = None,
+        bundle_max_file_size_in_bytes: Optional[int] = None,
+        max_bundle_size_in_bytes: int = DEFAULT_MAX_BUNDLE_SIZE_IN_BYTES,
+        bulk_delete: Optional[BulkDelete] = None,
+    ):
         self._disabled = base_url == ""
         self._base_url = base_url.rstrip("/")
         self._headers = headers
+        self._session = session or PooledHttpSession(HttpConfig())
+        self._max_concurrent_downloads = max_concurrent_downloads
+        self._max_concurrent_uploads = max_concurrent_uploads
+        self._max_concurrent_deletes = max_concurrent_deletes
+        self._streaming_sync = streaming_sync
+        self._sync_manifest_dir = sync_manifest_dir
+        self._hash_contents = hash_contents
+        self._cache = cache
+        self._list_page_size = list_page_size
+        self._listing_cache = listing_cache
+        self._listed_download_urls = ListedDownloadUrls()
+        self._compression = compression
+        self._multipart = multipart
+        self._dedup = dedup
+        self._bundle_max_file_size_in_bytes = bundle_max_file_size_in_bytes
+        self._max_bundle_size_in_bytes = max_bundle_size_in_bytes
+        self._bulk_delete = bulk_delete
+        self._bulk_delete_supported = True
+        self._bulk_delete_lock = threading.Lock()
 
     def download(self, local_dir_path: str, remote_path: str = "") -> None:
         """Download files from S3.
@@ -56,27 +166,122 @@ class AskUiFilesService(FilesUploadService, FilesDownloadService, FilesSyncServi
         """
         if self._disabled:
             return
-        prefix = remote_path.lstrip("/")
-        for content in self._list_remote_objects(prefix):
-            if prefix == content.path:  # is a file
-                relative_remote_path = content.name
-            else:  # is a prefix, e.g., folder
-                relative_remote_path = content.path[len(prefix) :].lstrip("/")
-            local_file_path = os.path.join(
-                local_dir_path, *relative_remote_path.split("/")
+        try:
+            run_transfers(
+                self._build_download_tasks(local_dir_path, remote_path.lstrip("/")),
+                max_workers=self._max_concurrent_downloads,
+                throttle=self._session.throttle,
             )
-            self._download_file(content.url, local_file_path, content.last_modified)
+        finally:
+            if self._cache is not None:
+                self._cache.evict()
+
+    def _build_download_tasks(
+        self, local_dir_path: str, prefix: str
+    ) -> Generator[TransferTask, None, None]:
+        # Pages from the listing cache have no download URLs, so they only save
+        # requests if the files cache makes downloading most of their files
+        # unnecessary; otherwise, every page would be listed again.
+        listing = self._list_remote_objects(prefix, conditional=self._cache is not None)
+        for content in listing:
+            local_file_path = build_local_file_path(local_dir_path, prefix, content)
+            yield (
+                content.path,
+                functools.partial(self._download_file_cached, content, local_file_path),
+            )
+
+    def _download_file_cached(self, file: FileRecord, local_file_path: str) -> None:
+        if self._cache is None:
+            self._download_listed_file(file, local_file_path)
+            return
+        key = build_cache_key(file.path, file.last_modified.timestamp(), file.size)
+        if self._cache.materialize(key, local_file_path):
+            return
+        self._download_listed_file(file, local_file_path)
+        self._cache.store(key, local_file_path)
+
+    def _download_listed_file(
+        self, file: FileRecord, local_file_path: str, dry: bool = False
+    ) -> None:
+        """Download a listed file, listing it again for a (fresh) download URL if it
+        has none, as it was listed on a page from the listing cache, or if its
+        download URL was rejected (403), e.g., as it expired."""
+        if dry:
+            self._download_file(file.url, local_file_path, file.last_modified, dry)
+            return
+        try:
+            self._download_file(
+                self._download_url(file), local_file_path, file.last_modified
+            )
+        except NonRetryableHTTPError as error:
+            if not ListedDownloadUrls.is_rejected(error.status_code, file):
+                raise
+            logging.info(f"Download URL of {file.path} was rejected, listing it again")
+            self._download_file(
+                self._download_url(file, expired_url=file.url),
+                local_file_path,
+                file.last_modified,
+            )
+
+    def _download_url(self, file: FileRecord, expired_url: Optional[str] = None) -> str:
+        if file.listing_url is None or not ListedDownloadUrls.needs_relisting(
+            file.url, expired_url
+        ):
+            return file.url
+        urls = self._listed_download_urls
+        with urls.lock:
+            url = urls.get(file.listing_url, file.path)
+            if ListedDownloadUrls.needs_relisting(url, expired_url):
+                page = self._list_remote_page(
+                    file.listing_url, ListingStats(file.path), conditional=False
+                )
+                urls.add(file.listing_url, page)
+                url = urls.get(file.listing_url, file.path)
+            if url is None:  # moved to another page in the meantime
+                page = self._list_remote_page(
+                    build_list_url(self._base_url, file.path, limit=1),
+                    ListingStats(file.path),
+                    conditional=False,
+                )
+                url = ListedDownloadUrls.find(page, file.path)
+        return ListedDownloadUrls.assign(file, url)
 
     def upload(self, local_path: str, remote_dir_path: str = "") -> None:
+        self._upload(local_path, remote_dir_path)
+
+    def upload_files(
+        self,
+        local_dir_path: str,
+        files: Iterable[ScannedFile],
+        remote_dir_path: str = "",
+    ) -> None:
+        self._upload(local_dir_path, remote_dir_path, files)
+
+    def delete(self, remote_file_path: str) -> None:
+        if self._disabled:
+            return
+        self._delete_remote_file(remote_file_path.lstrip("/"))
+
+    def _upload(
+        self,
+        local_path: str,
+        remote_dir_path: str,
+        files: Optional[Iterable[ScannedFile]] = None,
+    ) -> None:
         if self._disabled:
             return
         r_dir_path = remote_dir_path.rstrip("/")
-        if os.path.isdir(local_path):
-            self._upload_dir(local_path, r_dir_path)
-        else:
-            self._upload_file(
-                local_path, f"{r_dir_path}/{os.path.basename(local_path)}"
-            )
+        is_dir = files is not None or os.path.isdir(local_path)
+        try:
+            if is_dir:
+                self._upload_dir(local_path, r_dir_path, files)
+            else:
+                self._upload_result_file(
+                    local_path,
+                    join_remote_path(r_dir_path, os.path.basename(local_path)),
+                )
+        finally:
+            finish_upload(self._compression, self._dedup, is_dir)
 
     def sync(
         self,
@@ -86,14 +291,19 @@ class AskUiFilesService(FilesUploadService, FilesDownloadService, FilesSyncServi
         dry: bool = False,
         delete: bool = True,
     ) -> None:
-        # List remote files
-        remote_files: Dict[str, FileDto] = {}
-
-        for file in self._list_remote_objects(remote_dir_path):
-            remote_files[file.path[len(remote_dir_path) :].lstrip("/")] = file
-
-        # List local files
-        local_files = self._list_local_files(local_dir_path)
+        if self._streaming_sync:
+            try:
+                self._sync_streaming(
+                    local_dir_path, remote_dir_path, source_of_truth, dry, delete
+                )
+                return
+            except UnsortedError as error:
+                logging.warning(
+                    f"Cannot sync by streaming as the files are not listed in order, listing all files first: {error}"
+                )
+        local_files, remote_files = self._list_sync_files(
+            local_dir_path, remote_dir_path
+        )
 
         if len(local_files) == 0 and len(remote_files) == 0:
             logging.warning("No files found locally or remotely. Skipping sync.")
@@ -113,58 +323,516 @@ class AskUiFilesService(FilesUploadService, FilesDownloadService, FilesSyncServi
             logging.debug(f"Remote directory: {remote_dir_path}")
             return
 
-        # Create lookup table
-        all_paths = set(local_files.keys()) | set(remote_files.keys())
-        if dry:
-            logging.info("Dry Run! Would perform following steps:")
-        for relative_path in sorted(all_paths):
-            local_file: Union[FileDto | None] = local_files.get(relative_path)
-            remote_file: Union[FileDto | None] = remote_files.get(relative_path)
-            remote_file_path = f"{remote_dir_path}/{relative_path}".replace("\\", "/")
-
-            # File exists in both locations
-            if local_file and remote_file:
-                local_mtime = local_file.last_modified
-                remote_mtime = remote_file.last_modified
-
-                if source_of_truth == "local" and (
-                    local_mtime > remote_mtime or local_file.size != remote_file.size
-                ):
-                    self._upload_file(
-                        local_file.path, remote_file_path, dry, strict=True
-                    )
+        manifest = self._load_sync_manifest(local_dir_path, remote_dir_path)
+        try:
+            self._sync_files(
+                manifest,
+                local_dir_path,
+                remote_dir_path,
+                local_files,
+                remote_files,
+                local_files.keys() | remote_files.keys(),
+                source_of_truth,
+                dry,
+                delete,
+            )
+        finally:
+            if not dry:
+                manifest.save()
+
+    def _sync_streaming(
+        self,
+        local_dir_path: str,
+        remote_dir_path: str,
+        source_of_truth: Literal["local", "remote"],
+        dry: bool,
+        delete: bool,
+    ) -> None:
+        """Sync by merging the local and the remote files, both sorted by path, so
+        that transfers start right away and the memory used does not grow with the
+        number of files.
+
+        The files are planned in chunks of `SYNC_CHUNK_SIZE` and transferred while
+        the next chunks are planned. Deletions are written to a temporary file and
+        applied once all files were planned, i.e., only if both listings turned out
+        to be sorted (otherwise, an `UnsortedError` is raised) and all transfers
+        succeeded. The manifest, if any, is kept on disk (see
+        `SqliteSyncManifest`).
+        """
+        local_files = (
+            (file.relative_path, LocalFileRecord(file.name, file.path, file.stat()))
+            for file in prefetch(
+                scan_files_sorted(local_dir_path), max_prefetched=SYNC_CHUNK_SIZE
+            )
+        )
+        remote_files = (
+            (file.path[len(remote_dir_path) :].lstrip("/"), file)
+            for file in self._list_remote_objects(remote_dir_path)
+        )
+        manifest = self._load_sync_manifest(
+            local_dir_path, remote_dir_path, streaming=True
+        )
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as deletions:
 
-                elif source_of_truth == "remote" and (
-                    remote_mtime > local_mtime or local_file.size != remote_file.size
+            def plan() -> Generator[TransferTask, None, None]:
+                for chunk in chunked(
+                    merge_join(local_files, remote_files), SYNC_CHUNK_SIZE
                 ):
-                    local_path = os.path.join(local_dir_path, relative_path)
-                    self._download_file(
-                        remote_file.url, local_path, remote_file.last_modified, dry
+                    manifest.hash_modified_files(
+                        (
+                            (relative_path, local_file.path, local_file.state)
+                            for relative_path, local_file, _ in chunk
+                            if local_file is not None
+                        ),
+                        max_workers=self._max_concurrent_uploads,
                     )
-                else:
-                    logging.info(f"Skip {relative_path} (no changes)")
-                    continue
+                    for relative_path, local_file, remote_file in chunk:
+                        action = self._plan_sync_file(
+                            manifest,
+                            local_dir_path,
+                            remote_dir_path,
+                            relative_path,
+                            local_file,
+                            remote_file,
+                            source_of_truth,
+                            dry,
+                            delete,
+                        )
+                        if isinstance(action, SyncDeletion):
+                            deletions.write(json.dumps(action) + "\n")
+                        elif action is not None:
+                            yield action
 
-            # File exists only locally
-            elif local_file:
-                if source_of_truth == "local":
-                    self._upload_file(
-                        local_file.path, remote_file_path, dry, strict=True
-                    )
-                elif delete:
-                    self._delete_local_file(local_file.path, dry)
-
-            # File exists only remotely
-            elif remote_file:
-                if source_of_truth == "remote":
-                    local_path = os.path.join(local_dir_path, relative_path)
-                    self._download_file(
-                        remote_file.url, local_path, remote_file.last_modified, dry
-                    )
-                elif delete:
-                    self._delete_remote_file(remote_file_path, dry)
+            if dry:
+                logging.info("Dry Run! Would perform following steps:")
+            try:
+                run_transfers(
+                    plan(),
+                    max_workers=(
+                        self._max_concurrent_uploads
+                        if source_of_truth == "local"
+                        else self._max_concurrent_downloads
+                    ),
+                    throttle=self._session.throttle,
+                )
+                deletions.seek(0)
+                for chunk in chunked(deletions, MAX_DELETIONS_IN_MEMORY):
+                    local_deletions: dict[str, str] = {}
+                    remote_deletions: dict[str, str] = {}
+                    for line in chunk:
+                        deletion = SyncDeletion(*json.loads(line))
+                        (local_deletions if deletion.local else remote_deletions)[
+                            deletion.relative_path
+                        ] = deletion.path
+                    for relative_path, local_file_path in local_deletions.items():
+                        self._delete_local_file(local_file_path, dry)
+                        manifest.remove(relative_path)
+                    self._delete_remote_files(manifest, remote_deletions, dry)
+            finally:
+                if not dry:
+                    manifest.save()
+                manifest.close()
+
+    def watch(
+        self,
+        local_dir_path: str,
+        remote_dir_path: str,
+        source_of_truth: Literal["local", "remote"],
+        dry: bool = False,
+        delete: bool = True,
+        poll_interval_s: float = 30,
+        debounce_s: float = 2,
+        watch_mode: WatchMode = "auto",
+        stopped: Optional[threading.Event] = None,
+    ) -> None:
+        """Sync the directories and keep them in sync until `stopped` is set (or
+        the process is interrupted).
+
+        After an initial sync, local files are synced once they have not changed
+        for `debounce_s` seconds, as reported by file system events (see
+        `DirectoryWatcher`) or, without them, as found by scanning the local
+        directory every `poll_interval_s` seconds. The remote directory is listed
+        every `poll_interval_s` seconds and only files that changed since the
+        previous listing are synced. If syncing or listing fails, all files are
+        compared again with the next listing; failed listings are retried with
+        exponential backoff.
+        """
+        stopped = stopped or threading.Event()
+        # Started before listing the files so that no change is missed
+        watcher = DirectoryWatcher([local_dir_path], watch_mode)
+        watcher.start()
+        watcher.take_changes()
+        manifest = self._load_sync_manifest(local_dir_path, remote_dir_path)
+        try:
+            local_files, remote_files = self._list_sync_files(
+                local_dir_path, remote_dir_path
+            )
+            sync = functools.partial(
+                self._sync_files_in_watch,
+                manifest,
+                local_dir_path,
+                remote_dir_path,
+                local_files,
+                source_of_truth=source_of_truth,
+                dry=dry,
+                delete=delete,
+            )
+            reconcile = not sync(remote_files, local_files.keys() | remote_files.keys())
+            logging.info(
+                f"Watching {local_dir_path} "
+                f"({'native events' if watcher.is_native else 'polling'}) and "
+                f"polling {remote_dir_path} every {poll_interval_s:.0f}s ..."
+            )
+            pending: dict[str, float] = {}  # time of the last change by local file
+            next_poll = time.monotonic() + poll_interval_s
+            rescan, next_rescan, failed_rescans, failed_polls = False, 0.0, 0, 0
+            while not stopped.wait(min(debounce_s, poll_interval_s) / 2):
+                now = time.monotonic()
+                changes = watcher.take_changes()
+                if changes is not None:
+                    for file_path in changes:
+                        relative_path = os.path.relpath(file_path, local_dir_path)
+                        if not relative_path.startswith(os.pardir):
+                            pending[relative_path.replace(os.sep, "/")] = now
+                elif watcher.is_native or now >= next_poll:
+                    # Changes are unknown, e.g., as a directory was moved
+                    rescan = True
+                if rescan and now >= next_rescan:
+                    try:
+                        listed_local_files = self._list_local_files(local_dir_path)
+                    except Exception as error:
+                        failed_rescans += 1
+                        next_rescan = now + _watch_backoff_s(
+                            poll_interval_s, failed_rescans
+                        )
+                        logging.warning(
+                            f"Listing local files failed, retrying in "
+                            f"{next_rescan - now:.0f}s: {error!r}"
+                        )
+                        reconcile = True
+                    else:
+                        rescan, failed_rescans = False, 0
+                        for relative_path in _changed_paths(
+                            local_files, listed_local_files
+                        ):
+                            pending[relative_path] = now
+                changed: set[str] = set()
+                for relative_path, changed_at in list(pending.items()):
+                    if now - changed_at >= debounce_s:
+                        del pending[relative_path]
+                        self._refresh_local_file(
+                            local_files, local_dir_path, relative_path
+                        )
+                        changed.add(relative_path)
+                if now >= next_poll:
+                    try:
+                        listed_remote_files = self._list_sync_files(
+                            local_dir_path, remote_dir_path, local=False
+                        )[1]
+                    except Exception as error:
+                        failed_polls += 1
+                        next_poll = now + _watch_backoff_s(
+                            poll_interval_s, failed_polls
+                        )
+                        logging.warning(
+                            f"Listing remote files failed, retrying in "
+                            f"{next_poll - now:.0f}s: {error!r}"
+                        )
+                        reconcile = True
+                    else:
+                        failed_polls = 0
+                        next_poll = now + poll_interval_s
+                        changed.update(
+                            _changed_paths(remote_files, listed_remote_files)
+                        )
+                        remote_files = listed_remote_files
+                        if reconcile:
+                            changed.update(local_files.keys() | remote_files.keys())
+                            reconcile = False
+                if changed and not sync(remote_files, changed):
+                    reconcile = True
+        finally:
+            watcher.stop()
+            if not dry:
+                manifest.save()
+
+    def _sync_files_in_watch(
+        self,
+        manifest: SyncManifest,
+        local_dir_path: str,
+        remote_dir_path: str,
+        local_files: dict[str, LocalFileRecord],
+        remote_files: dict[str, FileRecord],
+        relative_paths: Iterable[str],
+        source_of_truth: Literal["local", "remote"],
+        dry: bool,
+        delete: bool,
+    ) -> bool:
+        """Returns whether the files were synced successfully."""
+        try:
+            self._sync_files(
+                manifest,
+                local_dir_path,
+                remote_dir_path,
+                local_files,
+                remote_files,
+                relative_paths,
+                source_of_truth,
+                dry,
+                delete,
+            )
+            return True
+        except Exception as error:
+            logging.warning(f"Sync failed, retrying with the next listing: {error!r}")
+            return False
+        finally:
+            if not dry:
+                manifest.save()
+
+    def _list_sync_files(
+        self, local_dir_path: str, remote_dir_path: str, local: bool = True
+    ) -> tuple[dict[str, LocalFileRecord], dict[str, FileRecord]]:
+        """List the local files (in the background) and the remote files by their
+        relative paths."""
+        with ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="askui-files-scan"
+        ) as executor:
+            listing_local_files = (
+                executor.submit(self._list_local_files, local_dir_path)
+                if local
+                else None
+            )
+            remote_files: Dict[str, FileRecord] = {}
+            for file in self._list_remote_objects(remote_dir_path):
+                remote_files[file.path[len(remote_dir_path) :].lstrip("/")] = file
+            local_files = (
+                {} if listing_local_files is None else listing_local_files.result()
+            )
+        return local_files, remote_files
+
+    def _refresh_local_file(
+        self,
+        local_files: dict[str, LocalFileRecord],
+        local_dir_path: str,
+        relative_path: str,
+    ) -> None:
+        local_file_path = os.path.join(local_dir_path, relative_path)
+        try:
+            stat = os.stat(local_file_path)
+        except OSError:  # deleted
+            local_files.pop(relative_path, None)
+            return
+        if os.path.isfile(local_file_path):
+            local_files[relative_path] = LocalFileRecord(
+                name=os.path.basename(local_file_path),
+                path=local_file_path,
+                stat=stat,
+            )
+
+    def _sync_files(
+        self,
+        manifest: SyncManifest,
+        local_dir_path: str,
+        remote_dir_path: str,
+        local_files: dict[str, LocalFileRecord],
+        remote_files: dict[str, FileRecord],
+        relative_paths: Iterable[str],
+        source_of_truth: Literal["local", "remote"],
+        dry: bool,
+        delete: bool,
+    ) -> None:
+        """Sync the files at `relative_paths` given the local and remote files."""
+        relative_paths = sorted(relative_paths)
+        manifest.hash_modified_files(
+            (
+                (relative_path, file.path, file.state)
+                for relative_path in relative_paths
+                if (file := local_files.get(relative_path)) is not None
+            ),
+            max_workers=self._max_concurrent_uploads,
+        )
+
+        uploads: list[TransferTask] = []
+        downloads: list[TransferTask] = []
+        local_deletions: dict[str, str] = {}
+        remote_deletions: dict[str, str] = {}
+        if dry:
+            logging.info("Dry Run! Would perform following steps:")
+        for relative_path in relative_paths:
+            action = self._plan_sync_file(
+                manifest,
+                local_dir_path,
+                remote_dir_path,
+                relative_path,
+                local_files.get(relative_path),
+                remote_files.get(relative_path),
+                source_of_truth,
+                dry,
+                delete,
+            )
+            if isinstance(action, SyncDeletion):
+                deletions = local_deletions if action.local else remote_deletions
+                deletions[action.relative_path] = action.path
+            elif action is not None:
+                (uploads if source_of_truth == "local" else downloads).append(action)
+
+        run_transfers(
+            uploads,
+            max_workers=self._max_concurrent_uploads,
+            throttle=self._session.throttle,
+        )
+        run_transfers(
+            downloads,
+            max_workers=self._max_concurrent_downloads,
+            throttle=self._session.throttle,
+        )
+        # Deletes run last so that they do not hold up transfers and are skipped
+        # if a transfer failed
+        for relative_path, local_file_path in local_deletions.items():
+            self._delete_local_file(local_file_path, dry)
+            manifest.remove(relative_path)
+        self._delete_remote_files(manifest, remote_deletions, dry)
+
+    def _plan_sync_file(
+        self,
+        manifest: SyncManifest,
+        local_dir_path: str,
+        remote_dir_path: str,
+        relative_path: str,
+        local_file: Optional[LocalFileRecord],
+        remote_file: Optional[FileRecord],
+        source_of_truth: Literal["local", "remote"],
+        dry: bool,
+        delete: bool,
+    ) -> Union[TransferTask, SyncDeletion, None]:
+        """Decide how to sync a file: transfer it, delete it or nothing (None)."""
+        remote_file_path = f"{remote_dir_path}/{relative_path}".replace("\\", "/")
+
+        # File exists in both locations
+        if local_file and remote_file:
+            local_mtime = local_file.last_modified
+            remote_mtime = remote_file.last_modified
+
+            if manifest.is_unchanged(
+                relative_path,
+                local_file.state,
+                remote_mtime.timestamp(),
+                remote_file.size,
+            ):
+                logging.info(f"Skip {relative_path} (unchanged since last sync)")
+                return None
+
+            if source_of_truth == "local" and (
+                local_mtime > remote_mtime or local_file.size != remote_file.size
+            ):
+                return self._build_sync_upload_task(
+                    manifest, relative_path, local_file.path, remote_file_path, dry
+                )
+            if source_of_truth == "remote" and (
+                remote_mtime > local_mtime or local_file.size != remote_file.size
+            ):
+                return self._build_sync_download_task(
+                    manifest,
+                    relative_path,
+                    os.path.join(local_dir_path, relative_path),
+                    remote_file,
+                    dry,
+                )
+            logging.info(f"Skip {relative_path} (no changes)")
+            manifest.record(
+                relative_path,
+                local_file.path,
+                remote_mtime.timestamp(),
+                remote_file.size,
+            )
+            return None
+
+        # File exists only locally
+        if local_file:
+            if source_of_truth == "local":
+                return self._build_sync_upload_task(
+                    manifest, relative_path, local_file.path, remote_file_path, dry
+                )
+            if delete:
+                return SyncDeletion(True, relative_path, local_file.path)
+
+        # File exists only remotely
+        elif remote_file:
+            if source_of_truth == "remote":
+                return self._build_sync_download_task(
+                    manifest,
+                    relative_path,
+                    os.path.join(local_dir_path, relative_path),
+                    remote_file,
+                    dry,
+                )
+            if delete:
+                return SyncDeletion(False, relative_path, remote_file_path)
+        return None
+
+    def _load_sync_manifest(
+        self, local_dir_path: str, remote_dir_path: str, streaming: bool = False
+    ) -> SyncManifest:
+        """Loads the manifest of the last sync of the directories. Streaming syncs
+        keep it on disk, or, without a manifest directory, do not record it at all
+        as it would be dropped after the sync anyway."""
+        if self._sync_manifest_dir is None:
+            manifest = SyncManifest(
+                None, hash_contents=self._hash_contents, keep_entries=not streaming
+            )
+            manifest.load()
+            return manifest
+        key = "\n".join(
+            [self._base_url, remote_dir_path, os.path.abspath(local_dir_path)]
+        )
+        manifest_file_path = os.path.join(
+            self._sync_manifest_dir,
+            f"{hashlib.sha256(key.encode()).hexdigest()[:32]}"
+            + (".sqlite" if streaming else ".json"),
+        )
+        manifest = (
+            SqliteSyncManifest(manifest_file_path, hash_contents=self._hash_contents)
+            if streaming
+            else SyncManifest(manifest_file_path, hash_contents=self._hash_contents)
+        )
+        manifest.load()
+        return manifest
+
+    def _build_sync_upload_task(
+        self,
+        manifest: SyncManifest,
+        relative_path: str,
+        local_file_path: str,
+        remote_file_path: str,
+        dry: bool,
+    ) -> TransferTask:
+        def upload() -> None:
+            self._upload_file(local_file_path, remote_file_path, dry, strict=True)
+            if not dry:
+                manifest.record(relative_path, local_file_path)
+
+        return relative_path, upload
+
+    def _build_sync_download_task(
+        self,
+        manifest: SyncManifest,
+        relative_path: str,
+        local_file_path: str,
+        remote_file: FileRecord,
+        dry: bool,
+    ) -> TransferTask:
+        def download() -> None:
+            self._download_listed_file(remote_file, local_file_path, dry)
+            if not dry:
+                manifest.record_download(
+                    relative_path,
+                    local_file_path,
+                    remote_file.last_modified.timestamp(),
+                    remote_file.size,
+                )
+
+        return relative_path, download
 
-    @http_retry
     def _upload_file(
         self,
         local_file_path: str,
@@ -172,28 +840,309 @@ class AskUiFilesService(FilesUploadService, FilesDownloadService, FilesSyncServi
         dry=False,
         strict=False,
     ) -> None:
-        query_params = {
-            "strict": strict,
-        }
-        url = urljoin(
-            base=self._base_url + "/",
-            url=quote(remote_file_path),
+        if (
+            not dry
+            and self._multipart is not None
+            and self._multipart.should_split(os.path.getsize(local_file_path))
+        ):
+            self._upload_file_in_parts(
+                self._multipart, local_file_path, remote_file_path, strict
+            )
+        else:
+            self._put_file(local_file_path, remote_file_path, dry, strict)
+
+    def _upload_result_file(self, local_file_path: str, remote_file_path: str) -> None:
+        if self._dedup is None:
+            self._upload_file(local_file_path, remote_file_path)
+        else:
+            self._upload_file_deduplicated(
+                self._dedup, local_file_path, remote_file_path
+            )
+
+    def _upload_file_deduplicated(
+        self,
+        dedup: UploadDeduplicator,
+        local_file_path: str,
+        remote_file_path: str,
+    ) -> None:
+        """Upload the file unless a file with the same content was uploaded to the
+        same URL before or copy such a file on the server if it was uploaded to
+        another URL."""
+        upload = DeduplicatedUpload(
+            dedup, self._base_url, self._multipart, local_file_path, remote_file_path
+        )
+        if upload.is_uploaded_before():
+            return
+        granted, source_url = dedup.claim(upload.sha256)
+        if granted:
+            try:
+                self._upload_file(local_file_path, remote_file_path)
+            except BaseException:
+                upload.release(uploaded=False)
+                raise
+            upload.release(uploaded=True)
+            return
+        source_url = upload.copy_source(source_url)
+        if source_url is not None:
+            try:
+                self._copy_remote_file(source_url, upload.file_url)
+            except NonRetryableHTTPError as error:
+                upload.copy_failed(source_url, error)
+            else:
+                upload.copied()
+                return
+        self._upload_file(local_file_path, remote_file_path)
+        upload.uploaded()
+
+    @http_retry
+    def _copy_remote_file(self, source_url: str, file_url: str) -> None:
+        logging.info(f"Copying {source_url} to {file_url} ...")
+        with self._session.put(
+            build_copy_url(file_url, source_url), headers=self._headers
+        ) as response:
+            handle_response_status(response)
+
+    def _upload_file_in_parts(
+        self,
+        multipart: MultipartUpload,
+        local_file_path: str,
+        remote_file_path: str,
+        strict: bool,
+    ) -> None:
+        """Upload the file in parts that are uploaded concurrently and retried
+        individually so that a transient error only repeats a single part."""
+        file_url = build_file_url(self._base_url, remote_file_path)
+        parts = multipart.split(os.path.getsize(local_file_path))
+        logging.info(
+            f"Uploading {local_file_path} to {file_url} in {len(parts)} parts ..."
         )
-        url = f"{url}?{urlencode(query_params)}"
+        upload_id = self._create_multipart_upload(file_url, strict)
+        try:
+            executor = ThreadPoolExecutor(max_workers=multipart.max_concurrent_parts)
+            try:
+                etags = dict(
+                    zip(
+                        (part.number for part in parts),
+                        executor.map(
+                            functools.partial(
+                                self._upload_part, file_url, upload_id, local_file_path
+                            ),
+                            parts,
+                        ),
+                        strict=True,
+                    )
+                )
+            finally:  # stop uploading the remaining parts if a part failed
+                executor.shutdown(cancel_futures=True)
+            self._complete_multipart_upload(file_url, upload_id, etags)
+        except BaseException:
+            self._abort_multipart_upload(file_url, upload_id)
+            raise
+
+    @http_retry
+    def _create_multipart_upload(self, file_url: str, strict: bool) -> str:
+        with self._session.post(
+            MultipartUpload.create_url(file_url, strict), headers=self._headers
+        ) as response:
+            handle_response_status(response)
+            return response.json()["upload_id"]
+
+    @http_retry
+    def _upload_part(
+        self, file_url: str, upload_id: str, local_file_path: str, part: UploadPart
+    ) -> str:
+        if self._session.throttle is not None:
+            self._session.throttle.throttle(part.size)
+        with self._session.put(
+            MultipartUpload.part_url(file_url, upload_id, part),
+            data=read_part(local_file_path, part),
+            headers=self._headers,
+        ) as response:
+            handle_response_status(response)
+            return response.headers["ETag"]
+
+    @http_retry
+    def _complete_multipart_upload(
+        self, file_url: str, upload_id: str, etags: dict[int, str]
+    ) -> None:
+        with self._session.post(
+            MultipartUpload.complete_url(file_url, upload_id),
+            json=MultipartUpload.complete_body(etags),
+            headers=self._headers,
+            timeout=UPLOAD_REQUEST_TIMEOUT_IN_S,
+        ) as response:
+            handle_response_status(response)
+
+    def _abort_multipart_upload(self, file_url: str, upload_id: str) -> None:
+        try:
+            with self._session.delete(
+                MultipartUpload.abort_url(file_url, upload_id), headers=self._headers
+            ) as response:
+                handle_response_status(response, 204)
+        except Exception as error:  # the upload failed anyway
+            logging.warning(f"Failed to abort upload {upload_id}: {error!r}")
+
+    @http_retry
+    def _put_file(
+        self,
+        local_file_path: str,
+        remote_file_path: str,
+        dry=False,
+        strict=False,
+    ) -> None:
+        url = build_upload_url(build_file_url(self._base_url, remote_file_path), strict)
 
         logging.info(f"Uploading {local_file_path} to {url} ...")
         if dry:
             return
 
+        compress = self._compression is not None and self._compression.should_compress(
+            local_file_path
+        )
+        # Streamed from the file in chunks instead of assembling the body in memory
         with open(local_file_path, "rb") as f:
-            with requests.put(
+            self._put_form_data(
                 url,
-                files={"file": f},
-                headers=self._headers,
-                timeout=UPLOAD_REQUEST_TIMEOUT_IN_S,
-                stream=True,
-            ) as response:
-                handle_response_status(response)
+                os.path.basename(local_file_path),
+                read_chunks(f, UPLOAD_CHUNK_SIZE_IN_BYTES),
+                os.fstat(f.fileno()).st_size,
+                self._compression if compress else None,
+            )
+
+    @http_retry
+    def _upload_bundle(
+        self, files: list[tuple[str, str]], remote_dir_path: str
+    ) -> None:
+        """Upload the files as a tar archive that the files API extracts into
+        `remote_dir_path`.
+
+        Args:
+            files (list[tuple[str, str]]): Local paths and paths relative to `remote_dir_path` of the files.
+        """
+        bundle = TarBundle(files)
+        bundle_name, url = build_bundle_upload(self._base_url, remote_dir_path)
+        logging.info(
+            f"Uploading bundle of {len(bundle)} files ({bundle.size} bytes) to {url} ..."
+        )
+        self._put_form_data(
+            url,
+            bundle_name,
+            bundle.chunks(),
+            bundle.size,
+            self._compression,
+        )
+
+    def _put_form_data(
+        self,
+        url: str,
+        file_name: str,
+        content: Iterable[bytes],
+        content_length: int,
+        compression: Optional[UploadCompression],
+    ) -> None:
+        """Stream `content` as the file of a multipart body, compressed on the fly
+        if `compression` is given. Compressed bodies are sent with chunked transfer
+        encoding as their size is not known upfront."""
+        headers, chunks, length = stream_form_data(
+            file_name, content, content_length, compression, self._session.throttle
+        )
+        with self._session.put(
+            url,
+            data=chunks if length is None else SizedStream(chunks, length),
+            headers={**self._headers, **headers},
+            timeout=UPLOAD_REQUEST_TIMEOUT_IN_S,
+        ) as response:
+            handle_response_status(response)
+
+    def _delete_remote_files(
+        self, manifest: SyncManifest, remote_file_paths: dict[str, str], dry: bool
+    ) -> None:
+        """Delete remote files concurrently, in batches if bulk deletes are enabled
+        and supported by the files API.
+
+        Args:
+            manifest (SyncManifest): The manifest to remove the deleted files from.
+            remote_file_paths (dict[str, str]): The remote paths of the files to delete by their relative paths.
+            dry (bool): Whether to only log the files that would be deleted.
+        """
+        if dry or len(remote_file_paths) == 0:
+            for remote_file_path in remote_file_paths.values():
+                self._delete_remote_file(remote_file_path, dry)
+            return
+        logging.info(f"Deleting {len(remote_file_paths)} remote files ...")
+        relative_paths = {
+            remote_file_path: relative_path
+            for relative_path, remote_file_path in remote_file_paths.items()
+        }
+        remaining = list(relative_paths)
+        if self._bulk_delete is not None and self._bulk_delete_supported:
+            not_deleted: list[str] = []
+
+            def delete_batch(batch: Sequence[str]) -> None:
+                failed = self._delete_remote_batch(batch)
+                for remote_file_path in batch:
+                    if remote_file_path not in failed:
+                        manifest.remove(relative_paths[remote_file_path])
+                not_deleted.extend(failed)
+
+            run_transfers(
+                (
+                    (
+                        f"{len(batch)} files from {batch[0]}",
+                        functools.partial(delete_batch, batch),
+                    )
+                    for batch in self._bulk_delete.split(remaining)
+                ),
+                max_workers=self._max_concurrent_deletes,
+                throttle=self._session.throttle,
+            )
+            remaining = not_deleted
+
+        def delete(remote_file_path: str) -> None:
+            self._delete_remote_file(remote_file_path)
+            manifest.remove(relative_paths[remote_file_path])
+
+        run_transfers(
+            (
+                (remote_file_path, functools.partial(delete, remote_file_path))
+                for remote_file_path in remaining
+            ),
+            max_workers=self._max_concurrent_deletes,
+            throttle=self._session.throttle,
+        )
+
+    @http_retry
+    def _delete_remote_batch(self, remote_file_paths: Sequence[str]) -> dict[str, str]:
+        """Delete the files with a single request.
+
+        Returns:
+            dict[str, str]: The paths of the files that were not deleted with the reason.
+        """
+        if not self._bulk_delete_supported:
+            return dict.fromkeys(remote_file_paths, "bulk deletes not supported")
+        logging.info(
+            f"Deleting {len(remote_file_paths)} files from {remote_file_paths[0]} ..."
+        )
+        with self._session.post(
+            BulkDelete.url(self._base_url),
+            json=BulkDelete.body(remote_file_paths),
+            headers=self._headers,
+        ) as response:
+            if response.status_code in BulkDelete.UNSUPPORTED_STATUS_CODES:
+                with self._bulk_delete_lock:
+                    if self._bulk_delete_supported:
+                        logging.warning(
+                            f"Bulk deletes are not supported by the files API ({response.status_code}), deleting files one by one"
+                        )
+                        self._bulk_delete_supported = False
+                return dict.fromkeys(remote_file_paths, "bulk deletes not supported")
+            handle_response_status(response)
+            failed = BulkDelete.failed_paths(response.json())
+        for remote_file_path, detail in failed.items():
+            logging.warning(
+                f"Failed to delete {remote_file_path} in bulk, deleting it individually: {detail}"
+            )
+        return failed
 
     @http_retry
     def _delete_remote_file(self, remote_file_path: str, dry=False) -> None:
@@ -201,9 +1150,9 @@ class AskUiFilesService(FilesUploadService, FilesDownloadService, FilesSyncServi
         if dry:
             return
 
-        delete_url = urljoin(self._base_url + "/", remote_file_path)
-        response = requests.delete(delete_url, headers=self._headers)
-        handle_response_status(response, 204)
+        delete_url = build_file_url(self._base_url, remote_file_path)
+        with self._session.delete(delete_url, headers=self._headers) as response:
+            handle_response_status(response, 204)
 
     def _delete_local_file(self, local_file_path: str, dry=False) -> None:
         logging.info(f"Deleting file {local_file_path} ...")
@@ -212,12 +1161,11 @@ class AskUiFilesService(FilesUploadService, FilesDownloadService, FilesSyncServi
 
         os.remove(local_file_path)
 
-    @http_retry
     def _download_file(
         self,
         url: str,
         local_file_path: str,
-        last_modified_on_remote: AwareDatetime,
+        last_modified_on_remote: datetime,
         dry=False,
     ) -> None:
         logging.info(
@@ -226,88 +1174,153 @@ class AskUiFilesService(FilesUploadService, FilesDownloadService, FilesSyncServi
         if dry:
             return
 
-        os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
-        response = requests.get(
+        with atomic_write(
+            local_file_path, mtime=last_modified_on_remote.timestamp()
+        ) as f:
+            self._download_into(url, PartialDownload(f))
+
+    @http_retry
+    def _download_into(self, url: str, download: PartialDownload) -> None:
+        """Download the file at `url` into `download`.
+
+        Retries continue where the previous attempt stopped if the server supports
+        range requests. Otherwise, the file is downloaded from the start again.
+        """
+        with self._session.get(
             url,
-            headers=self._headers,
-            timeout=REQUEST_TIMEOUT_IN_S,
+            headers={**self._headers, **download.range_headers()},
             stream=True,
-        )
-        handle_response_status(response)
-        with open(local_file_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
-
-        os.utime(
-            path=local_file_path,
-            times=(
-                last_modified_on_remote.timestamp(),
-                last_modified_on_remote.timestamp(),
-            ),
-        )
+        ) as response:
+            download.begin(response)
+            for chunk in response.iter_content(chunk_size=download.chunk_size):
+                if self._session.throttle is not None:
+                    self._session.throttle.throttle(len(chunk))
+                download.write(chunk)
+        download.finish()
 
-    def _list_local_files(self, local_dir_path: str) -> dict[str, FileDto]:
+    def _list_local_files(self, local_dir_path: str) -> dict[str, LocalFileRecord]:
         """List all files in a local directory."""
-        local_files = {}
-        for root, _, files in os.walk(local_dir_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(
-                    file_path, start=local_dir_path
-                ).replace(os.sep, "/")
-                file_stats = os.stat(file_path)
-                local_files[relative_path] = FileDto(
-                    name=os.path.basename(file_path),
-                    path=file_path,
-                    last_modified=datetime.fromtimestamp(
-                        file_stats.st_mtime, tz=timezone.utc
-                    ),
-                    url=f"file://{file_path}",
-                    size=file_stats.st_size,
-                )  # type: ignore[call-arg]
-        return local_files
+        return {
+            file.relative_path: LocalFileRecord(
+                name=file.name, path=file.path, stat=file.stat()
+            )
+            for file in scan_files(local_dir_path)
+        }
 
-    @http_retry
-    def _list_remote_objects(self, prefix: str) -> Generator[FileDto, None, None]:
+    def _list_remote_objects(
+        self, prefix: str, conditional: bool = True
+    ) -> Generator[FileRecord, None, None]:
+        for page in prefetch(
+            self._list_remote_pages(prefix, conditional),
+            max_prefetched=LIST_PAGES_PREFETCHED,
+        ):
+            for file in page.data:
+                if is_hidden_file(file.path):
+                    continue
+
+                yield file
+
+    def _list_remote_pages(
+        self, prefix: str, conditional: bool = True
+    ) -> Generator[FilesListPage, None, None]:
+        """List the files under `prefix` page by page (see `_list_remote_page` for
+        `conditional`).
+
+        The page size starts at `list_page_size` and may grow with every page (see
+        `next_list_page_size`). Every page is retried on its own, i.e., after a
+        transient error, the listing resumes with the continuation token of the
+        last page received instead of starting over.
+        """
+        stats = ListingStats(prefix)
         continuation_token = None
+        limit = self._list_page_size
         while True:
-            params = {"prefix": prefix, "limit": 100, "expand": "url"}
-            if continuation_token:
-                params["continuation_token"] = continuation_token
+            page = self._list_remote_page(
+                build_list_url(self._base_url, prefix, limit, continuation_token),
+                stats,
+                conditional,
+            )
+            yield page
 
-            list_url = f"{self._base_url}?{urlencode(params)}"
-            response = requests.get(
-                list_url, headers=self._headers, timeout=REQUEST_TIMEOUT_IN_S
+            continuation_token = page.next_continuation_token
+            if not continuation_token:
+                break
+            limit = next_list_page_size(limit)
+        stats.log()
+
+    @http_retry
+    def _list_remote_page(
+        self, list_url: str, stats: ListingStats, conditional: bool = True
+    ) -> FilesListPage:
+        """Requests the page at `list_url` conditionally if it is in the listing
+        cache (and `conditional` is enabled) and uses the cached page if it was not
+        modified since. Files of cached pages have no download URL."""
+        request = ListingPageRequest(self._listing_cache, list_url, stats, conditional)
+        request.load_cached()
+        try:
+            response = self._session.get(
+                list_url, headers={**self._headers, **request.headers}
             )
-            handle_response_status(response)
+        except Exception:
+            request.failed()
+            raise
 
-            file_list_response = FilesListResponseDto(**response.json())
+        def read_body() -> Any:
+            handle_response_status(response)
+            return response.json()
 
-            for file in file_list_response.data:
-                if any(
-                    re.match(pattern, file.path)
-                    for pattern in self.HIDDEN_FILES_PATTERNS
-                ):
-                    continue
+        page = request.read(response.status_code, response.headers, read_body)
+        request.store()
+        return page
 
-                yield file
+    def _upload_dir(
+        self,
+        local_dir_path: str,
+        remote_dir_path: str,
+        files: Optional[Iterable[ScannedFile]] = None,
+    ) -> None:
+        run_transfers(
+            self._build_upload_dir_tasks(local_dir_path, remote_dir_path, files),
+            max_workers=self._max_concurrent_uploads,
+            throttle=self._session.throttle,
+        )
 
-            continuation_token = file_list_response.next_continuation_token
-            if not continuation_token:
-                break
+    def _build_upload_dir_tasks(
+        self,
+        local_dir_path: str,
+        remote_dir_path: str,
+        files: Optional[Iterable[ScannedFile]] = None,
+    ) -> Generator[TransferTask, None, None]:
+        """Yields a task per file or, if bundling is enabled, per bundle of files not
+        larger than `bundle_max_file_size_in_bytes`. Larger files are uploaded
+        individually right away while the small ones are collected."""
+        small_files: list[tuple[str, str, int]] = []
+        for file_path, remote_file_path in plan_upload_dir(
+            local_dir_path,
+            remote_dir_path,
+            files,
+            self._bundle_max_file_size_in_bytes,
+            functools.partial(
+                is_bundled_file_uploaded_before, self._dedup, self._base_url
+            ),
+            small_files,
+        ):
+            yield (
+                file_path,
+                functools.partial(
+                    self._upload_result_file, file_path, remote_file_path
+                ),
+            )
+        for bundle in group_into_bundles(small_files, self._max_bundle_size_in_bytes):
+            yield (
+                f"bundle of {len(bundle)} files starting with {bundle[0][0]}",
+                functools.partial(
+                    self._upload_bundle_recorded, bundle, remote_dir_path
+                ),
+            )
 
-    def _upload_dir(self, local_dir_path: str, remote_dir_path: str) -> None:
-        for root, _, files in os.walk(local_dir_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                relative_file_path = os.path.relpath(
-                    file_path,
-                    start=local_dir_path,
-                )
-                remote_file_path = (
-                    remote_dir_path
-                    + ("/" if remote_dir_path != "" else "")
-                    + ("/".join(relative_file_path.split(os.sep)))
-                )
-                self._upload_file(file_path, remote_file_path)
+    def _upload_bundle_recorded(
+        self, files: list[tuple[str, str]], remote_dir_path: str
+    ) -> None:
+        self._upload_bundle(files, remote_dir_path)
+        record_bundle_uploaded(self._dedup, self._base_url, files, remote_dir_path)
@@ -0,0 +1,869 @@
+"""Asyncio implementation of the AskUI files service.
+
+Requires the optional `httpx` dependency (`pip install askui-runner[async]`).
+"""
+
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+import time
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    BinaryIO,
+    Iterable,
+    Iterator,
+    Optional,
+)
+
+import httpx
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    wait_random_exponential,
+)
+
+from ...models import HttpConfig
+from ..http import RequestGuard
+from ..throttle import TransferThrottle
+from .bundle import DEFAULT_MAX_BUNDLE_SIZE_IN_BYTES, TarBundle, group_into_bundles
+from .cache import FilesCache, build_cache_key
+from .compression import UploadCompression
+from .concurrency import FilesTransferError, is_circuit_open
+from .dedup import UploadDeduplicator
+from .files import AsyncFilesService
+from .listing import (
+    ListedDownloadUrls,
+    ListingCache,
+    ListingPageRequest,
+    ListingStats,
+)
+from .multipart import MultipartUpload, UploadPart, read_part
+from .protocol import (
+    UPLOAD_CHUNK_SIZE_IN_BYTES,
+    UPLOAD_REQUEST_TIMEOUT_IN_S,
+    DeduplicatedUpload,
+    build_bundle_upload,
+    build_copy_url,
+    build_file_url,
+    build_list_url,
+    build_local_file_path,
+    build_upload_url,
+    finish_upload,
+    is_bundled_file_uploaded_before,
+    is_hidden_file,
+    join_remote_path,
+    next_list_page_size,
+    plan_upload_dir,
+    record_bundle_uploaded,
+)
+from .records import FileRecord, FilesListPage
+from .scan import ScannedFile
+from .retry_utils import (
+    TRANSIENT_HTTP_STATUS_CODES,
+    http_retry_stop,
+    wait_retry_after,
+)
+from .utils import (
+    MAX_DOWNLOAD_CHUNK_SIZE_IN_BYTES,
+    commit_temporary_file,
+    discard_temporary_file,
+    read_chunks,
+    stream_form_data,
+    temporary_file_path,
+)
+
+CLAIM_POLL_INTERVAL_IN_S = 0.05
+THROTTLE_POLL_INTERVAL_IN_S = 0.05
+
+
+class AsyncNonRetryableHTTPError(Exception):
+    """Exception for HTTP errors that should not be retried."""
+
+    def __init__(self, response: httpx.Response):
+        self.response = response
+        self.status_code = response.status_code
+        super().__init__(
+            f"{response.status_code} {response.reason_phrase} for url: {response.url}"
+        )
+
+
+def handle_async_response_status(
+    response: httpx.Response, expected_status_code: int = 200
+) -> None:
+    """
+    Handle HTTP response status, raising appropriate exceptions.
+
+    Raises:
+        httpx.HTTPStatusError: For transient errors that should be retried
+        AsyncNonRetryableHTTPError: For non-transient errors that should not be retried
+    """
+    if response.status_code != expected_status_code:
+        if response.status_code in TRANSIENT_HTTP_STATUS_CODES:
+            response.raise_for_status()
+        raise AsyncNonRetryableHTTPError(response)
+
+
+# Standard retry decorator for async HTTP operations
+async_http_retry = retry(
+    stop=http_retry_stop,
+    wait=wait_retry_after(wait_random_exponential(max=30)),
+    retry=retry_if_exception_type((httpx.TransportError, httpx.HTTPStatusError)),
+)
+
+
+class GuardedAsyncTransport(httpx.AsyncBaseTransport):
+    """Applies a `RequestGuard` to the requests sent with `transport` (see
+    `PooledHttpSession`)."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, guard: RequestGuard):
+        self._transport = transport
+        self._guard = guard
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        while (remaining := self._guard.pause_remaining()) > 0:
+            await asyncio.sleep(remaining)
+        circuit_breaker = self._guard.begin(str(request.url))
+        start = time.monotonic()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TransportError as error:
+            self._guard.observe_error(circuit_breaker, error)
+            raise
+        except BaseException:  # e.g., asyncio.CancelledError
+            self._guard.observe_abort(circuit_breaker)
+            raise
+        self._guard.observe_response(
+            circuit_breaker,
+            response.status_code,
+            response.headers,
+            time.monotonic() - start,
+            has_body="content-length" in request.headers
+            or "transfer-encoding" in request.headers,
+        )
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class AsyncAskUiFilesService(AsyncFilesService):
+    """Downloads and uploads files with many concurrent transfers multiplexed on a
+    single event loop.
+
+    Blocking file system operations are offloaded to worker threads. The number of
+    concurrent transfers (and open files) is bounded by a semaphore.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict[str, str],
+        http_config: Optional[HttpConfig] = None,
+        max_concurrent_downloads: int = 1,
+        max_concurrent_uploads: int = 1,
+        cache: Optional[FilesCache] = None,
+        list_page_size: int = 100,
+        listing_cache: Optional[ListingCache] = None,
+        compression: Optional[UploadCompression] = None,
+        multipart: Optional[MultipartUpload] = None,
+        dedup: Optional[UploadDeduplicator] = None,
+        request_guard: Optional[RequestGuard] = None,
+        bundle_max_file_size_in_bytes: Optional[int] = None,
+        max_bundle_size_in_bytes: int = DEFAULT_MAX_BUNDLE_SIZE_IN_BYTES,
+    ):
+        self._disabled = base_url == ""
+        self._base_url = base_url.rstrip("/")
+        self._headers = headers
+        self._http_config = http_config or HttpConfig()
+        self._max_concurrent_downloads = max_concurrent_downloads
+        self._max_concurrent_uploads = max_concurrent_uploads
+        self._cache = cache
+        self._list_page_size = list_page_size
+        self._listing_cache = listing_cache
+        self._listed_download_urls = ListedDownloadUrls()
+        self._relistings: dict[str, asyncio.Task[FilesListPage]] = {}
+        self._compression = compression
+        self._multipart = multipart
+        self._dedup = dedup
+        self._request_guard = request_guard
+        self._throttle = None if request_guard is None else request_guard.throttle
+        self._bundle_max_file_size_in_bytes = bundle_max_file_size_in_bytes
+        self._max_bundle_size_in_bytes = max_bundle_size_in_bytes
+        # clients kept open by purpose (see `open`), None if closed
+        self._clients: Optional[dict[str, httpx.AsyncClient]] = None
+
+    async def open(self) -> None:
+        if self._clients is None:
+            self._clients = {}
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, None
+        for client in (clients or {}).values():
+            await client.aclose()
+
+    @contextlib.asynccontextmanager
+    async def _client(
+        self, purpose: str, max_connections: int
+    ) -> AsyncIterator[httpx.AsyncClient]:
+        """The client kept open for `purpose` if the service is open; otherwise, a
+        client closed afterwards."""
+        if self._clients is None:
+            async with self._create_client(max_connections) as client:
+                yield client
+            return
+        if purpose not in self._clients:
+            self._clients[purpose] = self._create_client(max_connections)
+        yield self._clients[purpose]
+
+    def _create_client(self, max_connections: int) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=(
+                max_connections if self._http_config.keep_alive else 0
+            ),
+        )
+        transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(limits=limits)
+        if self._request_guard is not None and self._request_guard.enabled:
+            transport = GuardedAsyncTransport(transport, self._request_guard)
+        return httpx.AsyncClient(
+            headers=self._headers,
+            timeout=httpx.Timeout(
+                self._http_config.read_timeout,
+                connect=self._http_config.connect_timeout,
+            ),
+            transport=transport,
+            # like `requests`, e.g., for download URLs redirecting to a CDN
+            follow_redirects=True,
+        )
+
+    async def download(self, local_dir_path: str, remote_path: str = "") -> None:
+        """Download files from S3.
+
+        Args:
+            local_dir_path (str): The local directory to download the files to.
+            remote_path (str, optional): The remote path to a directory to download the files from or a single file to download. Defaults to "". See `AskUiFilesService.download`.
+        """
+        if self._disabled:
+            return
+        prefix = remote_path.lstrip("/")
+        semaphore = asyncio.Semaphore(self._max_concurrent_downloads)
+        async with self._client(
+            "download", self._max_concurrent_downloads + 1
+        ) as client:
+            # see `AskUiFilesService._build_download_tasks`
+            listing = self._list_remote_objects(
+                client, prefix, conditional=self._cache is not None
+            )
+            try:
+                await self._run_transfers(
+                    (
+                        (
+                            file.path,
+                            self._download_file_cached(
+                                client,
+                                semaphore,
+                                file,
+                                build_local_file_path(local_dir_path, prefix, file),
+                            ),
+                        )
+                        async for file in listing
+                    ),
+                    self._max_concurrent_downloads,
+                )
+            finally:
+                if self._cache is not None:
+                    await asyncio.to_thread(self._cache.evict)
+
+    async def upload(self, local_path: str, remote_dir_path: str = "") -> None:
+        await self._upload(local_path, remote_dir_path)
+
+    async def upload_files(
+        self,
+        local_dir_path: str,
+        files: Iterable[ScannedFile],
+        remote_dir_path: str = "",
+    ) -> None:
+        await self._upload(local_dir_path, remote_dir_path, files)
+
+    async def delete(self, remote_file_path: str) -> None:
+        if self._disabled:
+            return
+        async with self._client("delete", 1) as client:
+            await self._delete_remote_file(client, remote_file_path.lstrip("/"))
+
+    async def _upload(
+        self,
+        local_path: str,
+        remote_dir_path: str,
+        scanned_files: Optional[Iterable[ScannedFile]] = None,
+    ) -> None:
+        if self._disabled:
+            return
+        r_dir_path = remote_dir_path.rstrip("/")
+        small_files: list[tuple[str, str, int]] = []
+        is_dir = scanned_files is not None or os.path.isdir(local_path)
+        files: Iterator[tuple[str, str]] = (
+            plan_upload_dir(
+                local_path,
+                r_dir_path,
+                scanned_files,
+                self._bundle_max_file_size_in_bytes,
+                functools.partial(
+                    is_bundled_file_uploaded_before, self._dedup, self._base_url
+                ),
+                small_files,
+            )
+            if is_dir
+            else iter(
+                [
+                    (
+                        local_path,
+                        join_remote_path(r_dir_path, os.path.basename(local_path)),
+                    )
+                ]
+            )
+        )
+        semaphore = asyncio.Semaphore(self._max_concurrent_uploads)
+
+        async def tasks() -> AsyncGenerator[tuple[str, Awaitable[None]], None]:
+            # the directory is scanned in a worker thread while uploading
+            while (file := await asyncio.to_thread(next, files, None)) is not None:
+                file_path, remote_file_path = file
+                yield (
+                    file_path,
+                    self._upload_result_file(
+                        client, semaphore, file_path, remote_file_path
+                    ),
+                )
+            for bundle in group_into_bundles(
+                small_files, self._max_bundle_size_in_bytes
+            ):
+                yield (
+                    f"bundle of {len(bundle)} files starting with {bundle[0][0]}",
+                    self._upload_bundle_recorded(client, semaphore, bundle, r_dir_path),
+                )
+
+        max_connections = self._max_concurrent_uploads
+        if self._multipart is not None:
+            max_connections *= self._multipart.max_concurrent_parts
+        async with self._client("upload", max_connections) as client:
+            try:
+                await self._run_transfers(tasks(), self._max_concurrent_uploads)
+            finally:
+                await asyncio.to_thread(
+                    finish_upload, self._compression, self._dedup, is_dir
+                )
+
+    async def _run_transfers(
+        self,
+        transfers: AsyncGenerator[tuple[str, Awaitable[None]], None],
+        max_concurrency: int,
+    ) -> None:
+        """Async counterpart of `run_transfers`: Runs the transfers, keeping at most
+        `2 * max_concurrency` of them scheduled, and raises a `FilesTransferError`
+        for all failed transfers at the end."""
+        if self._throttle is not None:
+            transfers = self._throttled(transfers, self._throttle)
+        failures: dict[str, BaseException] = {}
+        pending: dict[asyncio.Task[None], str] = {}
+
+        def collect(done: set[asyncio.Task[None]]) -> None:
+            for task in done:
+                label = pending.pop(task)
+                error = task.exception()
+                if error is not None:
+                    logging.error(f"Transfer of {label} failed: {error!r}")
+                    failures[label] = error
+
+        try:
+            async for label, transfer in transfers:
+                if is_circuit_open(failures):
+                    if asyncio.iscoroutine(transfer):
+                        transfer.close()  # never awaited
+                    break
+                if len(pending) >= 2 * max_concurrency:
+                    done, _ = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    collect(done)
+                pending[asyncio.ensure_future(transfer)] = label
+            if pending:
+                done, _ = await asyncio.wait(pending)
+                collect(done)
+        finally:
+            for task in pending:
+                task.cancel()
+        if failures:
+            raise FilesTransferError(failures)
+
+    @staticmethod
+    async def _throttled(
+        transfers: AsyncGenerator[tuple[str, Awaitable[None]], None],
+        throttle: TransferThrottle,
+    ) -> AsyncGenerator[tuple[str, Awaitable[None]], None]:
+        async def run(transfer: Awaitable[None]) -> None:
+            # polls instead of waiting on the throttle to not block the event loop
+            while not throttle.try_acquire():
+                await asyncio.sleep(THROTTLE_POLL_INTERVAL_IN_S)
+            try:
+                await transfer
+            finally:
+                throttle.release()
+
+        async for label, transfer in transfers:
+            yield label, run(transfer)
+
+    async def _list_remote_objects(
+        self, client: httpx.AsyncClient, prefix: str, conditional: bool = True
+    ) -> AsyncGenerator[FileRecord, None]:
+        """See `AskUiFilesService._list_remote_pages`."""
+        stats = ListingStats(prefix)
+        continuation_token = None
+        limit = self._list_page_size
+        while True:
+            page = await self._list_remote_page(
+                client,
+                build_list_url(self._base_url, prefix, limit, continuation_token),
+                stats,
+                conditional,
+            )
+            for file in page.data:
+                if is_hidden_file(file.path):
+                    continue
+                yield file
+            continuation_token = page.next_continuation_token
+            if not continuation_token:
+                break
+            limit = next_list_page_size(limit)
+        stats.log()
+
+    @async_http_retry
+    async def _list_remote_page(
+        self,
+        client: httpx.AsyncClient,
+        list_url: str,
+        stats: ListingStats,
+        conditional: bool = True,
+    ) -> FilesListPage:
+        """See `AskUiFilesService._list_remote_page`."""
+        request = ListingPageRequest(self._listing_cache, list_url, stats, conditional)
+        await asyncio.to_thread(request.load_cached)
+        try:
+            response = await client.get(list_url, headers=request.headers)
+        except Exception:
+            request.failed()
+            raise
+
+        def read_body() -> Any:
+            handle_async_response_status(response)
+            return response.json()
+
+        page = request.read(response.status_code, response.headers, read_body)
+        await asyncio.to_thread(request.store)
+        return page
+
+    async def _download_file_cached(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        file: FileRecord,
+        local_file_path: str,
+    ) -> None:
+        if self._cache is None:
+            await self._download_listed_file(client, semaphore, file, local_file_path)
+            return
+        key = build_cache_key(file.path, file.last_modified.timestamp(), file.size)
+        if await asyncio.to_thread(self._cache.materialize, key, local_file_path):
+            return
+        await self._download_listed_file(client, semaphore, file, local_file_path)
+        await asyncio.to_thread(self._cache.store, key, local_file_path)
+
+    async def _download_listed_file(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        file: FileRecord,
+        local_file_path: str,
+    ) -> None:
+        """See `AskUiFilesService._download_listed_file`."""
+        try:
+            url = await self._download_url(client, file)
+            await self._download_file(client, semaphore, file, local_file_path, url)
+        except AsyncNonRetryableHTTPError as error:
+            if not ListedDownloadUrls.is_rejected(error.status_code, file):
+                raise
+            logging.info(f"Download URL of {file.path} was rejected, listing it again")
+            url = await self._download_url(client, file, expired_url=file.url)
+            await self._download_file(client, semaphore, file, local_file_path, url)
+
+    async def _download_url(
+        self,
+        client: httpx.AsyncClient,
+        file: FileRecord,
+        expired_url: Optional[str] = None,
+    ) -> str:
+        """See `AskUiFilesService._download_url`. Concurrent downloads of files of
+        the same page wait for the page to be listed again once."""
+        if file.listing_url is None or not ListedDownloadUrls.needs_relisting(
+            file.url, expired_url
+        ):
+            return file.url
+        listing_url = file.listing_url
+        urls = self._listed_download_urls
+        url = urls.get(listing_url, file.path)
+        if ListedDownloadUrls.needs_relisting(url, expired_url):
+            relisting = self._relistings.get(listing_url)
+            if relisting is None:
+                relisting = asyncio.create_task(
+                    self._list_remote_page(
+                        client, listing_url, ListingStats(file.path), conditional=False
+                    )
+                )
+                self._relistings[listing_url] = relisting
+                try:
+                    urls.add(listing_url, await relisting)
+                finally:
+                    del self._relistings[listing_url]
+            else:
+                await relisting
+            url = urls.get(listing_url, file.path)
+        if url is None:  # moved to another page in the meantime
+            page = await self._list_remote_page(
+                client,
+                build_list_url(self._base_url, file.path, limit=1),
+                ListingStats(file.path),
+                conditional=False,
+            )
+            url = ListedDownloadUrls.find(page, file.path)
+        return ListedDownloadUrls.assign(file, url)
+
+    @async_http_retry
+    async def _download_file(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        file: FileRecord,
+        local_file_path: str,
+        url: str,
+    ) -> None:
+        logging.info(
+            f"Downloading file to {local_file_path} from {url}. Last modified on {file.last_modified} ..."
+        )
+        async with semaphore:
+            tmp_file_path = await asyncio.to_thread(
+                temporary_file_path, local_file_path
+            )
+            try:
+                async with client.stream("GET", url) as response:
+                    handle_async_response_status(response)
+                    f: BinaryIO = await asyncio.to_thread(open, tmp_file_path, "xb")
+                    try:
+                        async for chunk in response.aiter_bytes(
+                            MAX_DOWNLOAD_CHUNK_SIZE_IN_BYTES
+                        ):
+                            if self._throttle is not None:
+                                await asyncio.sleep(self._throttle.reserve(len(chunk)))
+                            await asyncio.to_thread(f.write, chunk)
+                    finally:
+                        await asyncio.to_thread(f.close)
+                await asyncio.to_thread(
+                    commit_temporary_file,
+                    tmp_file_path,
+                    local_file_path,
+                    file.last_modified.timestamp(),
+                )
+            except BaseException:
+                await asyncio.to_thread(discard_temporary_file, tmp_file_path)
+                raise
+
+    async def _upload_result_file(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        local_file_path: str,
+        remote_file_path: str,
+    ) -> None:
+        if self._dedup is None:
+            await self._upload_file(
+                client, semaphore, local_file_path, remote_file_path
+            )
+        else:
+            await self._upload_file_deduplicated(
+                client, semaphore, self._dedup, local_file_path, remote_file_path
+            )
+
+    async def _upload_file_deduplicated(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        dedup: UploadDeduplicator,
+        local_file_path: str,
+        remote_file_path: str,
+    ) -> None:
+        """See `AskUiFilesService._upload_file_deduplicated`."""
+        upload = await asyncio.to_thread(
+            DeduplicatedUpload,
+            dedup,
+            self._base_url,
+            self._multipart,
+            local_file_path,
+            remote_file_path,
+        )
+        if upload.is_uploaded_before():
+            return
+        # waits without blocking a worker thread that the upload may need
+        while (claimed := dedup.try_claim(upload.sha256)) is None:
+            await asyncio.sleep(CLAIM_POLL_INTERVAL_IN_S)
+        granted, source_url = claimed
+        if granted:
+            try:
+                await self._upload_file(
+                    client, semaphore, local_file_path, remote_file_path
+                )
+            except BaseException:
+                upload.release(uploaded=False)
+                raise
+            upload.release(uploaded=True)
+            return
+        source_url = upload.copy_source(source_url)
+        if source_url is not None:
+            try:
+                async with semaphore:
+                    await self._copy_remote_file(client, source_url, upload.file_url)
+            except AsyncNonRetryableHTTPError as error:
+                upload.copy_failed(source_url, error)
+            else:
+                upload.copied()
+                return
+        await self._upload_file(client, semaphore, local_file_path, remote_file_path)
+        upload.uploaded()
+
+    @async_http_retry
+    async def _copy_remote_file(
+        self, client: httpx.AsyncClient, source_url: str, file_url: str
+    ) -> None:
+        logging.info(f"Copying {source_url} to {file_url} ...")
+        response = await client.put(build_copy_url(file_url, source_url))
+        handle_async_response_status(response)
+
+    async def _upload_file(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        local_file_path: str,
+        remote_file_path: str,
+    ) -> None:
+        if self._multipart is not None and self._multipart.should_split(
+            await asyncio.to_thread(os.path.getsize, local_file_path)
+        ):
+            async with semaphore:
+                await self._upload_file_in_parts(
+                    client, self._multipart, local_file_path, remote_file_path
+                )
+        else:
+            await self._put_file(client, semaphore, local_file_path, remote_file_path)
+
+    async def _upload_file_in_parts(
+        self,
+        client: httpx.AsyncClient,
+        multipart: MultipartUpload,
+        local_file_path: str,
+        remote_file_path: str,
+    ) -> None:
+        """See `AskUiFilesService._upload_file_in_parts`."""
+        file_url = build_file_url(self._base_url, remote_file_path)
+        parts = multipart.split(
+            await asyncio.to_thread(os.path.getsize, local_file_path)
+        )
+        logging.info(
+            f"Uploading {local_file_path} to {file_url} in {len(parts)} parts ..."
+        )
+        upload_id = await self._create_multipart_upload(client, file_url)
+        parts_semaphore = asyncio.Semaphore(multipart.max_concurrent_parts)
+
+        async def upload_part(part: UploadPart) -> str:
+            async with parts_semaphore:
+                return await self._upload_part(
+                    client, file_url, upload_id, local_file_path, part
+                )
+
+        tasks = [asyncio.ensure_future(upload_part(part)) for part in parts]
+        try:
+            etags = await asyncio.gather(*tasks)
+            await self._complete_multipart_upload(
+                client,
+                file_url,
+                upload_id,
+                dict(zip((part.number for part in parts), etags, strict=True)),
+            )
+        except BaseException:
+            for task in tasks:  # stop uploading the remaining parts
+                task.cancel()
+            await self._abort_multipart_upload(client, file_url, upload_id)
+            raise
+
+    @async_http_retry
+    async def _create_multipart_upload(
+        self, client: httpx.AsyncClient, file_url: str
+    ) -> str:
+        response = await client.post(MultipartUpload.create_url(file_url, False))
+        handle_async_response_status(response)
+        return response.json()["upload_id"]
+
+    @async_http_retry
+    async def _upload_part(
+        self,
+        client: httpx.AsyncClient,
+        file_url: str,
+        upload_id: str,
+        local_file_path: str,
+        part: UploadPart,
+    ) -> str:
+        if self._throttle is not None:
+            await asyncio.sleep(self._throttle.reserve(part.size))
+        response = await client.put(
+            MultipartUpload.part_url(file_url, upload_id, part),
+            content=await asyncio.to_thread(read_part, local_file_path, part),
+        )
+        handle_async_response_status(response)
+        return response.headers["ETag"]
+
+    @async_http_retry
+    async def _complete_multipart_upload(
+        self,
+        client: httpx.AsyncClient,
+        file_url: str,
+        upload_id: str,
+        etags: dict[int, str],
+    ) -> None:
+        response = await client.post(
+            MultipartUpload.complete_url(file_url, upload_id),
+            json=MultipartUpload.complete_body(etags),
+            timeout=httpx.Timeout(
+                UPLOAD_REQUEST_TIMEOUT_IN_S,
+                connect=self._http_config.connect_timeout,
+            ),
+        )
+        handle_async_response_status(response)
+
+    @async_http_retry
+    async def _delete_remote_file(
+        self, client: httpx.AsyncClient, remote_file_path: str
+    ) -> None:
+        logging.info(f"Deleting file {remote_file_path} ...")
+        response = await client.delete(build_file_url(self._base_url, remote_file_path))
+        handle_async_response_status(response, 204)
+
+    async def _abort_multipart_upload(
+        self, client: httpx.AsyncClient, file_url: str, upload_id: str
+    ) -> None:
+        try:
+            response = await client.delete(
+                MultipartUpload.abort_url(file_url, upload_id)
+            )
+            handle_async_response_status(response, 204)
+        except Exception as error:  # the upload failed anyway
+            logging.warning(f"Failed to abort upload {upload_id}: {error!r}")
+
+    @async_http_retry
+    async def _put_file(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        local_file_path: str,
+        remote_file_path: str,
+    ) -> None:
+        url = build_upload_url(build_file_url(self._base_url, remote_file_path))
+        logging.info(f"Uploading {local_file_path} to {url} ...")
+        async with semaphore:
+            compression = self._compression
+            if compression is not None and not await asyncio.to_thread(
+                compression.should_compress, local_file_path
+            ):
+                compression = None
+            f: BinaryIO = await asyncio.to_thread(open, local_file_path, "rb")
+            try:
+                await self._put_form_data(
+                    client,
+                    url,
+                    os.path.basename(local_file_path),
+                    read_chunks(f, UPLOAD_CHUNK_SIZE_IN_BYTES),
+                    os.fstat(f.fileno()).st_size,
+                    compression,
+                )
+            finally:
+                await asyncio.to_thread(f.close)
+
+    @async_http_retry
+    async def _upload_bundle(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        files: list[tuple[str, str]],
+        remote_dir_path: str,
+    ) -> None:
+        """See `AskUiFilesService._upload_bundle`."""
+        bundle_name, url = build_bundle_upload(self._base_url, remote_dir_path)
+        async with semaphore:
+            bundle = await asyncio.to_thread(TarBundle, files)
+            logging.info(
+                f"Uploading bundle of {len(bundle)} files ({bundle.size} bytes) to {url} ..."
+            )
+            await self._put_form_data(
+                client,
+                url,
+                bundle_name,
+                bundle.chunks(),
+                bundle.size,
+                self._compression,
+            )
+
+    async def _upload_bundle_recorded(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        files: list[tuple[str, str]],
+        remote_dir_path: str,
+    ) -> None:
+        await self._upload_bundle(client, semaphore, files, remote_dir_path)
+        await asyncio.to_thread(
+            record_bundle_uploaded, self._dedup, self._base_url, files, remote_dir_path
+        )
+
+    async def _put_form_data(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        file_name: str,
+        content: Iterator[bytes],
+        content_length: int,
+        compression: Optional[UploadCompression],
+    ) -> None:
+        """Stream `content` as the file of a multipart body. `content` is read (and
+        compressed if `compression` is given) chunk by chunk in a worker thread, so
+        the throttle may block there."""
+        headers, chunks, length = stream_form_data(
+            file_name, content, content_length, compression, self._throttle
+        )
+        if length is not None:
+            headers["Content-Length"] = str(length)
+
+        async def stream() -> AsyncGenerator[bytes, None]:
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                yield chunk
+
+        response = await client.put(
+            url,
+            content=stream(),
+            headers=headers,
+            timeout=httpx.Timeout(
+                UPLOAD_REQUEST_TIMEOUT_IN_S,
+                connect=self._http_config.connect_timeout,
+            ),
+        )
+        handle_async_response_status(response)
@@ -0,0 +1,38 @@
+from typing import Any, Generator, Sequence
+from urllib.parse import urlencode
+
+
+class BulkDelete:
+    """Protocol for deleting many files with a single request:
+
+    `POST <base url>/?action=delete_files` with `{"paths": [...]}` deletes the files
+    at the given paths (files that do not exist count as deleted) and returns
+    `{"errors": [{"path": ..., "detail": ...}, ...]}` listing the files that could
+    not be deleted.
+
+    Files API not supporting it respond with 400, 404, 405 or 501 in which case
+    the files are deleted one by one.
+    """
+
+    UNSUPPORTED_STATUS_CODES = (400, 404, 405, 501)
+
+    def __init__(self, batch_size: int) -> None:
+        self.batch_size = batch_size
+
+    def split(self, paths: Sequence[str]) -> Generator[Sequence[str], None, None]:
+        for offset in range(0, len(paths), self.batch_size):
+            yield paths[offset : offset + self.batch_size]
+
+    @staticmethod
+    def url(base_url: str) -> str:
+        return f"{base_url}/?{urlencode({'action': 'delete_files'})}"
+
+    @staticmethod
+    def body(paths: Sequence[str]) -> dict[str, Any]:
+        return {"paths": list(paths)}
+
+    @staticmethod
+    def failed_paths(response_body: Any) -> dict[str, str]:
+        """Paths of the files that could not be deleted with the reason."""
+        errors = response_body.get("errors", []) if response_body else []
+        return {error["path"]: str(error.get("detail", "")) for error in errors}
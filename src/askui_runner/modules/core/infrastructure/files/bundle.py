@@ -0,0 +1,92 @@
+import os
+import tarfile
+from typing import Generator, Iterable
+
+TAR_BLOCK_SIZE = tarfile.BLOCKSIZE
+READ_SIZE_IN_BYTES = 1024 * 1024
+DEFAULT_MAX_BUNDLE_SIZE_IN_BYTES = 64 * 1024 * 1024
+
+
+class TarBundle:
+    """Tar archive of local files that is streamed from the files directly, i.e.,
+    without staging the archive on disk or in memory.
+
+    The size of the archive is known upfront so that it can be sent with a
+    `Content-Length`. The files must not change while the archive is streamed.
+    """
+
+    def __init__(self, files: Iterable[tuple[str, str]]) -> None:
+        """
+        Args:
+            files (Iterable[tuple[str, str]]): Local paths and paths within the archive of the files to bundle.
+        """
+        self._members: list[tuple[str, bytes, int]] = []
+        for file_path, name in files:
+            stat = os.stat(file_path)
+            info = tarfile.TarInfo(name)
+            info.size = stat.st_size
+            info.mtime = int(stat.st_mtime)
+            info.mode = 0o644
+            header = info.tobuf(format=tarfile.PAX_FORMAT)
+            self._members.append((file_path, header, stat.st_size))
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    @property
+    def size(self) -> int:
+        return (
+            sum(
+                len(header) + _padded(file_size)
+                for _, header, file_size in self._members
+            )
+            + 2 * TAR_BLOCK_SIZE
+        )
+
+    def chunks(self) -> Generator[bytes, None, None]:
+        """Yields the archive. Files that grew since the bundle was created are
+        truncated to their previous size.
+
+        Raises:
+            RuntimeError: If a file shrank since the bundle was created.
+        """
+        for file_path, header, file_size in self._members:
+            yield header
+            remaining = file_size
+            with open(file_path, "rb") as f:
+                while remaining > 0:
+                    chunk = f.read(min(READ_SIZE_IN_BYTES, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+            if remaining != 0:
+                raise RuntimeError(f"{file_path} shrank while being bundled")
+            if file_size % TAR_BLOCK_SIZE:
+                yield b"\0" * (_padded(file_size) - file_size)
+        yield b"\0" * (2 * TAR_BLOCK_SIZE)
+
+
+def _padded(size: int) -> int:
+    return -(-size // TAR_BLOCK_SIZE) * TAR_BLOCK_SIZE
+
+
+def group_into_bundles(
+    files: Iterable[tuple[str, str, int]], max_bundle_size_in_bytes: int
+) -> Generator[list[tuple[str, str]], None, None]:
+    """Groups files into bundles whose content does not exceed
+    `max_bundle_size_in_bytes` (unless a single file does).
+
+    Args:
+        files (Iterable[tuple[str, str, int]]): Local paths, paths within the bundle and sizes of the files.
+    """
+    bundle: list[tuple[str, str]] = []
+    bundle_size = 0
+    for file_path, name, size in files:
+        if bundle and bundle_size + size > max_bundle_size_in_bytes:
+            yield bundle
+            bundle, bundle_size = [], 0
+        bundle.append((file_path, name))
+        bundle_size += size
+    if bundle:
+        yield bundle
@@ -0,0 +1,155 @@
+import contextlib
+import hashlib
+import logging
+import os
+import shutil
+
+from .utils import (
+    commit_temporary_file,
+    discard_temporary_file,
+    temporary_file_path,
+)
+
+INDEX_FILE_NAME = "index.json"  # of earlier versions
+OBJECTS_DIR_NAME = "objects"
+LAST_USED_FILE_EXTENSION = ".used"
+
+
+def build_cache_key(remote_path: str, last_modified: float, size: int) -> str:
+    return hashlib.sha256(
+        f"{remote_path}\0{last_modified}\0{size}".encode()
+    ).hexdigest()
+
+
+class FilesCache:
+    """On-disk cache of downloaded files shared across jobs.
+
+    Files are addressed by a key derived from their remote path, last modified
+    timestamp and size (see `build_cache_key`) so that a changed remote file never
+    hits an outdated cache entry. Cached files are materialized as hard links
+    (falling back to copies, e.g., across file systems) or as copies if `link` is
+    disabled. Materialized hard links share their content with the cache and must
+    not be modified in place. The least recently used files are evicted once the
+    cache grows beyond `max_size_in_bytes`.
+
+    There is no index: the cached files and the times they were last used (the
+    modification times of empty files next to them, as the modification times of
+    the cached files are shared with their hard links) are read from disk when
+    evicting so that runners sharing the cache cannot overwrite each other's
+    bookkeeping.
+    """
+
+    def __init__(self, dir_path: str, max_size_in_bytes: int, link: bool = True):
+        self._dir_path = dir_path
+        self._max_size_in_bytes = max_size_in_bytes
+        self._link = link
+
+    def materialize(self, key: str, file_path: str) -> bool:
+        """Put the cached file with the key `key` at `file_path`.
+
+        Returns:
+            bool: Whether the file was cached.
+        """
+        try:
+            self._place(self._object_path(key), file_path)
+        except FileNotFoundError:
+            return False
+        self._mark_used(key)
+        logging.info(f"Using cached file for {file_path}")
+        return True
+
+    def store(self, key: str, file_path: str) -> None:
+        """Add the (downloaded) file at `file_path` to the cache under the key `key`."""
+        object_path = self._object_path(key)
+        try:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            self._place(file_path, object_path)
+        except OSError as error:
+            logging.warning(f"Failed to cache {file_path}: {error}")
+            return
+        self._mark_used(key)
+
+    def evict(self) -> None:
+        """Remove the least recently used files until the cache fits its maximum
+        size."""
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(self._dir_path, INDEX_FILE_NAME))
+        objects: dict[str, tuple[int, float]] = {}  # size and mtime by object path
+        last_used: dict[str, float] = {}  # by object path
+        try:
+            with os.scandir(os.path.join(self._dir_path, OBJECTS_DIR_NAME)) as dirs:
+                for dir_entry in dirs:
+                    if dir_entry.is_dir():
+                        self._scan_objects(dir_entry.path, objects, last_used)
+        except FileNotFoundError:
+            return
+        except OSError as error:
+            logging.warning(f"Failed to list files cache {self._dir_path}: {error}")
+            return
+        for object_path in last_used.keys() - objects.keys():
+            self._remove(object_path)  # e.g., object evicted by another runner
+        total_size = sum(size for size, _ in objects.values())
+        for object_path, (size, _) in sorted(
+            objects.items(),
+            key=lambda item: last_used.get(item[0], item[1][1]),
+        ):
+            if total_size <= self._max_size_in_bytes:
+                break
+            self._remove(object_path)
+            total_size -= size
+
+    @staticmethod
+    def _scan_objects(
+        dir_path: str,
+        objects: dict[str, tuple[int, float]],
+        last_used: dict[str, float],
+    ) -> None:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue  # temporary file
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # e.g., evicted by another runner
+                    continue
+                if entry.name.endswith(LAST_USED_FILE_EXTENSION):
+                    object_path = entry.path[: -len(LAST_USED_FILE_EXTENSION)]
+                    last_used[object_path] = stat.st_mtime
+                else:
+                    objects[entry.path] = stat.st_size, stat.st_mtime
+
+    @staticmethod
+    def _remove(object_path: str) -> None:
+        for path in (object_path, object_path + LAST_USED_FILE_EXTENSION):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+    def _mark_used(self, key: str) -> None:
+        last_used_path = self._object_path(key) + LAST_USED_FILE_EXTENSION
+        try:
+            with open(last_used_path, "ab"):
+                pass
+            os.utime(last_used_path)
+        except OSError as error:
+            logging.debug(f"Failed to mark cached file {key} as used: {error}")
+
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self._dir_path, OBJECTS_DIR_NAME, key[:2], key)
+
+    def _place(self, src_path: str, dest_path: str) -> None:
+        """Atomically put (a link to or copy of) `src_path` at `dest_path`."""
+        tmp_path = temporary_file_path(dest_path)
+        try:
+            if self._link:
+                try:
+                    os.link(src_path, tmp_path)
+                except FileNotFoundError:
+                    raise
+                except OSError:  # e.g., across file systems
+                    shutil.copy2(src_path, tmp_path)
+            else:
+                shutil.copy2(src_path, tmp_path)
+            commit_temporary_file(tmp_path, dest_path)
+        except BaseException:
+            discard_temporary_file(tmp_path)
+            raise
@@ -0,0 +1,140 @@
+import fnmatch
+import logging
+import mimetypes
+import os
+import threading
+import zlib
+from typing import Iterable, Iterator, Literal, Optional, Protocol
+
+CompressionAlgorithm = Literal["gzip", "zstd"]
+
+# Formats that are compressed already and would only grow when compressed again
+INCOMPRESSIBLE_MIME_TYPE_PATTERNS = (
+    "image/*",
+    "video/*",
+    "audio/*",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/zstd",
+    "application/pdf",
+)
+
+
+class _Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+def _create_compressor(
+    algorithm: CompressionAlgorithm, level: Optional[int]
+) -> _Compressor:
+    if algorithm == "gzip":
+        # wbits=31 writes a gzip (instead of a raw zlib) stream
+        return zlib.compressobj(-1 if level is None else level, zlib.DEFLATED, 31)
+    try:
+        import zstandard  # zstandard is an optional dependency
+    except ImportError as error:
+        raise RuntimeError(
+            'zstd compression requires the "zstandard" package to be installed'
+        ) from error
+    return zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+
+
+class CompressionStats:
+    """Thread-safe counters of the bytes read from and sent for compressed files."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.files = 0
+        self.original_bytes = 0
+        self.compressed_bytes = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.compressed_bytes
+
+    def add(self, original_bytes: int, compressed_bytes: int) -> None:
+        with self._lock:
+            self.files += 1
+            self.original_bytes += original_bytes
+            self.compressed_bytes += compressed_bytes
+
+    def log(self) -> None:
+        if self.files == 0:
+            return
+        ratio = (
+            self.compressed_bytes / self.original_bytes if self.original_bytes else 1
+        )
+        logging.info(
+            f"Compressed {self.files} files from {self.original_bytes} to "
+            f"{self.compressed_bytes} bytes ({ratio:.0%}), saving {self.bytes_saved} bytes"
+        )
+
+
+class UploadCompression:
+    """Compresses eligible files on the fly while they are uploaded.
+
+    A file is eligible if it is at least `min_size_in_bytes` large and its
+    extension is in `extensions` or its (guessed) MIME type matches one of
+    `mime_types` (e.g., `text/*`). Already compressed formats such as images and
+    videos are never compressed. The compressed stream is sent with the matching
+    `Content-Encoding`.
+    """
+
+    def __init__(
+        self,
+        algorithm: CompressionAlgorithm,
+        extensions: Iterable[str],
+        mime_types: Iterable[str],
+        min_size_in_bytes: int = 0,
+        level: Optional[int] = None,
+    ) -> None:
+        self.algorithm = algorithm
+        self._extensions = {extension.lower() for extension in extensions}
+        self._mime_types = tuple(mime_types)
+        self._min_size_in_bytes = min_size_in_bytes
+        self._level = level
+        self.stats = CompressionStats()
+        _create_compressor(algorithm, level)  # fail early if zstd is not available
+
+    @property
+    def content_encoding(self) -> str:
+        return self.algorithm
+
+    def should_compress(self, file_path: str) -> bool:
+        mime_type, _ = mimetypes.guess_type(file_path)
+        if mime_type is not None and _matches_any(
+            mime_type, INCOMPRESSIBLE_MIME_TYPE_PATTERNS
+        ):
+            return False
+        if os.path.getsize(file_path) < self._min_size_in_bytes:
+            return False
+        if os.path.splitext(file_path)[1].lower() in self._extensions:
+            return True
+        return mime_type is not None and _matches_any(mime_type, self._mime_types)
+
+    def compress(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Compress a stream of chunks, adding the sizes to the stats once the
+        stream is exhausted."""
+        compressor = _create_compressor(self.algorithm, self._level)
+        original_bytes = 0
+        compressed_bytes = 0
+        for chunk in chunks:
+            original_bytes += len(chunk)
+            compressed = compressor.compress(chunk)
+            if compressed:
+                compressed_bytes += len(compressed)
+                yield compressed
+        compressed = compressor.flush()
+        compressed_bytes += len(compressed)
+        self.stats.add(original_bytes, compressed_bytes)
+        if compressed:
+            yield compressed
+
+
+def _matches_any(mime_type: str, patterns: Iterable[str]) -> bool:
+    return any(fnmatch.fnmatchcase(mime_type, pattern) for pattern in patterns)
@@ -0,0 +1,142 @@
+import functools
+import logging
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Generator, Iterable, Optional, TypeVar
+
+from ..circuit_breaker import CircuitOpenError
+from ..throttle import TransferThrottle
+
+T = TypeVar("T")
+
+TransferTask = tuple[str, Callable[[], None]]
+"""Pair of a label identifying the transferred file (used for error reporting) and the function doing the transfer."""
+
+
+class FilesTransferError(Exception):
+    """Exception aggregating the errors of all failed transfers of a batch."""
+
+    def __init__(self, failures: dict[str, BaseException]):
+        self.failures = failures
+        details = "\n".join(
+            f"  {label}: {error!r}" for label, error in failures.items()
+        )
+        super().__init__(f"{len(failures)} file transfer(s) failed:\n{details}")
+
+
+def run_transfers(
+    tasks: Iterable[TransferTask],
+    max_workers: int,
+    throttle: Optional[TransferThrottle] = None,
+) -> None:
+    """Run transfer tasks on a bounded pool of worker threads.
+
+    Tasks are consumed lazily from `tasks` so that transfers can start while the
+    iterable (e.g., a paginated remote listing) is still being produced. At most
+    `2 * max_workers` tasks are queued at any time. A failing task does not stop the
+    remaining ones unless it failed because the circuit of the server opened; all
+    failures are reported together afterwards.
+
+    Args:
+        tasks (Iterable[TransferTask]): The tasks to run.
+        max_workers (int): The maximum number of tasks running concurrently.
+        throttle (Optional[TransferThrottle]): Throttle to further limit the number of tasks running concurrently, e.g., if the server is overloaded.
+
+    Raises:
+        FilesTransferError: If at least one task failed.
+    """
+    failures: dict[str, BaseException] = {}
+    pending: dict[Future[None], str] = {}
+
+    def collect(done: Iterable[Future[None]]) -> None:
+        for future in done:
+            label = pending.pop(future)
+            error = future.exception()
+            if error is not None:
+                logging.error(f"Transfer of {label} failed: {error!r}")
+                failures[label] = error
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="askui-files"
+    ) as executor:
+        for label, task in tasks:
+            if is_circuit_open(failures):
+                break
+            if len(pending) >= 2 * max_workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            if throttle is not None:
+                task = functools.partial(_run_throttled, task, throttle)
+            pending[executor.submit(task)] = label
+        collect(wait(pending).done)
+
+    if failures:
+        raise FilesTransferError(failures)
+
+
+def is_circuit_open(failures: dict[str, BaseException]) -> bool:
+    """Whether a transfer failed because the circuit of the server is open so that
+    the remaining transfers are bound to fail as well."""
+    if not any(isinstance(error, CircuitOpenError) for error in failures.values()):
+        return False
+    logging.error("Skipping the remaining transfers as the server is unavailable")
+    return True
+
+
+def _run_throttled(task: Callable[[], None], throttle: TransferThrottle) -> None:
+    throttle.acquire()
+    try:
+        task()
+    finally:
+        throttle.release()
+
+
+_END_OF_ITERATION = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def prefetch(iterable: Iterable[T], max_prefetched: int) -> Generator[T, None, None]:
+    """Iterate `iterable` on a background thread staying up to `max_prefetched`
+    items ahead of the consumer, e.g., to fetch the next page of a listing while
+    the files of the current page are being transferred.
+
+    Errors raised by `iterable` are re-raised to the consumer. The background
+    thread stops once the consumer stops iterating.
+    """
+    items: queue.Queue[Any] = queue.Queue(maxsize=max_prefetched)
+    stopped = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_END_OF_ITERATION)
+        except BaseException as error:
+            put(_Failure(error))
+
+    threading.Thread(target=produce, name="askui-files-prefetch", daemon=True).start()
+    try:
+        while True:
+            item = items.get()
+            if item is _END_OF_ITERATION:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from .utils import atomic_write
+
+MIN_SAVE_INTERVAL_IN_S = 30
+
+
+class UploadedBlobsDto(BaseModel):
+    paths: dict[str, str] = Field(
+        default_factory=dict,
+        description="Content hash of every uploaded remote file by the file's URL",
+    )
+
+
+class DeduplicationStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.skipped_files = 0
+        self.copied_files = 0
+        self.bytes_saved = 0
+        self.requests_saved = 0
+
+    def add(self, copied: bool, size: int, requests_saved: int) -> None:
+        with self._lock:
+            if copied:
+                self.copied_files += 1
+            else:
+                self.skipped_files += 1
+            self.bytes_saved += size
+            self.requests_saved += requests_saved
+
+    def log(self) -> None:
+        if self.skipped_files == 0 and self.copied_files == 0:
+            return
+        logging.info(
+            f"Deduplicated uploads: skipped {self.skipped_files} files uploaded before "
+            f"and copied {self.copied_files} duplicates on the server, saving "
+            f"{self.bytes_saved} bytes and {self.requests_saved} requests"
+        )
+
+
+class _Claim:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.url: Optional[str] = None
+
+
+class UploadDeduplicator:
+    """Tracks the content hashes of uploaded files so that every unique content is
+    uploaded only once.
+
+    A file whose content was uploaded before under the same URL is skipped. A
+    file whose content was uploaded under another URL is copied on the server
+    instead. The hashes are kept across jobs in `cache_file_path` if given (up to
+    `max_cache_entries`, dropping the oldest ones).
+    """
+
+    def __init__(
+        self, cache_file_path: Optional[str] = None, max_cache_entries: int = 100_000
+    ) -> None:
+        self._cache_file_path = cache_file_path
+        self._max_cache_entries = max_cache_entries
+        self._lock = threading.Lock()
+        self._hashes: dict[str, str] = self._load()  # url -> sha256
+        self._urls: dict[str, str] = {
+            sha256: url for url, sha256 in self._hashes.items()
+        }
+        self._claims: dict[str, _Claim] = {}
+        self._dirty = False
+        self._last_saved = time.monotonic()
+        self.stats = DeduplicationStats()
+
+    def is_uploaded(self, url: str, sha256: str) -> bool:
+        with self._lock:
+            return self._hashes.get(url) == sha256
+
+    def claim(self, sha256: str) -> tuple[bool, Optional[str]]:
+        """Claims uploading the content with the hash `sha256`.
+
+        Waits if another thread is uploading the same content right now.
+
+        Returns:
+            tuple[bool, Optional[str]]: Whether the claim was granted, i.e., the
+                caller must upload the content and `release` the claim, and
+                otherwise the URL of an uploaded file with the same content if any.
+        """
+        with self._lock:
+            claimed = self._try_claim(sha256)
+            if claimed is not None:
+                return claimed
+            claim = self._claims[sha256]
+        claim.done.wait()
+        return False, claim.url
+
+    def try_claim(self, sha256: str) -> Optional[tuple[bool, Optional[str]]]:
+        """Like `claim` but returns None instead of waiting if the same content is
+        being uploaded right now."""
+        with self._lock:
+            return self._try_claim(sha256)
+
+    def _try_claim(self, sha256: str) -> Optional[tuple[bool, Optional[str]]]:
+        url = self._urls.get(sha256)
+        if url is not None:
+            return False, url
+        if sha256 in self._claims:
+            return None
+        self._claims[sha256] = _Claim()
+        return True, None
+
+    def release(self, sha256: str, url: Optional[str]) -> None:
+        """Releases the claim on `sha256` after uploading the content to `url` or
+        failing to (`url` is None)."""
+        with self._lock:
+            claim = self._claims.pop(sha256, None)
+            if url is not None:
+                self._record(url, sha256)
+        if claim is not None:
+            claim.url = url
+            claim.done.set()
+
+    def record(self, url: str, sha256: str) -> None:
+        with self._lock:
+            self._record(url, sha256)
+
+    def forget(self, url: str) -> None:
+        """Forgets a URL, e.g., because copying from it failed."""
+        with self._lock:
+            sha256 = self._hashes.pop(url, None)
+            if sha256 is not None and self._urls.get(sha256) == url:
+                del self._urls[sha256]
+
+    def save(self, force: bool = True) -> None:
+        """Persist the hashes if they changed. Unless `force` is set, they are
+        persisted at most every `MIN_SAVE_INTERVAL_IN_S` seconds."""
+        if self._cache_file_path is None:
+            return
+        with self._lock:
+            if not self._dirty or (
+                not force
+                and time.monotonic() - self._last_saved < MIN_SAVE_INTERVAL_IN_S
+            ):
+                return
+            self._dirty = False
+            self._last_saved = time.monotonic()
+            paths = dict(
+                list(self._hashes.items())[-self._max_cache_entries :]
+                if self._max_cache_entries > 0
+                else []
+            )
+        dir_path = os.path.dirname(self._cache_file_path)
+        if dir_path != "":
+            os.makedirs(dir_path, exist_ok=True)
+        with atomic_write(self._cache_file_path) as f:
+            f.write(UploadedBlobsDto(paths=paths).model_dump_json().encode("utf-8"))
+
+    def _record(self, url: str, sha256: str) -> None:
+        self._hashes.pop(url, None)  # moves the entry to the end, i.e., newest
+        self._hashes[url] = sha256
+        self._urls[sha256] = url
+        self._dirty = True
+
+    def _load(self) -> dict[str, str]:
+        if self._cache_file_path is None or not os.path.exists(self._cache_file_path):
+            return {}
+        try:
+            with open(self._cache_file_path, "r", encoding="utf-8") as f:
+                return UploadedBlobsDto.model_validate(json.load(f)).paths
+        except (OSError, ValueError, ValidationError) as error:
+            logging.warning(
+                f"Ignoring unreadable uploaded files cache {self._cache_file_path}: {error}"
+            )
+            return {}
@@ -1,5 +1,12 @@
+import asyncio
+import threading
 from abc import ABC, abstractmethod
-from typing import Literal
+from typing import Any, Coroutine, Iterable, Literal, Optional, TypeVar
+
+from .scan import ScannedFile
+from .watch import WatchMode
+
+T = TypeVar("T")
 
 
 class FilesUploadService(ABC):
@@ -7,6 +14,23 @@ class FilesUploadService(ABC):
     def upload(self, local_path: str, remote_dir_path: str) -> None:
         raise NotImplementedError()
 
+    @abstractmethod
+    def upload_files(
+        self,
+        local_dir_path: str,
+        files: Iterable[ScannedFile],
+        remote_dir_path: str = "",
+    ) -> None:
+        """Uploads the `files` of `local_dir_path` scanned before like `upload`
+        uploads the whole directory, e.g., to scan a directory only once when
+        uploading it to multiple destinations."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def delete(self, remote_file_path: str) -> None:
+        """Deletes a single uploaded file, e.g., as its local file was deleted."""
+        raise NotImplementedError()
+
 
 class FilesDownloadService(ABC):
     @abstractmethod
@@ -25,3 +49,111 @@ class FilesSyncService(ABC):
         delete: bool = True,
     ) -> None:
         raise NotImplementedError()
+
+    @abstractmethod
+    def watch(
+        self,
+        local_dir_path: str,
+        remote_dir_path: str,
+        source_of_truth: Literal["local", "remote"],
+        dry: bool = False,
+        delete: bool = True,
+        poll_interval_s: float = 30,
+        debounce_s: float = 2,
+        watch_mode: WatchMode = "auto",
+        stopped: Optional[threading.Event] = None,
+    ) -> None:
+        raise NotImplementedError()
+
+
+class AsyncFilesUploadService(ABC):
+    @abstractmethod
+    async def upload(self, local_path: str, remote_dir_path: str) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def upload_files(
+        self,
+        local_dir_path: str,
+        files: Iterable[ScannedFile],
+        remote_dir_path: str = "",
+    ) -> None:
+        """See `FilesUploadService.upload_files`."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def delete(self, remote_file_path: str) -> None:
+        """See `FilesUploadService.delete`."""
+        raise NotImplementedError()
+
+
+class AsyncFilesDownloadService(ABC):
+    @abstractmethod
+    async def download(self, local_dir_path: str, remote_path: str) -> None:
+        raise NotImplementedError()
+
+
+class AsyncFilesService(AsyncFilesUploadService, AsyncFilesDownloadService):
+    async def open(self) -> None:
+        """Keeps resources, e.g., HTTP clients and their connections, across calls
+        until `aclose` is called. All calls must then run on the same event loop."""
+
+    async def aclose(self) -> None:
+        pass
+
+
+class BlockingFilesService(FilesUploadService, FilesDownloadService):
+    """Synchronous facade of an asynchronous files service.
+
+    Calls run to completion on a single event loop running in a background thread,
+    started on the first call, so that the facade can be used wherever a
+    synchronous files service is expected, e.g., by multiple threads at once. The
+    service is kept open (see `AsyncFilesService.open`) until `close` is called so
+    that consecutive calls, e.g., uploads of single files, reuse connections.
+    """
+
+    def __init__(self, service: AsyncFilesService) -> None:
+        self._service = service
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def upload(self, local_path: str, remote_dir_path: str = "") -> None:
+        self._run(self._service.upload(local_path, remote_dir_path))
+
+    def upload_files(
+        self,
+        local_dir_path: str,
+        files: Iterable[ScannedFile],
+        remote_dir_path: str = "",
+    ) -> None:
+        self._run(self._service.upload_files(local_dir_path, files, remote_dir_path))
+
+    def delete(self, remote_file_path: str) -> None:
+        self._run(self._service.delete(remote_file_path))
+
+    def download(self, local_dir_path: str, remote_path: str = "") -> None:
+        self._run(self._service.download(local_dir_path, remote_path))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._loop is None:
+                return
+            loop, self._loop = self._loop, None
+        try:
+            asyncio.run_coroutine_threadsafe(self._service.aclose(), loop).result()
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+    def _run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop()).result()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="askui-files-loop", daemon=True
+                ).start()
+                asyncio.run_coroutine_threadsafe(self._service.open(), loop).result()
+                self._loop = loop
+            return self._loop
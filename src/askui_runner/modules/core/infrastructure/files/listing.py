@@ -0,0 +1,294 @@
+import contextlib
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Mapping, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from .records import FileRecord, FilesListPage
+from .utils import atomic_write
+
+ENTRY_FILE_EXTENSION = ".json"
+DEFAULT_MAX_LISTING_CACHE_ENTRIES = 10_000
+MAX_RELISTED_PAGES = 8
+
+
+class ListingStats:
+    """Latencies of the pages of a listing of remote files, the number of pages
+    reused from the `ListingCache` as they were not modified and the number of
+    requests for pages that failed (and were retried)."""
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix = prefix
+        self.pages = 0
+        self.not_modified_pages = 0
+        self.files = 0
+        self.failed_requests = 0
+        self.total_latency_s = 0.0
+        self.max_latency_s = 0.0
+
+    def add_page(self, latency_s: float, files: int, not_modified: bool) -> None:
+        self.pages += 1
+        if not_modified:
+            self.not_modified_pages += 1
+        self.files += files
+        self.total_latency_s += latency_s
+        self.max_latency_s = max(self.max_latency_s, latency_s)
+
+    def add_failure(self) -> None:
+        self.failed_requests += 1
+
+    def log(self) -> None:
+        if self.pages == 0:
+            return
+        message = (
+            f"Listed {self.files} files under '{self.prefix}' in {self.pages} pages "
+            f"({self.not_modified_pages} not modified; page latency: "
+            f"avg {self.total_latency_s / self.pages * 1000:.0f} ms, "
+            f"max {self.max_latency_s * 1000:.0f} ms, "
+            f"{self.failed_requests} failed requests)"
+        )
+        # only worth reporting by default if the files API had hiccups
+        logging.log(logging.INFO if self.failed_requests else logging.DEBUG, message)
+
+
+class ListingCacheEntry(BaseModel):
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body: Any
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Headers asking the files API to respond with 304 (Not Modified) instead
+        of the page if it did not change since it was cached."""
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ListingCache:
+    """On-disk cache of pages of listings of remote files shared across jobs and
+    runners.
+
+    Pages are cached by their URL, i.e., by prefix, page size and continuation
+    token, together with their validators (`ETag` and `Last-Modified` response
+    headers) and requested conditionally, so that a page that was not modified is
+    not sent again. Pages of files APIs that do not send validators are not
+    cached. Every page is stored in its own file so that concurrent runners can
+    share the cache. The least recently used pages beyond `max_entries` are
+    removed when the cache is opened.
+
+    The (presigned) download URLs of the files are not cached as they expire and
+    grant access to the files; see `ListedDownloadUrls`. Hence, the files services
+    only request pages conditionally if most of their files need not be
+    downloaded, e.g., as they are in the `FilesCache` or unchanged since the last
+    sync.
+    """
+
+    def __init__(
+        self, dir_path: str, max_entries: int = DEFAULT_MAX_LISTING_CACHE_ENTRIES
+    ) -> None:
+        self._dir_path = dir_path
+        self._max_entries = max_entries
+        self._evict()
+
+    def get(self, url: str) -> Optional[ListingCacheEntry]:
+        entry_path = self._entry_path(url)
+        try:
+            with open(entry_path, "rb") as f:
+                entry = ListingCacheEntry.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, ValidationError) as error:
+            logging.debug(
+                f"Ignoring unreadable listing cache entry {entry_path}: {error}"
+            )
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(entry_path)  # marks the entry as recently used
+        return entry
+
+    def store(self, url: str, headers: Mapping[str, str], body: Any) -> None:
+        """Caches the page at `url` (without download URLs) if the response has
+        validators."""
+        entry = ListingCacheEntry(
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            body=strip_download_urls(body),
+        )
+        if entry.etag is None and entry.last_modified is None:
+            return
+        try:
+            with atomic_write(self._entry_path(url)) as f:
+                f.write(entry.model_dump_json().encode("utf-8"))
+        except OSError as error:
+            logging.warning(f"Failed to cache listing page {url}: {error}")
+
+    def _entry_path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self._dir_path, key + ENTRY_FILE_EXTENSION)
+
+    def _evict(self) -> None:
+        try:
+            with os.scandir(self._dir_path) as entries:
+                files = [
+                    (entry.stat().st_mtime, entry.path)
+                    for entry in entries
+                    if entry.name.endswith(ENTRY_FILE_EXTENSION)
+                ]
+        except FileNotFoundError:
+            return
+        except OSError as error:
+            logging.warning(f"Failed to list listing cache {self._dir_path}: {error}")
+            return
+        if len(files) <= self._max_entries:
+            return
+        files.sort()
+        for _, file_path in files[: len(files) - self._max_entries]:
+            with contextlib.suppress(OSError):
+                os.remove(file_path)
+
+
+class ListingPageRequest:
+    """Request of a page of a listing of remote files, sent conditionally if the
+    page is in the `ListingCache` (and `conditional` is enabled) so that the cached
+    page is used if the files API reports it as not modified (304). Files of cached
+    pages have no download URL.
+
+    The files services `load_cached` the page, send the request with `headers`,
+    `read` the page from the response and `store` it (loading and storing are
+    blocking) and report requests that failed otherwise as `failed`.
+    """
+
+    def __init__(
+        self,
+        listing_cache: Optional[ListingCache],
+        list_url: str,
+        stats: ListingStats,
+        conditional: bool = True,
+    ) -> None:
+        self.list_url = list_url
+        self._listing_cache = listing_cache
+        self._stats = stats
+        self._conditional = conditional
+        self._cached: Optional[ListingCacheEntry] = None
+        self._modified = True
+        self._response_headers: Mapping[str, str] = {}
+        self._body: Any = None
+        self._start = time.perf_counter()
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {} if self._cached is None else self._cached.conditional_headers()
+
+    def load_cached(self) -> None:
+        if self._listing_cache is not None and self._conditional:
+            self._cached = self._listing_cache.get(self.list_url)
+
+    def read(
+        self,
+        status_code: int,
+        headers: Mapping[str, str],
+        read_body: Callable[[], Any],
+    ) -> FilesListPage:
+        """Reads the page from the response, whose JSON body `read_body` returns
+        (raising for unexpected status codes), or, if it was not modified, from the
+        cache."""
+        try:
+            if self._cached is not None and status_code == 304:
+                self._modified = False
+                body = self._cached.body
+            else:
+                body = read_body()
+            page = FilesListPage.from_json(body)
+        except Exception:
+            self.failed()
+            raise
+        self._response_headers = headers
+        self._body = body
+        for file in page.data:
+            file.listing_url = self.list_url
+        self._stats.add_page(
+            time.perf_counter() - self._start, len(page.data), not self._modified
+        )
+        return page
+
+    def failed(self) -> None:
+        self._stats.add_failure()
+
+    def store(self) -> None:
+        if (
+            self._listing_cache is not None
+            and self._modified
+            and self._body is not None
+        ):
+            self._listing_cache.store(self.list_url, self._response_headers, self._body)
+
+
+def strip_download_urls(body: Any) -> Any:
+    """Copy of the listing response `body` whose files have no download URL."""
+    if not isinstance(body, dict) or not isinstance(body.get("data"), list):
+        return body
+    return {
+        **body,
+        "data": [
+            {**file, "url": ""} if isinstance(file, dict) else file
+            for file in body["data"]
+        ],
+    }
+
+
+class ListedDownloadUrls:
+    """Download URLs of the files of the pages listed again as their files had no
+    (valid) download URL, i.e., as the pages were taken from the `ListingCache` or
+    the URLs expired, so that every page is only listed again once.
+
+    Only the most recently listed pages are kept.
+    """
+
+    def __init__(self, max_pages: int = MAX_RELISTED_PAGES) -> None:
+        self._max_pages = max_pages
+        self._pages: OrderedDict[str, dict[str, str]] = OrderedDict()
+        self.lock = threading.Lock()  # held while listing a page again
+
+    def get(self, listing_url: str, path: str) -> Optional[str]:
+        urls = self._pages.get(listing_url)
+        return None if urls is None else urls.get(path)
+
+    def add(self, listing_url: str, page: FilesListPage) -> None:
+        self._pages[listing_url] = {file.path: file.url for file in page.data}
+        self._pages.move_to_end(listing_url)
+        while len(self._pages) > self._max_pages:
+            self._pages.popitem(last=False)
+
+    @staticmethod
+    def needs_relisting(url: Optional[str], expired_url: Optional[str]) -> bool:
+        return not url or url == expired_url
+
+    @staticmethod
+    def is_rejected(status_code: int, file: FileRecord) -> bool:
+        """Whether the download of `file` failed as its download URL was rejected,
+        e.g., as it expired, so that it is worth listing it again."""
+        return status_code == 403 and file.listing_url is not None
+
+    @staticmethod
+    def find(page: FilesListPage, path: str) -> Optional[str]:
+        return next((file.url for file in page.data if file.path == path), None)
+
+    @staticmethod
+    def assign(file: FileRecord, url: Optional[str]) -> str:
+        """Sets the download URL of `file` listed again.
+
+        Raises:
+            FileNotFoundError: If `file` was not listed again (`url` is None).
+        """
+        if not url:
+            raise FileNotFoundError(f"{file.path} is no longer listed")
+        file.url = url
+        return url
@@ -0,0 +1,326 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from .utils import atomic_write
+
+MANIFEST_VERSION = 1
+HASH_READ_SIZE_IN_BYTES = 1024 * 1024
+
+
+class LocalFileState(BaseModel):
+    """Metadata of a local file that changes whenever the file is written."""
+
+    inode: int
+    mtime_ns: int
+    size: int
+
+    @classmethod
+    def from_stat(cls, stat: os.stat_result) -> "LocalFileState":
+        return cls(inode=stat.st_ino, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+
+
+class SyncManifestEntry(BaseModel):
+    local: LocalFileState
+    remote_last_modified: Optional[float] = Field(
+        default=None,
+        description="Timestamp of the remote file; unknown right after uploading it",
+    )
+    remote_size: Optional[int] = Field(default=None)
+    sha256: Optional[str] = Field(default=None)
+
+
+class SyncManifestDto(BaseModel):
+    version: int = MANIFEST_VERSION
+    entries: dict[str, SyncManifestEntry] = Field(default_factory=dict)
+
+
+def hash_file(file_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(HASH_READ_SIZE_IN_BYTES):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class SyncManifest:
+    """State of the files after the last sync of a local and a remote directory.
+
+    Files whose local and remote metadata still match the recorded state are
+    unchanged and can be skipped without comparing them. If `hash_contents` is
+    enabled, local files whose metadata changed (e.g., because they were only
+    touched) are compared by their content hash.
+
+    The manifest is kept in memory only if `file_path` is None. Without
+    `keep_entries`, such a manifest does not record anything, e.g., if it is not
+    used after the sync.
+    """
+
+    def __init__(
+        self,
+        file_path: Optional[str],
+        hash_contents: bool = False,
+        keep_entries: bool = True,
+    ):
+        self._file_path = file_path
+        self._hash_contents = hash_contents
+        self._keep_entries = keep_entries or file_path is not None
+        self._entries: dict[str, SyncManifestEntry] = {}
+        self._hashes: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        if self._file_path is None or not os.path.exists(self._file_path):
+            return
+        try:
+            with open(self._file_path, "r", encoding="utf-8") as f:
+                manifest = SyncManifestDto.model_validate(json.load(f))
+        except (OSError, ValueError, ValidationError) as error:
+            logging.warning(
+                f"Ignoring unreadable sync manifest {self._file_path}: {error}"
+            )
+            return
+        if manifest.version == MANIFEST_VERSION:
+            self._entries = manifest.entries
+
+    def save(self) -> None:
+        if self._file_path is None:
+            return
+        with self._lock:
+            manifest = SyncManifestDto(entries=dict(self._entries))
+        with atomic_write(self._file_path) as f:
+            f.write(manifest.model_dump_json().encode("utf-8"))
+
+    def close(self) -> None:
+        pass
+
+    def hash_modified_files(
+        self,
+        local_files: Iterable[tuple[str, str, LocalFileState]],
+        max_workers: int,
+    ) -> None:
+        """Compute (in parallel) the content hashes of the local files whose
+        metadata does not match the manifest.
+
+        Args:
+            local_files (Iterable[tuple[str, str, LocalFileState]]): Relative paths, absolute paths and states of the local files.
+            max_workers (int): The maximum number of files hashed concurrently.
+        """
+        if not self._hash_contents or not self._keep_entries:
+            return
+        to_hash = [
+            (relative_path, file_path)
+            for relative_path, file_path, local in local_files
+            if not self._matches_local(relative_path, local)
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            hashes = executor.map(lambda paths: hash_file(paths[1]), to_hash)
+            for (relative_path, _), sha256 in zip(to_hash, hashes, strict=True):
+                self._hashes[relative_path] = sha256
+
+    def is_unchanged(
+        self,
+        relative_path: str,
+        local: LocalFileState,
+        remote_last_modified: float,
+        remote_size: int,
+    ) -> bool:
+        """Whether neither the local nor the remote file changed since the last sync.
+
+        A file whose remote state is unknown (e.g., as it was uploaded during the
+        last sync) counts as changed so that it is compared by its metadata, which
+        records the remote state if the file is unchanged.
+
+        Refreshes the entry of the file if the local file was only touched.
+        """
+        entry = self._get(relative_path)
+        if entry is None:
+            return False
+        if (
+            entry.remote_last_modified != remote_last_modified
+            or entry.remote_size != remote_size
+        ):
+            return False
+        if not self._matches_local(relative_path, local, entry):
+            sha256 = self._hashes.get(relative_path)
+            if sha256 is None or sha256 != entry.sha256:
+                return False
+            self._hashes.pop(relative_path, None)
+        self._put(
+            relative_path,
+            SyncManifestEntry(
+                local=local,
+                remote_last_modified=remote_last_modified,
+                remote_size=remote_size,
+                sha256=entry.sha256,
+            ),
+        )
+        return True
+
+    def record(
+        self,
+        relative_path: str,
+        local_file_path: str,
+        remote_last_modified: Optional[float] = None,
+        remote_size: Optional[int] = None,
+    ) -> None:
+        """Record the state of a file whose content was synced, e.g., uploaded.
+
+        The state of the remote file may be unknown, e.g., right after uploading
+        it, until the file is listed the next time.
+        """
+        self._record(
+            relative_path,
+            local_file_path,
+            remote_last_modified,
+            remote_size,
+            sha256=self._hashes.pop(relative_path, None),
+        )
+
+    def record_download(
+        self,
+        relative_path: str,
+        local_file_path: str,
+        remote_last_modified: float,
+        remote_size: int,
+    ) -> None:
+        """Record the state of a file after replacing it with the remote file."""
+        self._record(
+            relative_path,
+            local_file_path,
+            remote_last_modified,
+            remote_size,
+            sha256=None,
+        )
+
+    def remove(self, relative_path: str) -> None:
+        self._hashes.pop(relative_path, None)
+        with self._lock:
+            self._entries.pop(relative_path, None)
+
+    def _record(
+        self,
+        relative_path: str,
+        local_file_path: str,
+        remote_last_modified: Optional[float],
+        remote_size: Optional[int],
+        sha256: Optional[str],
+    ) -> None:
+        if not self._keep_entries:
+            return
+        local = LocalFileState.from_stat(os.stat(local_file_path))
+        if self._hash_contents and sha256 is None:
+            sha256 = hash_file(local_file_path)
+        self._put(
+            relative_path,
+            SyncManifestEntry(
+                local=local,
+                remote_last_modified=remote_last_modified,
+                remote_size=remote_size,
+                sha256=sha256,
+            ),
+        )
+
+    def _get(self, relative_path: str) -> Optional[SyncManifestEntry]:
+        return self._entries.get(relative_path)
+
+    def _put(self, relative_path: str, entry: SyncManifestEntry) -> None:
+        if not self._keep_entries:
+            return
+        with self._lock:
+            self._entries[relative_path] = entry
+
+    def _matches_local(
+        self,
+        relative_path: str,
+        local: LocalFileState,
+        entry: Optional[SyncManifestEntry] = None,
+    ) -> bool:
+        if entry is None:
+            entry = self._get(relative_path)
+        return entry is not None and entry.local == local
+
+
+class SqliteSyncManifest(SyncManifest):
+    """Sync manifest keeping its entries in an SQLite database at `file_path`
+    instead of in memory so that the memory used does not grow with the number of
+    files, e.g., for streaming syncs.
+
+    Changes are committed by `save`; without, they are rolled back on `close`.
+    """
+
+    def __init__(self, file_path: str, hash_contents: bool = False):
+        super().__init__(file_path, hash_contents)
+        self._db_file_path = file_path
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def load(self) -> None:
+        try:
+            self._connection = self._connect()
+        except sqlite3.DatabaseError as error:
+            logging.warning(
+                f"Ignoring unreadable sync manifest {self._db_file_path}: {error}"
+            )
+            os.remove(self._db_file_path)
+            self._connection = self._connect()
+
+    def save(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def remove(self, relative_path: str) -> None:
+        self._hashes.pop(relative_path, None)
+        with self._lock:
+            self._db().execute("DELETE FROM entries WHERE path = ?", (relative_path,))
+
+    def _get(self, relative_path: str) -> Optional[SyncManifestEntry]:
+        with self._lock:
+            row = (
+                self._db()
+                .execute("SELECT entry FROM entries WHERE path = ?", (relative_path,))
+                .fetchone()
+            )
+        return None if row is None else SyncManifestEntry.model_validate_json(row[0])
+
+    def _put(self, relative_path: str, entry: SyncManifestEntry) -> None:
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO entries (path, entry) VALUES (?, ?)",
+                (relative_path, entry.model_dump_json()),
+            )
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            raise RuntimeError("The sync manifest is not loaded")
+        return self._connection
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self._db_file_path) or ".", exist_ok=True)
+        connection = sqlite3.connect(self._db_file_path, check_same_thread=False)
+        try:
+            (version,) = connection.execute("PRAGMA user_version").fetchone()
+            if version != MANIFEST_VERSION:
+                connection.execute("DROP TABLE IF EXISTS entries")
+                connection.execute(f"PRAGMA user_version = {MANIFEST_VERSION}")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries (path TEXT PRIMARY KEY, entry TEXT NOT NULL)"
+            )
+            connection.commit()
+        except sqlite3.DatabaseError:
+            connection.close()
+            raise
+        return connection
@@ -0,0 +1,56 @@
+import itertools
+from typing import Generator, Iterable, Iterator, Optional, TypeVar
+
+L = TypeVar("L")
+R = TypeVar("R")
+T = TypeVar("T")
+
+
+class UnsortedError(ValueError):
+    """Raised if the keys of an input of `merge_join` are not strictly increasing."""
+
+
+def merge_join(
+    left: Iterable[tuple[str, L]], right: Iterable[tuple[str, R]]
+) -> Generator[tuple[str, Optional[L], Optional[R]], None, None]:
+    """Joins two streams of (key, item) pairs sorted by key (full outer join),
+    holding only the current item of each stream in memory.
+
+    Raises:
+        UnsortedError: If the keys of a stream are not strictly increasing.
+    """
+    left_items = _checked(left, "left")
+    right_items = _checked(right, "right")
+    left_item = next(left_items, None)
+    right_item = next(right_items, None)
+    while left_item is not None or right_item is not None:
+        if right_item is None or (
+            left_item is not None and left_item[0] < right_item[0]
+        ):
+            assert left_item is not None
+            yield left_item[0], left_item[1], None
+            left_item = next(left_items, None)
+        elif left_item is None or right_item[0] < left_item[0]:
+            yield right_item[0], None, right_item[1]
+            right_item = next(right_items, None)
+        else:
+            yield left_item[0], left_item[1], right_item[1]
+            left_item = next(left_items, None)
+            right_item = next(right_items, None)
+
+
+def chunked(iterable: Iterable[T], size: int) -> Generator[list[T], None, None]:
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _checked(items: Iterable[tuple[str, T]], name: str) -> Iterator[tuple[str, T]]:
+    previous_key: Optional[str] = None
+    for key, item in items:
+        if previous_key is not None and key <= previous_key:
+            raise UnsortedError(
+                f"Keys of the {name} stream are not sorted: {key!r} after {previous_key!r}"
+            )
+        previous_key = key
+        yield key, item
@@ -0,0 +1,85 @@
+from typing import Any, NamedTuple
+from urllib.parse import urlencode
+
+
+class UploadPart(NamedTuple):
+    number: int
+    offset: int
+    size: int
+
+
+class MultipartUpload:
+    """Protocol for uploading large files in parts that are uploaded (and retried)
+    independently of each other:
+
+    1. `POST <file url>?action=create_multipart_upload&strict=...` returns `{"upload_id": ...}`.
+    2. `PUT <file url>?upload_id=...&part_number=<n>` with the raw bytes of part `n`
+       (starting at 1) returns the `ETag` of the part.
+    3. `POST <file url>?action=complete_multipart_upload&upload_id=...` with
+       `{"parts": [{"part_number": ..., "etag": ...}, ...]}` assembles the file.
+
+    An upload that failed is aborted with `DELETE <file url>?upload_id=...`.
+    """
+
+    def __init__(
+        self,
+        threshold_in_bytes: int,
+        part_size_in_bytes: int,
+        max_concurrent_parts: int,
+    ) -> None:
+        self.threshold_in_bytes = threshold_in_bytes
+        self.part_size_in_bytes = part_size_in_bytes
+        self.max_concurrent_parts = max_concurrent_parts
+
+    def should_split(self, size: int) -> bool:
+        return size >= self.threshold_in_bytes and size > self.part_size_in_bytes
+
+    def split(self, size: int) -> list[UploadPart]:
+        return [
+            UploadPart(
+                number=index + 1,
+                offset=offset,
+                size=min(self.part_size_in_bytes, size - offset),
+            )
+            for index, offset in enumerate(range(0, size, self.part_size_in_bytes))
+        ]
+
+    @staticmethod
+    def create_url(file_url: str, strict: bool) -> str:
+        return f"{file_url}?{urlencode({'action': 'create_multipart_upload', 'strict': strict})}"
+
+    @staticmethod
+    def part_url(file_url: str, upload_id: str, part: UploadPart) -> str:
+        return f"{file_url}?{urlencode({'upload_id': upload_id, 'part_number': part.number})}"
+
+    @staticmethod
+    def complete_url(file_url: str, upload_id: str) -> str:
+        return f"{file_url}?{urlencode({'action': 'complete_multipart_upload', 'upload_id': upload_id})}"
+
+    @staticmethod
+    def abort_url(file_url: str, upload_id: str) -> str:
+        return f"{file_url}?{urlencode({'upload_id': upload_id})}"
+
+    @staticmethod
+    def complete_body(etags: dict[int, str]) -> dict[str, Any]:
+        return {
+            "parts": [
+                {"part_number": number, "etag": etag}
+                for number, etag in sorted(etags.items())
+            ]
+        }
+
+
+def read_part(file_path: str, part: UploadPart) -> bytes:
+    """
+    Raises:
+        RuntimeError: If the file shrank and the part could not be read completely.
+    """
+    with open(file_path, "rb") as f:
+        f.seek(part.offset)
+        data = f.read(part.size)
+    if len(data) != part.size:
+        raise RuntimeError(
+            f"{file_path} shrank while uploading part {part.number} of it"
+        )
+    return data
@@ -0,0 +1,249 @@
+"""Protocol of the AskUI files API shared by `AskUiFilesService` and
+`AsyncAskUiFilesService`: the URLs of the requests and the planning and
+bookkeeping around them. The services only differ in how they send the requests
+and access the file system (blocking or on an event loop).
+"""
+
+import logging
+import os
+import re
+import uuid
+from typing import Callable, Generator, Iterable, Optional, Union
+from urllib.parse import quote, urlencode, urljoin
+
+from .compression import UploadCompression
+from .dedup import UploadDeduplicator
+from .manifest import hash_file
+from .multipart import MultipartUpload
+from .records import FileRecord
+from .scan import ScannedFile, scan_files
+
+UPLOAD_REQUEST_TIMEOUT_IN_S = 3600  # allows for uploading large files
+UPLOAD_CHUNK_SIZE_IN_BYTES = 1024 * 1024
+# the largest page size the files API is known to accept
+MAX_LIST_PAGE_SIZE = 100
+
+HIDDEN_FILES_PATTERNS = [
+    r"^workspaces/[^/]+/test-cases/\.askui/.+$",
+]
+HIDDEN_FILES_MATCHER = re.compile(
+    "|".join(f"(?:{pattern})" for pattern in HIDDEN_FILES_PATTERNS)
+)
+
+
+def is_hidden_file(path: str) -> bool:
+    """Whether the listed file at `path` is neither downloaded nor synced."""
+    return HIDDEN_FILES_MATCHER.match(path) is not None
+
+
+def build_local_file_path(local_dir_path: str, prefix: str, file: FileRecord) -> str:
+    """Local path to download `file` listed under `prefix` to."""
+    if prefix == file.path:  # is a file
+        relative_remote_path = file.name
+    else:  # is a prefix, e.g., folder
+        relative_remote_path = file.path[len(prefix) :].lstrip("/")
+    return os.path.join(local_dir_path, *relative_remote_path.split("/"))
+
+
+def join_remote_path(remote_dir_path: str, relative_path: str) -> str:
+    if remote_dir_path == "":
+        return relative_path
+    return f"{remote_dir_path}/{relative_path}"
+
+
+def build_list_url(
+    base_url: str, prefix: str, limit: int, continuation_token: Optional[str] = None
+) -> str:
+    """URL of a page of the listing of the files under `prefix` with their
+    download URLs."""
+    params: dict[str, Union[str, int]] = {
+        "prefix": prefix,
+        "limit": limit,
+        "expand": "url",
+    }
+    if continuation_token:
+        params["continuation_token"] = continuation_token
+    return f"{base_url}?{urlencode(params)}"
+
+
+def next_list_page_size(limit: int) -> int:
+    """A small page size doubles with every page up to `MAX_LIST_PAGE_SIZE` so that
+    small prefixes are listed quickly while large ones need fewer requests. A
+    larger page size, which must have been configured explicitly, is kept."""
+    return max(limit, min(limit * 2, MAX_LIST_PAGE_SIZE))
+
+
+def build_file_url(base_url: str, remote_file_path: str) -> str:
+    return urljoin(base=base_url + "/", url=quote(remote_file_path))
+
+
+def build_upload_url(file_url: str, strict: bool = False) -> str:
+    return f"{file_url}?{urlencode({'strict': strict})}"
+
+
+def build_copy_url(file_url: str, source_url: str) -> str:
+    return f"{file_url}?{urlencode({'strict': False, 'copy_from': source_url})}"
+
+
+def build_bundle_upload(base_url: str, remote_dir_path: str) -> tuple[str, str]:
+    """Name and upload URL of a new bundle (tar archive) that the files API
+    extracts into `remote_dir_path`."""
+    bundle_name = f"bundle-{uuid.uuid4().hex}.tar"
+    url = build_file_url(base_url, join_remote_path(remote_dir_path, bundle_name))
+    return bundle_name, f"{url}?{urlencode({'strict': False, 'extract': 'tar'})}"
+
+
+def walk_upload_dir(
+    local_dir_path: str,
+    remote_dir_path: str,
+    files: Optional[Iterable[ScannedFile]] = None,
+) -> Generator[tuple[ScannedFile, str], None, None]:
+    """Yields all files to upload from `local_dir_path` with their remote paths
+    while the directory is still being scanned or, if given, the `files` of
+    `local_dir_path` scanned before."""
+    for file in scan_files(local_dir_path) if files is None else files:
+        yield file, join_remote_path(remote_dir_path, file.relative_path)
+
+
+def plan_upload_dir(
+    local_dir_path: str,
+    remote_dir_path: str,
+    files: Optional[Iterable[ScannedFile]],
+    bundle_max_file_size_in_bytes: Optional[int],
+    is_uploaded_before: Callable[[str, str, int], bool],
+    small_files: list[tuple[str, str, int]],
+) -> Generator[tuple[str, str], None, None]:
+    """Yields the local and remote paths of the files to upload individually and,
+    if bundling is enabled, collects the files not larger than
+    `bundle_max_file_size_in_bytes` that were not uploaded before with their
+    relative paths and sizes in `small_files` to be bundled (see
+    `group_into_bundles`) once all files were planned."""
+    for file, remote_file_path in walk_upload_dir(
+        local_dir_path, remote_dir_path, files
+    ):
+        if bundle_max_file_size_in_bytes is not None:
+            size = file.stat().st_size
+            if size <= bundle_max_file_size_in_bytes:
+                if not is_uploaded_before(file.path, remote_file_path, size):
+                    small_files.append((file.path, file.relative_path, size))
+                continue
+        yield file.path, remote_file_path
+
+
+def requests_per_upload(multipart: Optional[MultipartUpload], size: int) -> int:
+    if multipart is not None and multipart.should_split(size):
+        return len(multipart.split(size)) + 2  # including creating and completing
+    return 1
+
+
+def is_bundled_file_uploaded_before(
+    dedup: Optional[UploadDeduplicator],
+    base_url: str,
+    local_file_path: str,
+    remote_file_path: str,
+    size: int,
+) -> bool:
+    """Whether a file to bundle was uploaded with the same content to the same
+    URL before. Duplicates of other files are bundled anyway as copying them
+    would take a request each."""
+    if dedup is None:
+        return False
+    file_url = build_file_url(base_url, remote_file_path)
+    if not dedup.is_uploaded(file_url, hash_file(local_file_path)):
+        return False
+    logging.info(f"Skipping {local_file_path} as it was uploaded before")
+    dedup.stats.add(False, size, 0)
+    return True
+
+
+def record_bundle_uploaded(
+    dedup: Optional[UploadDeduplicator],
+    base_url: str,
+    files: list[tuple[str, str]],
+    remote_dir_path: str,
+) -> None:
+    if dedup is None:
+        return
+    for local_file_path, relative_path in files:
+        remote_file_path = join_remote_path(remote_dir_path, relative_path)
+        dedup.record(
+            build_file_url(base_url, remote_file_path), hash_file(local_file_path)
+        )
+
+
+def finish_upload(
+    compression: Optional[UploadCompression],
+    dedup: Optional[UploadDeduplicator],
+    is_dir: bool,
+) -> None:
+    """Logs the statistics of an upload of a directory or a single file and
+    persists the uploads recorded for deduplication."""
+    if compression is not None:
+        compression.stats.log()
+    if dedup is not None:
+        if is_dir:
+            dedup.stats.log()
+        # single files are uploaded one by one, e.g., incrementally
+        dedup.save(force=is_dir)
+
+
+class DeduplicatedUpload:
+    """Bookkeeping of uploading a file deduplicated with an `UploadDeduplicator`.
+
+    The services send the requests and report their outcomes:
+
+    1. Skip the upload if `is_uploaded_before`.
+    2. Claim the content (see `UploadDeduplicator.claim`). If the claim is
+       granted, upload the file and `release` the claim.
+    3. Otherwise, copy the file on the server from the `copy_source` (if any) and
+       report it as `copied` or, if copying failed, as `copy_failed`.
+    4. If the file was not copied, upload it and report it as `uploaded`.
+    """
+
+    def __init__(
+        self,
+        dedup: UploadDeduplicator,
+        base_url: str,
+        multipart: Optional[MultipartUpload],
+        local_file_path: str,
+        remote_file_path: str,
+    ) -> None:
+        """Hashes the file (blocking)."""
+        self._dedup = dedup
+        self._base_url = base_url
+        self.local_file_path = local_file_path
+        self.file_url = build_file_url(base_url, remote_file_path)
+        self.sha256 = hash_file(local_file_path)
+        self._size = os.path.getsize(local_file_path)
+        self._requests_per_upload = requests_per_upload(multipart, self._size)
+
+    def is_uploaded_before(self) -> bool:
+        if not self._dedup.is_uploaded(self.file_url, self.sha256):
+            return False
+        logging.info(f"Skipping {self.local_file_path} as it was uploaded before")
+        self._dedup.stats.add(False, self._size, self._requests_per_upload)
+        return True
+
+    def release(self, uploaded: bool) -> None:
+        self._dedup.release(self.sha256, self.file_url if uploaded else None)
+
+    def copy_source(self, source_url: Optional[str]) -> Optional[str]:
+        """The URL of the duplicate to copy as copying is only possible within
+        the same files API."""
+        if source_url is not None and source_url.startswith(self._base_url + "/"):
+            return source_url
+        return None
+
+    def copied(self) -> None:
+        self._dedup.record(self.file_url, self.sha256)
+        self._dedup.stats.add(True, self._size, self._requests_per_upload - 1)
+
+    def copy_failed(self, source_url: str, error: Exception) -> None:
+        """E.g., as the source was deleted."""
+        logging.warning(
+            f"Failed to copy {source_url} to {self.file_url}, uploading {self.local_file_path} instead: {error}"
+        )
+        self._dedup.forget(source_url)
+
+    def uploaded(self) -> None:
+        self._dedup.record(self.file_url, self.sha256)
@@ -0,0 +1,133 @@
+import os
+from datetime import datetime, timezone
+from typing import Any, Optional, Union
+
+from pydantic import TypeAdapter
+
+from .manifest import LocalFileState
+
+_DATETIME_ADAPTER = TypeAdapter(datetime)
+
+
+def parse_last_modified(value: Union[str, float, datetime]) -> datetime:
+    """Parse an ISO 8601 string (as returned by the files API) or a timestamp into
+    a timezone-aware datetime. Datetimes without timezone are assumed to be UTC.
+
+    Raises:
+        ValueError: If `value` is not a valid datetime.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    else:
+        try:
+            # fast path; only accepts "Z" as of Python 3.11
+            parsed = datetime.fromisoformat(
+                value[:-1] + "+00:00" if value.endswith("Z") else value
+            )
+        except ValueError:
+            # Before Python 3.11, `fromisoformat` rejects valid ISO 8601 strings,
+            # e.g., with fractions of seconds other than 3 or 6 digits
+            parsed = _DATETIME_ADAPTER.validate_python(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class FileRecord:
+    """Lightweight record of a (remote) file.
+
+    Listings can contain hundreds of thousands of files, so records are plain
+    `__slots__` objects that parse the last modified date only when accessed.
+
+    `listing_url` is the URL of the listing page the file was listed on, e.g., to
+    list it again for a fresh download URL.
+    """
+
+    __slots__ = ("name", "path", "url", "size", "_last_modified", "listing_url")
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        url: str,
+        size: int,
+        last_modified: Union[str, float, datetime],
+    ):
+        self.name = name
+        self.path = path
+        self.url = url
+        self.size = size
+        self._last_modified = last_modified
+        self.listing_url: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "FileRecord":
+        """Create a record from a file object of a listing of the files API.
+
+        Raises:
+            ValueError: If a required field is missing.
+        """
+        try:
+            return cls(
+                data["name"],
+                data["path"],
+                data["url"],
+                int(data["size"]),
+                data["lastModified"],
+            )
+        except KeyError as error:
+            raise ValueError(f"Missing field {error} in file {data!r}") from error
+
+    @property
+    def last_modified(self) -> datetime:
+        if not isinstance(self._last_modified, datetime):
+            self._last_modified = parse_last_modified(self._last_modified)
+        return self._last_modified
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(path={self.path!r}, size={self.size})"
+
+
+class LocalFileRecord(FileRecord):
+    __slots__ = ("_stat",)
+
+    def __init__(self, name: str, path: str, stat: os.stat_result):
+        super().__init__(
+            name=name,
+            path=path,
+            url=f"file://{path}",
+            size=stat.st_size,
+            last_modified=stat.st_mtime,
+        )
+        self._stat = stat
+
+    @property
+    def state(self) -> LocalFileState:
+        """Metadata for detecting changes since the last sync."""
+        return LocalFileState.from_stat(self._stat)
+
+
+class FilesListPage:
+    __slots__ = ("data", "next_continuation_token")
+
+    def __init__(self, data: list[FileRecord], next_continuation_token: Optional[str]):
+        self.data = data
+        self.next_continuation_token = next_continuation_token
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "FilesListPage":
+        """Create a page from a listing response of the files API.
+
+        Raises:
+            ValueError: If the response is malformed.
+        """
+        try:
+            files = data["data"]
+        except (KeyError, TypeError) as error:
+            raise ValueError(f"Malformed files list response: {data!r}") from error
+        return cls(
+            data=[FileRecord.from_json(file) for file in files],
+            next_continuation_token=data.get("next_continuation_token"),
+        )
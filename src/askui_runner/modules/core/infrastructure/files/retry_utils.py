@@ -1,10 +1,21 @@
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
 import requests
 from tenacity import (
+    RetryCallState,
     retry,
     stop_after_attempt,
-    wait_exponential,
+    wait_random_exponential,
     retry_if_exception_type,
 )
+from tenacity.stop import stop_base
+from tenacity.wait import wait_base
+
+from ..circuit_breaker import get_retry_budget
+
+MAX_RETRY_WAIT_IN_S = 120
 
 
 def extract_response_text(response: requests.Response) -> str | None:
@@ -82,13 +93,62 @@ def handle_response_status(
             raise NonRetryableHTTPError(response)
 
 
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds to wait according to the `Retry-After` header (given in seconds or
+    as HTTP date) or None if there is no valid one."""
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class wait_retry_after(wait_base):
+    """Waits as long as the server asked to with `Retry-After` (up to
+    `MAX_RETRY_WAIT_IN_S`) and otherwise for a random time of up to exponentially
+    growing length ("full jitter") so that concurrent transfers failing at the same
+    time do not retry all at once."""
+
+    def __init__(self, fallback: wait_base) -> None:
+        self.fallback = fallback
+
+    def __call__(self, retry_state: RetryCallState) -> float:
+        error = retry_state.outcome.exception() if retry_state.outcome else None
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after = parse_retry_after(response.headers)
+            if retry_after is not None:
+                return min(retry_after, MAX_RETRY_WAIT_IN_S)
+        return self.fallback(retry_state)
+
+
+class stop_if_retry_budget_exhausted(stop_base):
+    """Stops retrying once the process-wide retry budget (if enabled) is exhausted
+    so that an outage does not multiply the requests sent."""
+
+    def __call__(self, retry_state: RetryCallState) -> bool:
+        retry_budget = get_retry_budget()
+        return retry_budget is not None and not retry_budget.try_withdraw()
+
+
+# Standard stop condition of retries of HTTP operations; the budget is only
+# consulted (and withdrawn from) if the attempts are not used up yet
+http_retry_stop = stop_after_attempt(5) | stop_if_retry_budget_exhausted()
+
 # Standard retry decorator for HTTP operations
 http_retry = retry(
-    stop=stop_after_attempt(5),
-    wait=wait_exponential(),
+    stop=http_retry_stop,
+    wait=wait_retry_after(wait_random_exponential(max=30)),
     retry=retry_if_exception_type(
         (
             requests.exceptions.ConnectionError,
+            requests.exceptions.ChunkedEncodingError,
             requests.exceptions.Timeout,
             requests.exceptions.RetryError,
             requests.exceptions.HTTPError,
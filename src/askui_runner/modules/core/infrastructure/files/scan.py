@@ -0,0 +1,155 @@
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Generator, Iterator, Union
+
+from .utils import is_temporary_file_name
+
+MAX_SCAN_WORKERS = 8
+
+
+class ScannedFile:
+    """File found by `scan_files`.
+
+    The stat result is taken from the directory entry, i.e., it is only fetched
+    once and, on some platforms, comes with the directory listing for free.
+    """
+
+    __slots__ = ("path", "relative_path", "name", "_entry")
+
+    def __init__(self, entry: os.DirEntry[str], relative_path: str):
+        self.path = entry.path
+        self.relative_path = relative_path
+        self.name = entry.name
+        self._entry = entry
+
+    def stat(self) -> os.stat_result:
+        return self._entry.stat()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(path={self.path!r})"
+
+
+class _DirScanned:
+    pass
+
+
+_DIR_SCANNED = _DirScanned()
+
+
+def _scan_dir(
+    dir_path: str, relative_dir_path: str
+) -> tuple[list[ScannedFile], list[tuple[str, str]]]:
+    """Lists the files and the subdirectories (with their relative paths) of a
+    directory. Like `os.walk`, symbolic links to directories are not followed and
+    unreadable directories are skipped. Temporary files of (possibly crashed)
+    downloads and writes (see `temporary_file_path`) are skipped, too."""
+    files: list[ScannedFile] = []
+    dirs: list[tuple[str, str]] = []
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                relative_path = (
+                    entry.name
+                    if relative_dir_path == ""
+                    else f"{relative_dir_path}/{entry.name}"
+                )
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    if not is_temporary_file_name(entry.name):
+                        files.append(ScannedFile(entry, relative_path))
+                elif not entry.is_symlink():
+                    dirs.append((entry.path, relative_path))
+    except OSError as error:
+        logging.debug(f"Skipping unreadable directory {dir_path}: {error}")
+    return files, dirs
+
+
+def scan_files(
+    dir_path: str, max_workers: int = MAX_SCAN_WORKERS
+) -> Generator[ScannedFile, None, None]:
+    """Yields all files in `dir_path` and its subdirectories with their paths
+    relative to `dir_path` ("/"-separated).
+
+    Subdirectories are scanned concurrently by up to `max_workers` threads, which
+    pays off on network file systems, and files are yielded as soon as their
+    directory was scanned, so that they can be processed while the scan is still
+    running. The order of the files is not defined.
+    """
+    if max_workers <= 1:
+        dirs = [(dir_path, "")]
+        while dirs:
+            files, subdirs = _scan_dir(*dirs.pop())
+            yield from files
+            dirs.extend(subdirs)
+        return
+
+    results: queue.Queue[Any] = queue.Queue()
+    stopped = threading.Event()
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="askui-files-scan"
+    )
+
+    def scan(path: str, relative_path: str) -> None:
+        try:
+            if stopped.is_set():
+                return
+            files, subdirs = _scan_dir(path, relative_path)
+            results.put(files)
+            for subdir in subdirs:
+                results.put(subdir)  # counted as pending before it is scanned
+                executor.submit(scan, *subdir)
+        finally:
+            results.put(_DIR_SCANNED)
+
+    pending_dirs = 1
+    executor.submit(scan, dir_path, "")
+    try:
+        while pending_dirs > 0:
+            result = results.get()
+            if result is _DIR_SCANNED:
+                pending_dirs -= 1
+            elif isinstance(result, tuple):
+                pending_dirs += 1
+            else:
+                yield from result
+    finally:
+        stopped.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def scan_files_sorted(dir_path: str) -> Generator[ScannedFile, None, None]:
+    """Yields all files in `dir_path` and its subdirectories ordered by their
+    relative paths as strings, i.e., in the order of listings of the files API.
+
+    Directories are scanned one after the other, so only the entries of the
+    directories on the path to the current file are held in memory.
+    """
+    stack = [_sorted_entries(dir_path, "")]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+        elif isinstance(entry, ScannedFile):
+            yield entry
+        else:
+            stack.append(_sorted_entries(*entry))
+
+
+def _sorted_entries(
+    dir_path: str, relative_dir_path: str
+) -> Iterator[Union[ScannedFile, tuple[str, str]]]:
+    """The files and subdirectories of a directory sorted so that the files in a
+    subdirectory, whose paths start with "<name>/", are yielded in order."""
+    files, dirs = _scan_dir(dir_path, relative_dir_path)
+    entries: list[tuple[str, Union[ScannedFile, tuple[str, str]]]] = [
+        (file.relative_path, file) for file in files
+    ]
+    entries.extend((subdir[1] + "/", subdir) for subdir in dirs)
+    entries.sort(key=lambda entry: entry[0])
+    return (entry for _, entry in entries)
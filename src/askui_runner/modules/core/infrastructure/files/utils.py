@@ -1,4 +1,26 @@
+import contextlib
+import logging
 import os
+import re
+import time
+import uuid
+from typing import BinaryIO, Generator, Iterable, Iterator, Optional
+
+import requests
+
+from ..throttle import TransferThrottle
+from .compression import UploadCompression
+from .retry_utils import handle_response_status
+
+MIN_DOWNLOAD_CHUNK_SIZE_IN_BYTES = 64 * 1024
+MAX_DOWNLOAD_CHUNK_SIZE_IN_BYTES = 4 * 1024 * 1024
+DOWNLOAD_CHUNKS_PER_FILE = 16
+
+_CONTENT_RANGE_PATTERN = re.compile(r"^bytes (\d+)-\d+/(\d+|\*)$")
+_TEMPORARY_FILE_NAME_PATTERN = re.compile(r"^\..+\.[0-9a-f]{8}\.part$")
+
+# temporary files not modified for longer are assumed to be left behind by a crash
+STALE_TEMPORARY_FILE_AGE_IN_S = 60 * 60
 
 
 def create_and_open(filename, mode):
@@ -6,3 +28,269 @@ def create_and_open(filename, mode):
     if dirname != "":
         os.makedirs(dirname, exist_ok=True)
     return open(filename, mode)
+
+
+def _is_content_encoded(response: requests.Response) -> bool:
+    return response.headers.get("Content-Encoding", "identity") != "identity"
+
+
+def get_content_length(response: requests.Response) -> Optional[int]:
+    """Returns the length of the (decoded) body of the response if known upfront."""
+    if _is_content_encoded(response):
+        return None  # Content-Length is the length of the encoded body
+    try:
+        return int(response.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+
+
+def download_chunk_size(content_length: Optional[int]) -> int:
+    """Chunk size growing with the size of the file so that small files are
+    written in one go and large files in few, large writes."""
+    if content_length is None:
+        return MAX_DOWNLOAD_CHUNK_SIZE_IN_BYTES
+    return min(
+        max(
+            content_length // DOWNLOAD_CHUNKS_PER_FILE,
+            MIN_DOWNLOAD_CHUNK_SIZE_IN_BYTES,
+        ),
+        MAX_DOWNLOAD_CHUNK_SIZE_IN_BYTES,
+    )
+
+
+def format_multipart_header_param(name: str, value: str) -> str:
+    """Formats a parameter of a header of a multipart/form-data part like
+    `urllib3.fields.format_multipart_header_param` (as browsers do), i.e.,
+    percent-encoding `"`, CR and LF, so that, e.g., a file name cannot end the
+    parameter or inject headers."""
+    value = value.translate({0x0A: "%0A", 0x0D: "%0D", 0x22: "%22"})
+    return f'{name}="{value}"'
+
+
+def multipart_file_envelope(file_name: str) -> tuple[str, bytes, bytes]:
+    """Returns the content type, the bytes before and the bytes after the content
+    of a file sent as the form field `file` of a multipart/form-data body so that
+    the body can be streamed instead of being assembled in memory."""
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; '
+        f"{format_multipart_header_param('filename', file_name)}\r\n"
+        "\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return f"multipart/form-data; boundary={boundary}", head, tail
+
+
+def stream_form_data(
+    file_name: str,
+    content: Iterable[bytes],
+    content_length: int,
+    compression: Optional[UploadCompression],
+    throttle: Optional[TransferThrottle],
+) -> tuple[dict[str, str], Iterator[bytes], Optional[int]]:
+    """Returns the headers, the chunks and the length of a multipart/form-data body
+    streaming `content` as the file `file_name`, throttled by `throttle` (blocking
+    while reading) and compressed on the fly if `compression` is given, in which
+    case the length is not known upfront (None)."""
+    content_type, head, tail = multipart_file_envelope(file_name)
+
+    def body() -> Generator[bytes, None, None]:
+        yield head
+        yield from content if throttle is None else throttle.throttled(content)
+        yield tail
+
+    headers = {"Content-Type": content_type}
+    if compression is None:
+        return headers, body(), len(head) + content_length + len(tail)
+    headers["Content-Encoding"] = compression.content_encoding
+    return headers, compression.compress(body()), None
+
+
+class SizedStream:
+    """Iterable of chunks with a known total size so that `requests` sends it with
+    a `Content-Length` instead of chunked transfer encoding."""
+
+    def __init__(self, chunks: Iterable[bytes], size: int) -> None:
+        self._chunks = chunks
+        self._size = size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self._chunks)
+
+
+def read_chunks(f: BinaryIO, chunk_size: int) -> Generator[bytes, None, None]:
+    while chunk := f.read(chunk_size):
+        yield chunk
+
+
+def preallocate(f: BinaryIO, size: int) -> None:
+    """Reserves disk space for `size` bytes to reduce fragmentation of large files.
+
+    This is a best effort and does nothing if the platform or file system does not
+    support it.
+    """
+    if size <= 0 or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(f.fileno(), 0, size)
+    except OSError:
+        pass
+
+
+def temporary_file_path(file_path: str) -> str:
+    """Returns a unique path for a temporary file next to `file_path` (creating the
+    parent directory if necessary) that can atomically replace `file_path`."""
+    dir_path = os.path.dirname(file_path)
+    if dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+    return os.path.join(
+        dir_path, f".{os.path.basename(file_path)}.{uuid.uuid4().hex[:8]}.part"
+    )
+
+
+def is_temporary_file_name(name: str) -> bool:
+    """Whether `name` is the name of a file returned by `temporary_file_path`, which
+    must neither be uploaded nor synced, e.g., if it was left behind by a crash."""
+    return _TEMPORARY_FILE_NAME_PATTERN.match(name) is not None
+
+
+def remove_stale_temporary_files(
+    dir_path: str, max_age_in_s: float = STALE_TEMPORARY_FILE_AGE_IN_S
+) -> None:
+    """Removes the temporary files (see `temporary_file_path`) in `dir_path` and its
+    subdirectories that were not modified for `max_age_in_s` seconds, i.e., that are
+    most likely not written anymore, e.g., as the process writing them crashed."""
+    min_mtime = time.time() - max_age_in_s
+    for parent_dir_path, _, file_names in os.walk(dir_path):
+        for file_name in file_names:
+            if not is_temporary_file_name(file_name):
+                continue
+            file_path = os.path.join(parent_dir_path, file_name)
+            try:
+                if os.stat(file_path).st_mtime < min_mtime:
+                    os.remove(file_path)
+                    logging.info(f"Removed stale temporary file {file_path}")
+            except OSError:  # e.g., committed or removed in the meantime
+                continue
+
+
+def commit_temporary_file(
+    tmp_file_path: str, file_path: str, mtime: Optional[float] = None
+) -> None:
+    if mtime is not None:
+        os.utime(tmp_file_path, times=(mtime, mtime))
+    os.replace(tmp_file_path, file_path)
+
+
+def discard_temporary_file(tmp_file_path: str) -> None:
+    with contextlib.suppress(OSError):
+        os.remove(tmp_file_path)
+
+
+@contextlib.contextmanager
+def atomic_write(
+    file_path: str, mtime: Optional[float] = None
+) -> Generator[BinaryIO, None, None]:
+    """Opens a temporary file next to `file_path` for writing that replaces
+    `file_path` only if the block exits without an error. Otherwise, the
+    temporary file is removed and `file_path` is left untouched.
+
+    Args:
+        file_path (str): The path of the file to write.
+        mtime (Optional[float], optional): Access and modification time (timestamp) to set on the file before replacing `file_path`. Defaults to None, i.e., the time of writing.
+    """
+    tmp_file_path = temporary_file_path(file_path)
+    try:
+        with open(tmp_file_path, "xb") as f:
+            yield f
+        commit_temporary_file(tmp_file_path, file_path, mtime)
+    except BaseException:
+        discard_temporary_file(tmp_file_path)
+        raise
+
+
+class PartialDownload:
+    """File being downloaded that can be resumed from the bytes written so far.
+
+    A download is only resumed (using `Range` and `If-Range` headers) if the first
+    response carried a validator (strong `ETag` or `Last-Modified`) so that the
+    parts are guaranteed to belong to the same version of the file, and only if
+    its body was not content-encoded (e.g., gzip) as the bytes written so far are
+    decoded while ranges refer to the encoded bytes. Ranges are requested without
+    content encoding for the same reason. If the server ignores the range or the
+    file changed in between, the server answers with the full file and the
+    download starts over.
+    """
+
+    def __init__(self, f: BinaryIO) -> None:
+        self._file = f
+        self._validator: Optional[str] = None
+        self.chunk_size = MAX_DOWNLOAD_CHUNK_SIZE_IN_BYTES
+
+    @property
+    def offset(self) -> int:
+        return self._file.tell()
+
+    def range_headers(self) -> dict[str, str]:
+        if self.offset == 0 or self._validator is None:
+            return {}
+        return {
+            "Range": f"bytes={self.offset}-",
+            "If-Range": self._validator,
+            "Accept-Encoding": "identity",
+        }
+
+    def begin(self, response: requests.Response) -> None:
+        """Prepare writing the body of `response`.
+
+        Raises:
+            requests.exceptions.HTTPError: If the server answered with a range not continuing the bytes written so far or content-encoded (retryable).
+            NonRetryableHTTPError: For non-transient errors that should not be retried.
+        """
+        if response.status_code == 206:
+            match = _CONTENT_RANGE_PATTERN.match(
+                response.headers.get("Content-Range", "")
+            )
+            if (
+                match is None
+                or int(match.group(1)) != self.offset
+                or _is_content_encoded(response)
+            ):
+                self._reset()
+                raise requests.exceptions.HTTPError(
+                    f"Unexpected Content-Range {response.headers.get('Content-Range')!r} for resuming at byte {self.offset}",
+                    response=response,
+                )
+            logging.info(f"Resuming download of {response.url} at byte {self.offset}")
+            return
+        if response.status_code == 416:  # Range Not Satisfiable
+            self._reset()
+            response.raise_for_status()
+        handle_response_status(response)
+        self._reset()
+        if not _is_content_encoded(response):
+            etag = response.headers.get("ETag")
+            if etag is not None and not etag.startswith("W/"):
+                self._validator = etag
+            else:
+                self._validator = response.headers.get("Last-Modified")
+        content_length = get_content_length(response)
+        if content_length is not None:
+            preallocate(self._file, content_length)
+        self.chunk_size = download_chunk_size(content_length)
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+
+    def finish(self) -> None:
+        """Drop any space preallocated beyond the bytes written."""
+        self._file.truncate(self._file.tell())
+
+    def _reset(self) -> None:
+        self._file.seek(0)
+        self._file.truncate()
+        self._validator = None
@@ -0,0 +1,93 @@
+import logging
+import os
+import threading
+from typing import Any, Literal, Optional
+
+from .utils import is_temporary_file_name
+
+WatchMode = Literal["auto", "native", "polling"]
+
+
+class DirectoryWatcher:
+    """Collects the paths of files changed in directories (recursively).
+
+    Uses native file system events (inotify on Linux) through the optional
+    `watchdog` package if available (mode "auto") or required (mode "native").
+    With mode "polling" or if `watchdog` is not installed, changes are unknown,
+    i.e., the directories have to be scanned for changes.
+    """
+
+    def __init__(self, dir_paths: list[str], mode: WatchMode = "auto") -> None:
+        self._dir_paths = dir_paths
+        self._lock = threading.Lock()
+        self._changes: Optional[set[str]] = None  # None forces a scan
+        self._observer: Any = None
+        if mode == "polling":
+            return
+        try:
+            from watchdog.observers import Observer  # watchdog is optional
+        except ImportError as error:
+            if mode == "native":
+                raise RuntimeError(
+                    'Watching for native file system events requires the "watchdog" package to be installed'
+                ) from error
+            logging.info("watchdog is not installed, polling for changes instead")
+            return
+        self._observer = Observer()
+
+    @property
+    def is_native(self) -> bool:
+        return self._observer is not None
+
+    def start(self) -> None:
+        if self._observer is None:
+            return
+        for dir_path in self._dir_paths:
+            os.makedirs(dir_path, exist_ok=True)
+            self._observer.schedule(_EventHandler(self), dir_path, recursive=True)
+        self._observer.start()
+
+    def stop(self) -> None:
+        if self._observer is None:
+            return
+        self._observer.stop()
+        self._observer.join()
+
+    def take_changes(self) -> Optional[set[str]]:
+        """Returns the paths of the files changed since the last call or None if
+        the changes are unknown and the directories need to be scanned."""
+        if self._observer is None:
+            return None
+        with self._lock:
+            changes, self._changes = self._changes, set()
+        return changes
+
+    def _add(self, path: str) -> None:
+        if is_temporary_file_name(os.path.basename(path)):
+            return  # only its replacement of the actual file is a change
+        with self._lock:
+            if self._changes is not None:
+                self._changes.add(path)
+
+    def _invalidate(self) -> None:
+        with self._lock:
+            self._changes = None
+
+
+class _EventHandler:
+    """Minimal `watchdog` event handler (see `watchdog.events.FileSystemEventHandler`)."""
+
+    def __init__(self, watcher: DirectoryWatcher) -> None:
+        self._watcher = watcher
+
+    def dispatch(self, event: Any) -> None:
+        if event.is_directory:
+            # Files in created, moved or deleted directories may not be reported
+            if event.event_type in ("created", "moved", "deleted"):
+                self._watcher._invalidate()
+            return
+        if event.event_type == "moved":
+            self._watcher._add(os.fsdecode(event.src_path))
+            self._watcher._add(os.fsdecode(event.dest_path))
+        elif event.event_type in ("created", "modified", "closed", "deleted"):
+            self._watcher._add(os.fsdecode(event.src_path))
@@ -0,0 +1,166 @@
+import threading
+import time
+from typing import Any, Mapping, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..models import HttpConfig
+from .circuit_breaker import CircuitBreaker, get_circuit_breaker, use_retry_budget
+from .files.retry_utils import TRANSIENT_HTTP_STATUS_CODES, parse_retry_after
+from .throttle import TransferThrottle
+
+
+class RequestGuard:
+    """Applies the throttle, circuit breaker and retry budget configured in
+    `HttpConfig` to single requests.
+
+    Before a request is sent, the caller waits for `pause_remaining` and calls
+    `begin`, which raises a `CircuitOpenError` if the circuit of the host is open.
+    Afterwards, it reports the response or error with `observe_response` or
+    `observe_error`, or, if the request ended otherwise (e.g., as it was
+    cancelled), calls `observe_abort`.
+    """
+
+    def __init__(self, config: HttpConfig) -> None:
+        self.throttle: Optional[TransferThrottle] = (
+            None if config.throttle is None else TransferThrottle(config.throttle)
+        )
+        self._circuit_breaker_config = config.circuit_breaker
+        self._retry_budget = (
+            None
+            if config.retry_budget is None
+            else use_retry_budget(config.retry_budget)
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return (
+            self.throttle is not None
+            or self._circuit_breaker_config is not None
+            or self._retry_budget is not None
+        )
+
+    def pause_remaining(self) -> float:
+        return 0.0 if self.throttle is None else self.throttle.pause_remaining()
+
+    def begin(self, url: str) -> Optional[CircuitBreaker]:
+        """Returns the circuit breaker of the host of `url` if enabled."""
+        circuit_breaker = None
+        if self._circuit_breaker_config is not None:
+            circuit_breaker = get_circuit_breaker(
+                urlsplit(url).netloc, self._circuit_breaker_config
+            )
+            circuit_breaker.before_request()
+        if self._retry_budget is not None:
+            self._retry_budget.deposit()
+        return circuit_breaker
+
+    def observe_response(
+        self,
+        circuit_breaker: Optional[CircuitBreaker],
+        status_code: int,
+        headers: Mapping[str, str],
+        latency_s: float,
+        has_body: bool,
+    ) -> None:
+        if circuit_breaker is not None:
+            circuit_breaker.record(status_code not in TRANSIENT_HTTP_STATUS_CODES)
+        if self.throttle is not None:
+            self.throttle.observe(
+                status_code,
+                latency_s,
+                retry_after_s=parse_retry_after(headers),
+                has_body=has_body,
+            )
+
+    def observe_error(
+        self, circuit_breaker: Optional[CircuitBreaker], error: BaseException
+    ) -> None:
+        if circuit_breaker is not None:
+            circuit_breaker.record(False)
+        if self.throttle is not None:
+            self.throttle.observe_error(error)
+
+    def observe_abort(self, circuit_breaker: Optional[CircuitBreaker]) -> None:
+        if circuit_breaker is not None:
+            circuit_breaker.record_aborted()
+
+
+class PooledHttpSession(requests.Session):
+    """Session reusing (keep-alive) connections across requests and threads.
+
+    Requests without an explicit timeout use the configured connect and read
+    timeouts. A timeout given as a single number is treated as read timeout.
+
+    Requests are guarded by the configured throttle, circuit breaker and retry
+    budget (see `RequestGuard`).
+    """
+
+    def __init__(self, config: HttpConfig) -> None:
+        super().__init__()
+        self._connect_timeout = config.connect_timeout
+        self._read_timeout = config.read_timeout
+        adapter = HTTPAdapter(
+            pool_connections=config.pool_connections,
+            pool_maxsize=config.pool_maxsize,
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        if not config.keep_alive:
+            self.headers["Connection"] = "close"
+        self.guard = RequestGuard(config)
+        self.throttle = self.guard.throttle
+
+    def request(  # type: ignore[override]
+        self, method: str, url: str, *args: Any, **kwargs: Any
+    ) -> requests.Response:
+        timeout = kwargs.get("timeout")
+        if timeout is None:
+            kwargs["timeout"] = (self._connect_timeout, self._read_timeout)
+        elif isinstance(timeout, (int, float)):
+            kwargs["timeout"] = (self._connect_timeout, timeout)
+        if not self.guard.enabled:
+            return super().request(method, url, *args, **kwargs)
+        return self._guarded_request(method, url, *args, **kwargs)
+
+    def _guarded_request(
+        self, method: str, url: str, *args: Any, **kwargs: Any
+    ) -> requests.Response:
+        while (remaining := self.guard.pause_remaining()) > 0:
+            time.sleep(remaining)
+        circuit_breaker = self.guard.begin(url)
+        start = time.monotonic()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.exceptions.RequestException as error:
+            self.guard.observe_error(circuit_breaker, error)
+            raise
+        except BaseException:
+            self.guard.observe_abort(circuit_breaker)
+            raise
+        self.guard.observe_response(
+            circuit_breaker,
+            response.status_code,
+            response.headers,
+            time.monotonic() - start,
+            has_body=any(
+                kwargs.get(key) is not None for key in ("data", "files", "json")
+            ),
+        )
+        return response
+
+
+_lock = threading.Lock()
+_sessions: dict[str, PooledHttpSession] = {}
+
+
+def get_http_session(config: HttpConfig) -> PooledHttpSession:
+    """The process-wide session for `config`, created if there is none yet, so that
+    all containers share its connection pools and throttle."""
+    key = config.model_dump_json()
+    with _lock:
+        if key not in _sessions:
+            _sessions[key] = PooledHttpSession(config)
+        return _sessions[key]
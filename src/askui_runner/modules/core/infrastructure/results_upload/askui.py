@@ -1,7 +1,11 @@
+import functools
 import os
+from typing import Iterable, Optional
 
 from ...runner import ResultsUpload
+from ..files.concurrency import TransferTask, run_transfers
 from ..files.files import FilesUploadService
+from ..files.scan import ScannedFile, scan_files
 
 
 class AskUiResultsUploadService(ResultsUpload):
@@ -13,6 +17,9 @@ class AskUiResultsUploadService(ResultsUpload):
         self.files_upload_service = files_upload_service
         self.results_dir = results_dir
 
+    def start(self) -> None:
+        pass  # results are only uploaded by `upload`
+
     def upload(self) -> None:
         if os.path.exists(self.results_dir):
             self.files_upload_service.upload(
@@ -20,11 +27,59 @@ class AskUiResultsUploadService(ResultsUpload):
                 remote_dir_path="",
             )
 
+    def upload_files(self, files: Iterable[ScannedFile]) -> None:
+        """Uploads the files of the results directory scanned before."""
+        self.files_upload_service.upload_files(
+            local_dir_path=self.results_dir,
+            files=files,
+            remote_dir_path="",
+        )
+
+
+class FanOutResultsUploadService(ResultsUpload):
+    """Uploads the results to all destinations concurrently so that uploading
+    takes about as long as the slowest destination instead of all of them
+    together.
+
+    Results directories shared by multiple destinations are scanned only once.
+    Their files are read once per destination but concurrently, i.e., mostly from
+    the page cache.
+    """
 
-class ChainedResultsUploadService(ResultsUpload):
     def __init__(self, services: list[ResultsUpload]) -> None:
         self.services = services
 
-    def upload(self) -> None:
+    def start(self) -> None:
         for service in self.services:
-            service.upload()
+            service.start()
+
+    def upload(self) -> None:
+        if len(self.services) == 1:
+            self.services[0].upload()
+            return
+        run_transfers(self._build_tasks(), max_workers=len(self.services))
+
+    def _build_tasks(self) -> list[TransferTask]:
+        scanned_dirs: dict[str, Optional[list[ScannedFile]]] = {}
+        tasks: list[TransferTask] = []
+        for i, service in enumerate(self.services):
+            if not isinstance(service, AskUiResultsUploadService):
+                tasks.append((f"results destination {i}", service.upload))
+                continue
+            results_dir = os.path.realpath(service.results_dir)
+            if results_dir not in scanned_dirs:
+                scanned_dirs[results_dir] = (
+                    list(scan_files(results_dir))
+                    if os.path.isdir(results_dir)
+                    else None
+                )
+            files = scanned_dirs[results_dir]
+            if files is None:
+                continue  # nothing to upload
+            tasks.append(
+                (
+                    f"results destination {i} ({service.results_dir})",
+                    functools.partial(service.upload_files, files),
+                )
+            )
+        return tasks
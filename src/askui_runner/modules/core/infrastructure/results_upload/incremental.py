@@ -0,0 +1,193 @@
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from ...runner import ResultsUpload
+from ..files.concurrency import FilesTransferError, TransferTask, run_transfers
+from ..files.files import FilesUploadService
+from ..files.scan import ScannedFile, scan_files
+from ..files.watch import DirectoryWatcher, WatchMode
+
+FileState = tuple[int, int]  # mtime_ns, size
+
+
+class IncrementalResultsUploadService(ResultsUpload):
+    """Uploads result files in the background while the workflows are running.
+
+    Files are uploaded once they have not changed for `stable_after_s` seconds,
+    i.e., once they have most likely been closed, and uploaded again whenever their
+    modification time or size changes. `upload` stops watching, uploads the files
+    that were not uploaded yet or changed since like a directory upload (i.e.,
+    bundled if enabled) and deletes the remote copies of uploaded files that were
+    deleted since. If no file was uploaded in the background, it falls back to
+    `results_upload_service`, e.g., to upload the whole directory at once.
+    """
+
+    def __init__(
+        self,
+        files_upload_service: FilesUploadService,
+        results_upload_service: ResultsUpload,
+        results_dir: str,
+        max_concurrent_uploads: int = 1,
+        poll_interval_s: float = 2,
+        stable_after_s: float = 5,
+        watch_mode: WatchMode = "auto",
+    ) -> None:
+        self.files_upload_service = files_upload_service
+        self.results_upload_service = results_upload_service
+        self.results_dir = results_dir
+        self._max_concurrent_uploads = max_concurrent_uploads
+        self._poll_interval_s = poll_interval_s
+        self._stable_after_s = stable_after_s
+        self._watch_mode = watch_mode
+        self._watcher: Optional[DirectoryWatcher] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._uploaded: dict[str, FileState] = {}
+        self._pending: dict[str, tuple[FileState, float]] = {}
+
+    def start(self) -> None:
+        self._watcher = DirectoryWatcher([self.results_dir], self._watch_mode)
+        self._watcher.start()
+        self._thread = threading.Thread(
+            target=self._watch, name="results-upload", daemon=True
+        )
+        self._thread.start()
+        logging.info(
+            f"Uploading results from {self.results_dir} in the background "
+            f"({'native events' if self._watcher.is_native else 'polling'}) ..."
+        )
+
+    def upload(self) -> None:
+        if self._thread is None:
+            self.results_upload_service.upload()
+            return
+        self._stopped.set()
+        self._thread.join()
+        if self._watcher is not None:
+            self._watcher.stop()
+        if not self._uploaded:
+            self.results_upload_service.upload()
+            return
+        remaining: list[ScannedFile] = []
+        existing: set[str] = set()
+        for file in scan_files(self.results_dir):
+            state = _file_state(file)
+            if state is None:
+                continue
+            existing.add(file.path)
+            if self._uploaded.get(file.path) != state:
+                remaining.append(file)
+        deleted = [
+            file_path for file_path in self._uploaded if file_path not in existing
+        ]
+        logging.info(
+            f"Uploaded {len(self._uploaded)} result files in the background, "
+            f"uploading the remaining {len(remaining)} "
+            f"and deleting {len(deleted)} ..."
+        )
+        if remaining:
+            self.files_upload_service.upload_files(
+                local_dir_path=self.results_dir, files=remaining, remote_dir_path=""
+            )
+        if deleted:
+            run_transfers(
+                [
+                    (file_path, functools.partial(self._delete_file, file_path))
+                    for file_path in deleted
+                ],
+                max_workers=self._max_concurrent_uploads,
+            )
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self._poll_interval_s):
+            try:
+                self._upload_stable_files()
+            except FilesTransferError:
+                pass  # retried on the next poll or by the final upload
+            except Exception as error:
+                logging.warning(f"Background upload of results failed: {error!r}")
+
+    def _upload_stable_files(self) -> None:
+        assert self._watcher is not None
+        changes = self._watcher.take_changes()
+        if changes is None:
+            states = self._scan()
+            self._pending = {
+                file_path: pending
+                for file_path, pending in self._pending.items()
+                if file_path in states
+            }
+        else:
+            states = {}
+            for file_path in changes | self._pending.keys():
+                state = _stat(file_path)
+                if state is None:
+                    self._pending.pop(file_path, None)
+                else:
+                    states[file_path] = state
+        now = time.monotonic()
+        stable: dict[str, FileState] = {}
+        for file_path, state in states.items():
+            if self._uploaded.get(file_path) == state:
+                self._pending.pop(file_path, None)
+                continue
+            pending = self._pending.get(file_path)
+            if pending is None or pending[0] != state:
+                self._pending[file_path] = (state, now)
+            elif now - pending[1] >= self._stable_after_s:
+                stable[file_path] = state
+        if stable:
+            run_transfers(
+                self._build_upload_tasks(stable),
+                max_workers=self._max_concurrent_uploads,
+            )
+
+    def _build_upload_tasks(self, files: dict[str, FileState]) -> list[TransferTask]:
+        return [
+            (file_path, functools.partial(self._upload_file, file_path, state))
+            for file_path, state in files.items()
+        ]
+
+    def _upload_file(self, file_path: str, state: FileState) -> None:
+        relative_dir_path = self._remote_path(os.path.dirname(file_path))
+        self.files_upload_service.upload(
+            local_path=file_path,
+            remote_dir_path="" if relative_dir_path == "." else relative_dir_path,
+        )
+        self._uploaded[file_path] = state
+        self._pending.pop(file_path, None)
+
+    def _delete_file(self, file_path: str) -> None:
+        self.files_upload_service.delete(self._remote_path(file_path))
+        del self._uploaded[file_path]
+
+    def _remote_path(self, local_path: str) -> str:
+        return "/".join(os.path.relpath(local_path, self.results_dir).split(os.sep))
+
+    def _scan(self) -> dict[str, FileState]:
+        states: dict[str, FileState] = {}
+        for file in scan_files(self.results_dir):
+            state = _file_state(file)
+            if state is not None:
+                states[file.path] = state
+        return states
+
+
+def _file_state(file: ScannedFile) -> Optional[FileState]:
+    try:
+        stat = file.stat()
+    except OSError:  # e.g., deleted in the meantime
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _stat(file_path: str) -> Optional[FileState]:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
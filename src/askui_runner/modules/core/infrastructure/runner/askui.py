@@ -120,6 +120,9 @@ class AskUIJestRunner(Runner):
             return RunWorkflowsResult.FAILURE
         return RunWorkflowsResult.SUCCESS
 
+    def start_uploading_results(self) -> None:
+        self.results_upload_service.start()
+
     def upload_results(self) -> None:
         self.results_upload_service.upload()
 
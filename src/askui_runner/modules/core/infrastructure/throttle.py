@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from typing import Generator, Iterable, Optional
+
+from ..models import TransferThrottleConfig
+
+RETRY_AFTER_STATUS_CODES = (429, 503)
+CONGESTION_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+LATENCY_EWMA_WEIGHT = 0.2
+
+
+class TransferThrottle:
+    """Adapts the number of concurrent transfers to the load the server can take.
+
+    While all slots are taken, the limit grows by one per limit successful
+    responses (additive increase). It is halved (multiplicative decrease) on
+    congestion, i.e., 408/429/5xx responses, connection errors and latency spikes
+    of requests without a body, at most once per `decrease_interval_s`. A
+    `Retry-After` of 429 and 503 responses pauses all new requests until it
+    passed. Optionally, the transferred bytes are capped at `max_bytes_per_s`.
+
+    Transfers `acquire` a slot before and `release` it after running. Requests
+    wait for `pause_remaining` before and call `observe` after being sent.
+    """
+
+    def __init__(self, config: TransferThrottleConfig) -> None:
+        self._config = config
+        self._condition = threading.Condition()
+        self._limit = float(
+            min(
+                max(config.initial_concurrency, config.min_concurrency),
+                config.max_concurrency,
+            )
+        )
+        self._active = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._latency: Optional[float] = None
+        self._min_latency: Optional[float] = None
+        self._bandwidth_lock = threading.Lock()
+        self._next_send_at = 0.0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self._active >= int(self._limit):
+                return False
+            self._active += 1
+            return True
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._active >= int(self._limit):
+                self._condition.wait()
+            self._active += 1
+
+    def release(self) -> None:
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def pause_remaining(self) -> float:
+        """Seconds until the pause requested by the server with `Retry-After` ends."""
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def observe(
+        self,
+        status_code: int,
+        latency_s: float,
+        retry_after_s: Optional[float] = None,
+        has_body: bool = True,
+    ) -> None:
+        """Adapt the limit to the response of a request.
+
+        Args:
+            status_code (int): Status code of the response.
+            latency_s (float): Time until the response (headers) arrived.
+            retry_after_s (Optional[float]): Parsed `Retry-After` of the response if any.
+            has_body (bool): Whether the request had a body; only requests without a body are considered for detecting latency spikes as the latency of the others depends on the size of the body.
+        """
+        if status_code in CONGESTION_STATUS_CODES:
+            if retry_after_s is not None and status_code in RETRY_AFTER_STATUS_CODES:
+                self._pause(min(retry_after_s, self._config.max_retry_after_s))
+            self._decrease(f"status {status_code}")
+            return
+        if not has_body and self._is_latency_spike(latency_s):
+            self._decrease(f"latency of {latency_s:.2f}s")
+            return
+        self._increase()
+
+    def observe_error(self, error: BaseException) -> None:
+        """Adapt the limit to a request that failed without a response."""
+        self._decrease(type(error).__name__)
+
+    def reserve(self, num_bytes: int) -> float:
+        """Reserve sending or receiving `num_bytes` within the bandwidth cap.
+
+        Returns:
+            float: Seconds to wait before transferring the bytes.
+        """
+        if self._config.max_bytes_per_s is None:
+            return 0.0
+        with self._bandwidth_lock:
+            now = time.monotonic()
+            send_at = max(self._next_send_at, now)
+            self._next_send_at = send_at + num_bytes / self._config.max_bytes_per_s
+            return send_at - now
+
+    def throttle(self, num_bytes: int) -> None:
+        delay = self.reserve(num_bytes)
+        if delay > 0:
+            time.sleep(delay)
+
+    def throttled(self, chunks: Iterable[bytes]) -> Generator[bytes, None, None]:
+        """Yields `chunks` within the bandwidth cap."""
+        for chunk in chunks:
+            self.throttle(len(chunk))
+            yield chunk
+
+    def _pause(self, seconds: float) -> None:
+        with self._condition:
+            paused_until = time.monotonic() + seconds
+            if paused_until > self._paused_until:
+                logging.info(f"Pausing requests for {seconds:.1f}s as requested")
+                self._paused_until = paused_until
+
+    def _increase(self) -> None:
+        with self._condition:
+            if (
+                self._limit >= self._config.max_concurrency
+                or self._active < int(self._limit)  # the limit is not the bottleneck
+            ):
+                return
+            self._limit = min(
+                self._limit + 1 / self._limit, float(self._config.max_concurrency)
+            )
+            self._condition.notify()
+
+    def _decrease(self, reason: str) -> None:
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease < self._config.decrease_interval_s:
+                return  # the failures are likely caused by the same congestion
+            self._last_decrease = now
+            limit = max(self._limit / 2, float(self._config.min_concurrency))
+            if int(limit) < int(self._limit):
+                logging.info(
+                    f"Reducing concurrent transfers from {int(self._limit)} to {int(limit)} ({reason})"
+                )
+            self._limit = limit
+
+    def _is_latency_spike(self, latency_s: float) -> bool:
+        with self._condition:
+            if self._latency is None:
+                self._latency = latency_s
+            else:
+                self._latency += LATENCY_EWMA_WEIGHT * (latency_s - self._latency)
+            if self._min_latency is None or self._latency < self._min_latency:
+                self._min_latency = self._latency
+            return latency_s > self._config.latency_factor * max(
+                self._min_latency, self._config.min_latency_s
+            )
@@ -2,6 +2,7 @@ import os
 
 from ...runner import WorkflowsDownload
 from ..files.files import FilesDownloadService
+from ..files.utils import remove_stale_temporary_files
 
 
 class AskUiWorkflowsDownloadService(WorkflowsDownload):
@@ -30,6 +31,7 @@ class AskUiWorkflowsDownloadService(WorkflowsDownload):
         )
 
     def download(self) -> None:
+        remove_stale_temporary_files(self.workflows_dir)
         for remote_workflows_path in self.remote_workflows_paths:
             self.files_download_service.download(
                 local_dir_path=self.build_local_dir_path_to_prevent_overriding(
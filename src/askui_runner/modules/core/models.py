@@ -22,15 +22,152 @@ class WorkspaceCredentials(BaseModel):
     )
 
 
+class FilesCacheConfig(BaseModel):
+    dir: str = Field(..., description="Directory to cache downloaded files in")
+    max_size_in_bytes: int = Field(
+        1024 * 1024 * 1024,
+        ge=0,
+        description="Maximum size of the cache; least recently used files are evicted beyond it",
+    )
+    link: bool = Field(
+        True,
+        description="Whether to hard link cached files into place instead of copying them (falls back to copying if linking fails)",
+    )
+
+
+class ListingCacheConfig(BaseModel):
+    dir: str = Field(
+        ..., description="Directory to cache pages of listings of remote files in"
+    )
+    max_entries: int = Field(
+        10_000,
+        ge=0,
+        description="Maximum number of cached pages; the least recently used ones are removed beyond it",
+    )
+
+
 class WorkflowsConfig(BaseModel):
     api_url: str
     prefixes: list[str] | None = Field(default=None)
     dir: str
+    max_concurrent_downloads: int = Field(
+        8, ge=1, description="Maximum number of workflow files downloaded concurrently"
+    )
+    cache: FilesCacheConfig | None = Field(
+        default=None,
+        description="Cache for workflow files shared across jobs; disabled if not set",
+    )
+    listing_cache: ListingCacheConfig | None = Field(
+        default=None,
+        description="Cache for listings of workflow files shared across jobs; pages are requested conditionally (If-None-Match/If-Modified-Since) and reused if not modified; only used together with the workflow files cache, which makes downloading the files of reused pages unnecessary; disabled if not set",
+    )
+
+
+class UploadCompressionConfig(BaseModel):
+    algorithm: Literal["gzip", "zstd"] = Field(
+        "gzip",
+        description='Compression algorithm; "zstd" requires the "zstandard" package',
+    )
+    level: int | None = Field(
+        None, description="Compression level; defaults to the algorithm's default"
+    )
+    extensions: list[str] = Field(
+        [".json", ".txt", ".log", ".xml", ".html", ".csv", ".yaml", ".yml"],
+        description="Extensions of files to compress",
+    )
+    mime_types: list[str] = Field(
+        ["text/*", "application/json", "application/xml"],
+        description="MIME types (guessed from the file name, wildcards allowed) of files to compress; images, videos and other compressed formats are never compressed",
+    )
+    min_size_in_bytes: int = Field(
+        1024, ge=0, description="Minimum size of files to compress"
+    )
+
+
+class UploadBundlingConfig(BaseModel):
+    max_file_size_in_bytes: int = Field(
+        64 * 1024,
+        ge=0,
+        description="Maximum size of files to bundle; larger files are uploaded individually",
+    )
+    max_bundle_size_in_bytes: int = Field(
+        64 * 1024 * 1024,
+        ge=1,
+        description="Maximum size of the files in a bundle; more files are split across multiple bundles",
+    )
+
+
+class MultipartUploadConfig(BaseModel):
+    threshold_in_bytes: int = Field(
+        100 * 1024 * 1024,
+        ge=1,
+        description="Minimum size of files to upload in parts",
+    )
+    part_size_in_bytes: int = Field(
+        16 * 1024 * 1024,
+        ge=1024 * 1024,
+        description="Size of the parts; each part being uploaded is held in memory",
+    )
+    max_concurrent_parts: int = Field(
+        4,
+        ge=1,
+        description="Maximum number of parts of a file uploaded concurrently",
+    )
+
+
+class UploadDeduplicationConfig(BaseModel):
+    cache_file: str | None = Field(
+        None,
+        description="File to keep the content hashes of uploaded files in across jobs; only kept for the current job if not set",
+    )
+    max_cache_entries: int = Field(
+        100_000,
+        ge=0,
+        description="Maximum number of uploaded files kept in the cache file; the oldest ones are dropped beyond it",
+    )
+
+
+class IncrementalResultsUploadConfig(BaseModel):
+    watch: Literal["auto", "native", "polling"] = Field(
+        "auto",
+        description='How to detect new result files: "native" file system events (inotify on Linux; requires the "watchdog" package), "polling" or "auto", i.e., native events if available',
+    )
+    poll_interval_s: float = Field(
+        2, gt=0, description="Interval in seconds of checking for new result files"
+    )
+    stable_after_s: float = Field(
+        5,
+        ge=0,
+        description="Time in seconds a result file must not have changed before it is uploaded",
+    )
 
 
 class ResultsConfig(BaseModel):
     api_url: str
     dir: str
+    max_concurrent_uploads: int = Field(
+        8, ge=1, description="Maximum number of result files uploaded concurrently"
+    )
+    compression: UploadCompressionConfig | None = Field(
+        default=None,
+        description="Compression of result files during upload (sent with Content-Encoding); disabled if not set",
+    )
+    multipart: MultipartUploadConfig | None = Field(
+        default=None,
+        description="Upload of large result files in parts that are uploaded concurrently and retried individually; requires support of multipart uploads by the files API; disabled if not set",
+    )
+    dedup: UploadDeduplicationConfig | None = Field(
+        default=None,
+        description="Deduplication of result files by content hash: files uploaded before are skipped and duplicates of files uploaded to another path are copied on the server; copying requires support of `copy_from` by the files API; disabled if not set",
+    )
+    incremental: IncrementalResultsUploadConfig | None = Field(
+        default=None,
+        description="Upload of result files in the background while the workflows are running; disabled if not set",
+    )
+    bundle: UploadBundlingConfig | None = Field(
+        default=None,
+        description="Bundling of small result files into tar archives that are streamed in one request each and extracted by the files API; disabled if not set",
+    )
 
 
 class ScheduleResultsConfig(ResultsConfig):
@@ -42,6 +179,121 @@ class ControllerConfig(BaseModel):
     port: int = Field(6769, description="Port of the ui controller")
 
 
+class TransferThrottleConfig(BaseModel):
+    initial_concurrency: int = Field(
+        4, ge=1, description="Number of concurrent transfers to start with"
+    )
+    min_concurrency: int = Field(
+        1, ge=1, description="Minimum number of concurrent transfers"
+    )
+    max_concurrency: int = Field(
+        64,
+        ge=1,
+        description="Maximum number of concurrent transfers; further bounded by the maximum number of concurrent downloads or uploads",
+    )
+    decrease_interval_s: float = Field(
+        1,
+        ge=0,
+        description="Minimum time in seconds between two reductions of the concurrent transfers",
+    )
+    latency_factor: float = Field(
+        4,
+        gt=1,
+        description="Factor by which the latency of a request without a body must exceed the lowest (average) latency observed to reduce the concurrent transfers",
+    )
+    min_latency_s: float = Field(
+        0.1,
+        ge=0,
+        description="Latency in seconds below which a request is never considered slow",
+    )
+    max_retry_after_s: float = Field(
+        120,
+        ge=0,
+        description="Maximum time in seconds to pause requests for if the server asks to with Retry-After",
+    )
+    max_bytes_per_s: int | None = Field(
+        None,
+        ge=1,
+        description="Maximum number of bytes transferred per second (downloads and uploads together); unlimited if not set",
+    )
+
+
+class CircuitBreakerConfig(BaseModel):
+    failure_rate_threshold: float = Field(
+        0.5,
+        gt=0,
+        le=1,
+        description="Share of failed requests (408/429/5xx or no response) to a host at which requests to it fail fast",
+    )
+    min_requests: int = Field(
+        20,
+        ge=1,
+        description="Minimum number of requests within the window before the circuit can open",
+    )
+    window_s: float = Field(
+        30, gt=0, description="Time window in seconds of requests considered"
+    )
+    open_duration_s: float = Field(
+        15,
+        gt=0,
+        description="Time in seconds between probing requests while the circuit is open",
+    )
+
+
+class RetryBudgetConfig(BaseModel):
+    ratio: float = Field(
+        0.2,
+        ge=0,
+        description="Number of retries allowed per request sent, shared by all clients of the process",
+    )
+    min_retries_per_s: float = Field(
+        1, ge=0, description="Number of retries allowed per second in any case"
+    )
+    max_tokens: int = Field(
+        20,
+        ge=0,
+        description="Maximum number of retries that can be saved up, i.e., of retries in a burst",
+    )
+
+
+class HttpConfig(BaseModel):
+    pool_connections: int = Field(
+        default=10, ge=1, description="Number of hosts to keep a connection pool for"
+    )
+    pool_maxsize: int = Field(
+        default=16,
+        ge=1,
+        description="Maximum number of connections kept per host; should be at least the maximum number of concurrent transfers",
+    )
+    keep_alive: bool = Field(
+        default=True, description="Whether to reuse connections across requests"
+    )
+    connect_timeout: float = Field(
+        default=10, gt=0, description="Timeout in seconds for establishing a connection"
+    )
+    read_timeout: float = Field(
+        default=60,
+        gt=0,
+        description="Timeout in seconds for waiting on data from the server (uploads use a longer timeout)",
+    )
+    async_client: bool = Field(
+        default=False,
+        description="Whether to transfer workflow and result files with the asyncio-based client; requires the optional `async` dependencies (httpx)",
+    )
+    throttle: TransferThrottleConfig | None = Field(
+        default=None,
+        description="Adaptive concurrency (AIMD) of file transfers that backs off on 429/5xx responses and latency spikes and honors Retry-After, optionally with a bandwidth cap; if not set, the configured maximum number of concurrent transfers is used",
+    )
+    circuit_breaker: CircuitBreakerConfig | None = Field(
+        default=None,
+        description="Circuit breaker failing requests to a host fast once too many of them fail and probing periodically for recovery; disabled if not set",
+    )
+    retry_budget: RetryBudgetConfig | None = Field(
+        default=None,
+        description="Process-wide budget of retries of failed requests; each request is retried independently up to 5 times if not set",
+    )
+
+
 class CoreConfigBase(BaseModel):
     controller: ControllerConfig = Field(default_factory=ControllerConfig)  # type: ignore
     runner_type: Literal[
@@ -59,6 +311,10 @@ class CoreConfigBase(BaseModel):
         FeatureToggles(),  # type: ignore
         description="Feature toggles for the runner",
     )
+    http: HttpConfig = Field(
+        default_factory=HttpConfig,  # type: ignore
+        description="Configuration of the HTTP connections to the AskUI APIs",
+    )
 
 
 class CoreConfig(CoreConfigBase, BaseSettings):
@@ -13,6 +13,12 @@ class WorkflowsDownload(ABC):
 
 
 class ResultsUpload(ABC):
+    @abstractmethod
+    def start(self) -> None:
+        """Start uploading results in the background while the workflows are
+        running so that `upload` only needs to upload the remaining results."""
+        raise NotImplementedError()
+
     @abstractmethod
     def upload(self) -> None:
         raise NotImplementedError()
@@ -44,6 +50,8 @@ class Runner:
             if self.enable.download_workflows:
                 self.download_workflows()
             if self.enable.run_workflows:
+                if self.enable.upload_results:
+                    self.start_uploading_results()
                 result = self.run_workflows()
             if self.enable.upload_results:
                 self.upload_results()
@@ -60,6 +68,9 @@ class Runner:
     def run_workflows(self) -> RunWorkflowsResult:
         return RunWorkflowsResult.SUCCESS
 
+    def start_uploading_results(self) -> None:
+        pass
+
     def upload_results(self) -> None:
         pass
 
@@ -2,6 +2,7 @@ from functools import cached_property
 
 
 from ..core.infrastructure.askui import AskUiAccessToken
+from ..core.infrastructure.http import PooledHttpSession, get_http_session
 from .infrastructure.clock.time import TimeClock
 from .infrastructure.runner_jobs_queue.askui import AskUiRunnerJobsQueueService
 from .infrastructure.runner.k8s_job import K8sJobRunner
@@ -48,6 +49,10 @@ class QueueContainer:
             access_token=self._config.queue.credentials.access_token
         )
 
+    @cached_property
+    def _http_session(self) -> PooledHttpSession:
+        return get_http_session(self._config.runner.http)
+
     @cached_property
     def _runner_jobs_queue_service(self) -> AskUiRunnerJobsQueueService:
         if self._config.queue is None:
@@ -55,6 +60,7 @@ class QueueContainer:
         return AskUiRunnerJobsQueueService(
             url=self._config.queue.api_url,
             headers={"Authorization": self._access_token.to_auth_header()},
+            session=self._http_session,
         )
 
     @cached_property
@@ -1,25 +1,28 @@
 import logging
 from typing import Optional
 
-import requests
-
+from ....core.infrastructure.http import PooledHttpSession
+from ....core.models import HttpConfig
 from ...queue import RunnerJob, RunnerJobsQueue, RunnerJobsQueuePingResult
 from ...models import RunnerJobsFilters
 
-REQUEST_TIMEOUT_IN_S = 60
-
 
 class AskUiRunnerJobsQueueService(RunnerJobsQueue):
-    def __init__(self, url: str, headers: dict[str, str]):
+    def __init__(
+        self,
+        url: str,
+        headers: dict[str, str],
+        session: Optional[PooledHttpSession] = None,
+    ):
         self.url = url
         self.headers = headers
+        self.session = session or PooledHttpSession(HttpConfig())
 
     def lease(self, filters: RunnerJobsFilters) -> Optional[RunnerJob]:
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.url}/lease",
                 headers=self.headers,
-                timeout=REQUEST_TIMEOUT_IN_S,
                 params=filters.model_dump(),
             )
             if response.status_code != 200:
@@ -32,11 +35,10 @@ class AskUiRunnerJobsQueueService(RunnerJobsQueue):
         return None
 
     def ping(self, runner_job: RunnerJob) -> RunnerJobsQueuePingResult:
-        response = requests.post(
+        response = self.session.post(
             f"{self.url}/ping",
             params={"ack": runner_job.ack},
             headers=self.headers,
-            timeout=REQUEST_TIMEOUT_IN_S,
         )
         if response.status_code != 200:
             response.raise_for_status()
@@ -56,12 +58,11 @@ class AskUiRunnerJobsQueueService(RunnerJobsQueue):
 
     def complete(self, runner_job: RunnerJob) -> None:
         try:
-            requests.post(
+            self.session.post(
                 f"{self.url}/complete",
                 params={"ack": runner_job.ack},
                 headers=self.headers,
                 json={"status": runner_job.status.value},
-                timeout=REQUEST_TIMEOUT_IN_S,
             )
         except Exception as error:
             logging.error(error)
@@ -5,7 +5,17 @@ from uuid import uuid4
 from pydantic import BaseModel, Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from ..core.models import CoreConfigBase, WorkspaceCredentials
+from ..core.models import (
+    CoreConfigBase,
+    FilesCacheConfig,
+    IncrementalResultsUploadConfig,
+    ListingCacheConfig,
+    MultipartUploadConfig,
+    UploadBundlingConfig,
+    UploadCompressionConfig,
+    UploadDeduplicationConfig,
+    WorkspaceCredentials,
+)
 
 
 class ContainerResource(BaseModel):
@@ -84,6 +94,17 @@ class RunnerConfig(CoreConfigBase):
         "workflows",
         description="Absolute path or path relative to {project_dir} of directory where workflows are located or to be downloaded to",
     )
+    max_concurrent_downloads: int = Field(
+        8, ge=1, description="Maximum number of workflow files downloaded concurrently"
+    )
+    workflows_cache: FilesCacheConfig | None = Field(
+        default=None,
+        description="Cache for workflow files shared across jobs; disabled if not set",
+    )
+    workflows_listing_cache: ListingCacheConfig | None = Field(
+        default=None,
+        description="Cache for listings of workflow files shared across jobs; pages are requested conditionally (If-None-Match/If-Modified-Since) and reused if not modified; only used together with the workflow files cache, which makes downloading the files of reused pages unnecessary; disabled if not set",
+    )
     results_dir: str = Field(
         "results-allure",
         description="Absolute path or path relative to {project_dir} of directory where results are to be put in and to be uploaded from",
@@ -92,6 +113,31 @@ class RunnerConfig(CoreConfigBase):
         "results",
         description="Absolute path or path relative to {project_dir} of directory where schedule results are to be put in and to be uploaded from",
     )
+    max_concurrent_uploads: int = Field(
+        8,
+        ge=1,
+        description="Maximum number of result and schedule result files uploaded concurrently",
+    )
+    results_compression: UploadCompressionConfig | None = Field(
+        default=None,
+        description="Compression of result and schedule result files during upload (sent with Content-Encoding); disabled if not set",
+    )
+    results_multipart: MultipartUploadConfig | None = Field(
+        default=None,
+        description="Upload of large result and schedule result files in parts that are uploaded concurrently and retried individually; requires support of multipart uploads by the files API; disabled if not set",
+    )
+    results_dedup: UploadDeduplicationConfig | None = Field(
+        default=None,
+        description="Deduplication of result and schedule result files by content hash: files uploaded before are skipped and duplicates of files uploaded to another path are copied on the server; copying requires support of `copy_from` by the files API; disabled if not set",
+    )
+    results_incremental: IncrementalResultsUploadConfig | None = Field(
+        default=None,
+        description="Upload of result and schedule result files in the background while the workflows are running; disabled if not set",
+    )
+    results_bundle: UploadBundlingConfig | None = Field(
+        default=None,
+        description="Bundling of small result and schedule result files into tar archives that are streamed in one request each and extracted by the files API; disabled if not set",
+    )
 
 
 class RunnerJobsFilters(BaseModel):